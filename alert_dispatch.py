@@ -0,0 +1,275 @@
+import os
+import sys
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import requests
+
+import stock_metrics
+from history_store import flush_history
+from log_pipeline import get_logger
+
+log = get_logger('alert_dispatch')
+
+# Bounded queue per sink between the monitor and the sinks - the monitor never waits on a sink
+ALERT_QUEUE_SIZE = 100
+
+# What enqueue does when a sink queue is full: 'drop_oldest' keeps the newest alerts, 'drop_new' keeps the oldest
+OVERFLOW_POLICY = 'drop_oldest'
+
+# Per-sink delivery defaults
+SINK_TIMEOUT = 5.0
+SINK_RETRIES = 2
+RETRY_BACKOFF = 0.5
+
+# Dispatch latency samples kept for percentiles
+LATENCY_SAMPLES = 1000
+
+def create_sink(name, send, timeout=SINK_TIMEOUT, retries=SINK_RETRIES):
+    """
+    Alert sink - send(alert) delivers one alert and raises on failure
+    Every attempt is bounded by timeout, failed attempts are retried with backoff
+    """
+    return {
+        'name': name,
+        'send': send,
+        'timeout': timeout,
+        'retries': retries,
+        # Attempts run here so the sink worker can give up on a hung send after timeout
+        'executor': ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'alert-{name}')
+    }
+
+def create_alert_dispatcher(sinks, queue_size=ALERT_QUEUE_SIZE, overflow_policy=OVERFLOW_POLICY, coalesce=True):
+    """
+    Start one worker thread per sink - a slow or failing sink only delays its own alerts
+    coalesce: an alert whose key is already waiting replaces it instead of queueing twice
+    """
+    dispatcher = {
+        'queue_size': queue_size,
+        'overflow_policy': overflow_policy,
+        'coalesce': coalesce,
+        'condition': threading.Condition(),
+        'stopping': False,
+        'lanes': [],
+        'stats': {
+            'enqueued': 0,
+            'delivered': 0,
+            'failed': 0,
+            'retries': 0,
+            'dropped': 0,
+            'coalesced': 0,
+            'max_depth': 0,
+            'latencies': deque(maxlen=LATENCY_SAMPLES)
+        }
+    }
+    
+    for sink in sinks:
+        lane = {'sink': sink, 'pending': deque(), 'pending_keys': {}}
+        lane['thread'] = threading.Thread(target=_dispatch_loop, args=(dispatcher, lane), name=f"alert-dispatch-{sink['name']}", daemon=True)
+        dispatcher['lanes'].append(lane)
+        lane['thread'].start()
+    return dispatcher
+
+def enqueue_alert(dispatcher, alert, key=None):
+    """
+    Queue an alert for every sink without blocking - returns False when no sink accepted it
+    """
+    stats = dispatcher['stats']
+    accepted = False
+    
+    with dispatcher['condition']:
+        if dispatcher['stopping']:
+            return False
+        
+        stats['enqueued'] += 1
+        enqueued_at = time.monotonic()
+        
+        for lane in dispatcher['lanes']:
+            accepted = _enqueue_lane(dispatcher, lane, alert, key, enqueued_at) or accepted
+        dispatcher['condition'].notify_all()
+    
+    return accepted
+
+def _enqueue_lane(dispatcher, lane, alert, key, enqueued_at):
+    """
+    Add an alert to one sink queue - coalesce by key, apply the overflow policy when full
+    """
+    stats = dispatcher['stats']
+    name = lane['sink']['name']
+    
+    if dispatcher['coalesce'] and key is not None and key in lane['pending_keys']:
+        # Keep the original enqueue time - latency counts from the first alert for this key
+        lane['pending_keys'][key]['alert'] = alert
+        stats['coalesced'] += 1
+        return True
+    
+    if len(lane['pending']) >= dispatcher['queue_size']:
+        stats['dropped'] += 1
+        stock_metrics.inc_counter('alerts_dropped_total', {'sink': name, 'policy': dispatcher['overflow_policy']})
+        if dispatcher['overflow_policy'] == 'drop_new':
+            return False
+        dropped = lane['pending'].popleft()
+        lane['pending_keys'].pop(dropped['key'], None)
+    
+    entry = {'key': key, 'alert': alert, 'enqueued_at': enqueued_at}
+    lane['pending'].append(entry)
+    if key is not None:
+        lane['pending_keys'][key] = entry
+    
+    depth = len(lane['pending'])
+    stats['max_depth'] = max(stats['max_depth'], depth)
+    stock_metrics.set_gauge('alert_queue_depth', {'sink': name}, depth)
+    return True
+
+def _dispatch_loop(dispatcher, lane):
+    """
+    Take alerts off one sink queue and deliver them in order
+    """
+    condition = dispatcher['condition']
+    while True:
+        with condition:
+            while not lane['pending'] and not dispatcher['stopping']:
+                condition.wait()
+            if not lane['pending']:
+                return
+            
+            entry = lane['pending'].popleft()
+            if lane['pending_keys'].get(entry['key']) is entry:
+                del lane['pending_keys'][entry['key']]
+            stock_metrics.set_gauge('alert_queue_depth', {'sink': lane['sink']['name']}, len(lane['pending']))
+        
+        _deliver(dispatcher, lane['sink'], entry)
+
+def _deliver(dispatcher, sink, entry):
+    """
+    Deliver one alert to one sink - every attempt bounded by the sink timeout
+    """
+    stats = dispatcher['stats']
+    condition = dispatcher['condition']
+    
+    for attempt in range(sink['retries'] + 1):
+        if attempt:
+            with condition:
+                stats['retries'] += 1
+            time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+        
+        future = sink['executor'].submit(sink['send'], entry['alert'])
+        try:
+            future.result(timeout=sink['timeout'])
+        except FutureTimeout:
+            log.warning(f"⚠️ Alert sink {sink['name']} timed out after {sink['timeout']:g}s (attempt {attempt + 1})")
+            continue
+        except Exception as e:
+            log.warning(f"⚠️ Alert sink {sink['name']} failed: {e} (attempt {attempt + 1})")
+            continue
+        
+        latency = time.monotonic() - entry['enqueued_at']
+        with condition:
+            stats['delivered'] += 1
+            stats['latencies'].append(latency)
+        stock_metrics.observe('alert_dispatch_seconds', {'sink': sink['name']}, latency)
+        return True
+    
+    with condition:
+        stats['failed'] += 1
+    stock_metrics.inc_counter('alerts_failed_total', {'sink': sink['name']})
+    log.error(f"❌ Alert sink {sink['name']} gave up after {sink['retries'] + 1} attempts")
+    return False
+
+def stop_alert_dispatcher(dispatcher, timeout=10.0):
+    """
+    Stop accepting alerts, deliver what is still queued (up to timeout) and stop the sink workers
+    """
+    with dispatcher['condition']:
+        dispatcher['stopping'] = True
+        dispatcher['condition'].notify_all()
+    
+    deadline = time.monotonic() + timeout
+    for lane in dispatcher['lanes']:
+        lane['thread'].join(max(deadline - time.monotonic(), 0))
+        lane['sink']['executor'].shutdown(wait=False)
+
+def dispatcher_stats(dispatcher):
+    """
+    Queue depth (deepest sink queue), delivery counters and dispatch latency percentiles (ms)
+    """
+    stats = dispatcher['stats']
+    with dispatcher['condition']:
+        depth = max((len(lane['pending']) for lane in dispatcher['lanes']), default=0)
+        latencies = sorted(stats['latencies'])
+        summary = {key: value for key, value in stats.items() if key != 'latencies'}
+    
+    def pct(value):
+        if not latencies:
+            return 0.0
+        return latencies[min(int(value / 100.0 * len(latencies)), len(latencies) - 1)] * 1000
+    
+    summary.update(queue_depth=depth, latency_p50_ms=pct(50), latency_p99_ms=pct(99))
+    return summary
+
+def format_alert(alert):
+    """
+    One-line description of a restock alert
+    """
+    products = ', '.join(map(str, alert.get('product_numbers', [])))
+    return f"Product {products} ({alert['key']}) {alert.get('goods_name') or ''} - {alert.get('sale_price')} at {alert['at']}"
+
+def console_sink():
+    """
+    Restock banner in the log
+    """
+    def send(alert):
+        log.warning('\n' + '🎉' * 40)
+        log.warning('🎉 STOCK AVAILABLE! 🎉')
+        log.warning('🎉' * 40)
+        log.warning(f'✅ {format_alert(alert)}', extra={'fields': {'event': 'restock_alert', 'key': alert['key']}})
+    
+    return create_sink('console', send)
+
+def sound_sink():
+    """
+    Terminal bell
+    """
+    def send(alert):
+        sys.stdout.write('\a')
+        sys.stdout.flush()
+    
+    return create_sink('sound', send, retries=0)
+
+def webhook_sink(url, timeout=SINK_TIMEOUT, retries=SINK_RETRIES):
+    """
+    POST the alert as JSON - e.g. to a local relay for chat notifications
+    """
+    session = requests.Session()
+    
+    def send(alert):
+        response = session.post(url, json=alert, timeout=timeout)
+        response.raise_for_status()
+    
+    return create_sink('webhook', send, timeout, retries)
+
+def file_drop_sink(directory):
+    """
+    One JSON file per alert - for scripts that watch a directory
+    """
+    os.makedirs(directory, exist_ok=True)
+    
+    def send(alert):
+        path = os.path.join(directory, f"restock-{int(time.time() * 1000)}-{alert['key'].replace('#', '-')}.json")
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(alert, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+    
+    return create_sink('file_drop', send)
+
+def history_flush_sink(store):
+    """
+    Force buffered history records to disk - restock records land without the polling loop touching the file
+    """
+    def send(alert):
+        flush_history(store)
+    
+    return create_sink('history', send)
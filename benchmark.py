@@ -0,0 +1,472 @@
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import logging
+import tempfile
+import threading
+import contextlib
+
+import stock_client
+import stock_checker
+import stock_series
+from mock_stock_server import start_mock_server, flip_time, cycle_timeline
+from log_pipeline import get_logger, set_log_level, flush_logging, add_logging_args, configure_from_args
+
+log = get_logger('benchmark')
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile - 0.0 for an empty list
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100.0 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+def current_rss_mb():
+    """
+    Resident set size of this process in MB - peak RSS where /proc is not available
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+def bench_urls(count):
+    """
+    Synthetic watchlist - one unique tag per product
+    """
+    return [f'https://www.mi.co.id/id/product/bench-product-{i}/' for i in range(1, count + 1)]
+
+@contextlib.contextmanager
+def quiet_logging():
+    """
+    Silence the per-product output while measuring - errors still show
+    """
+    previous = set_log_level(logging.ERROR)
+    try:
+        yield
+    finally:
+        set_log_level(previous)
+
+def bench_check_once(args):
+    """
+    Drive check_all_urls_once against the mock server
+    """
+    server, api_url = start_mock_server(latency=args.latency, latency_ms=args.latency_ms, error_rate=args.error_rate, skus=args.skus, padding_bytes=args.padding_bytes)
+    stock_client.STOCK_API_URL = api_url
+    session = stock_client.create_stock_session(pool_size=max(args.per_host, 1))
+    urls = bench_urls(args.products)
+    
+    latencies = []
+    started = time.perf_counter()
+    try:
+        for _ in range(args.rounds):
+            with quiet_logging():
+                results = stock_checker.check_all_urls_once(urls, session, args.workers, args.per_host)
+            latencies.extend(result['elapsed'] for result in results)
+    finally:
+        server.shutdown()
+    duration = time.perf_counter() - started
+    
+    return {
+        'rounds': args.rounds,
+        'rounds_per_sec': args.rounds / duration if duration else 0.0,
+        'requests': server.mock_state['requests'],
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'reuse_rate': stock_client.get_session_stats(session)['reuse_rate']
+    }
+
+def bench_monitor(args):
+    """
+    Drive monitor_all_urls_continuous against the mock server with a scripted stock flip
+    Detection latency = time the restock event fired - time the mock flipped the tag in stock
+    """
+    server, api_url = start_mock_server(latency=args.latency, latency_ms=args.latency_ms, error_rate=args.error_rate, skus=args.skus, padding_bytes=args.padding_bytes, flip_after=args.flip_after)
+    state = server.mock_state
+    stock_client.STOCK_API_URL = api_url
+    session = stock_client.create_stock_session(pool_size=max(args.per_host, 1))
+    urls = bench_urls(args.products)
+    
+    latencies = []
+    detections = {}
+    
+    def on_round(round_result):
+        latencies.extend(result['elapsed'] for result in round_result['results'])
+    
+    def on_event(event):
+        if event['type'] == 'restock':
+            detections.setdefault(event['tag'], time.time())
+    
+    started = time.perf_counter()
+    try:
+        with quiet_logging():
+            summary = stock_checker.monitor_all_urls_continuous(urls, args.interval, session, args.workers, args.per_host, max_rounds=args.rounds, on_event=on_event, on_round=on_round)
+    finally:
+        server.shutdown()
+    duration = time.perf_counter() - started
+    
+    detection_latencies = [detected - flip_time(state, tag) for tag, detected in detections.items()]
+    
+    return {
+        'rounds': summary['total_rounds'] if summary else 0,
+        'rounds_per_sec': (summary['total_rounds'] if summary else 0) / duration if duration else 0.0,
+        'requests': state['requests'],
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'detected': f'{len(detections)}/{args.products}',
+        'detect_p50_ms': percentile(detection_latencies, 50) * 1000,
+        'detect_p99_ms': percentile(detection_latencies, 99) * 1000
+    }
+
+def bench_decode(args):
+    """
+    Client CPU per poll before (stdlib json, always decode) and after (fast decoder + skip-decode fast path)
+    Responses stay identical between rounds, so after the first round every poll can skip decoding
+    """
+    fast_loads = stock_client.json_loads
+    variants = (
+        ('before', 'json', json.loads, False, False),
+        ('after (fingerprint)', stock_client.JSON_DECODER, fast_loads, True, False),
+        ('after (etag)', stock_client.JSON_DECODER, fast_loads, True, True)
+    )
+    
+    reports = {}
+    for label, decoder, loads, skip_unchanged, etag in variants:
+        server, api_url = start_mock_server(latency='fixed', latency_ms=args.latency_ms, skus=args.skus, padding_bytes=args.padding_bytes, etag=etag)
+        stock_client.STOCK_API_URL = api_url
+        stock_client.SKIP_UNCHANGED = skip_unchanged
+        stock_client.json_loads = loads
+        session = stock_client.create_stock_session(pool_size=max(args.per_host, 1))
+        watchlist = stock_checker.build_watchlist(bench_urls(args.products))
+        
+        cpu_times = []
+        unchanged = 0
+        try:
+            for _ in range(args.rounds):
+                with quiet_logging():
+                    round_result = stock_checker.run_check_round(watchlist, session, args.workers, args.per_host)
+                for fetch in round_result['fetches'].values():
+                    cpu_times.append(fetch['cpu'])
+                    unchanged += fetch['unchanged'] is not None
+        finally:
+            server.shutdown()
+            stock_client.SKIP_UNCHANGED = True
+            stock_client.json_loads = fast_loads
+        
+        reports[label] = {
+            'decoder': decoder,
+            'polls': len(cpu_times),
+            'unchanged': unchanged,
+            'cpu_per_poll_us': sum(cpu_times) / len(cpu_times) * 1e6 if cpu_times else 0.0,
+            'cpu_p99_us': percentile(cpu_times, 99) * 1e6
+        }
+    return reports
+
+def bench_soak(args):
+    """
+    Run the monitor for --soak-hours of simulated time on an accelerated clock against the mock server
+    Tags restock and sell out on a cycle so state, series, alerts and history all see traffic
+    RSS and per-round latency are sampled every --soak-sample-minutes; both must stay flat after warm-up
+    One extra product is gone for good (404 every time) - its backoff runs the whole soak and the other
+    products must still get their restocks reported in the last quarter of the run
+    """
+    sim = stock_checker.create_sim_clock()
+    duration = args.soak_hours * 3600
+    urls = bench_urls(args.products)
+    tags = [stock_client.extract_product_tag(url) for url in urls]
+    missing_url = 'https://www.mi.co.id/id/product/bench-product-gone/'
+    
+    server, api_url = start_mock_server(latency='fixed', latency_ms=args.soak_latency_ms, skus=args.skus, padding_bytes=args.padding_bytes,
+                                        timeline=cycle_timeline(tags, period=4 * 3600, in_stock_for=1800, duration=duration), clock=sim['time'],
+                                        missing_tags=[stock_client.extract_product_tag(missing_url)])
+    stock_client.STOCK_API_URL = api_url
+    session = stock_client.create_stock_session(pool_size=max(args.per_host, 1))
+    series = stock_series.create_series_store()
+    
+    sample_every = args.soak_sample_minutes * 60
+    started_at = sim['time']()
+    window = []
+    curve = []
+    restock_times = []
+    
+    def on_event(event):
+        if event['type'] == 'restock':
+            restock_times.append(sim['time']() - started_at)
+    
+    def on_round(round_result):
+        window.append(round_result['wall_time'])
+        elapsed = sim['time']() - started_at
+        if elapsed >= (len(curve) + 1) * sample_every:
+            curve.append({
+                'sim_hours': elapsed / 3600,
+                'rss_mb': current_rss_mb(),
+                'series_kib': stock_series.series_memory(series) / 1024,
+                'round_p50_ms': percentile(window, 50) * 1000,
+                'round_p99_ms': percentile(window, 99) * 1000
+            })
+            window.clear()
+    
+    real_started = time.perf_counter()
+    try:
+        with quiet_logging():
+            summary = stock_checker.monitor_all_urls_continuous(urls + [missing_url], args.soak_interval, session, args.workers, args.per_host,
+                                                                max_rounds=int(duration // args.soak_interval), on_event=on_event, on_round=on_round,
+                                                                series=series, time_source=sim)
+    finally:
+        server.shutdown()
+    real_duration = time.perf_counter() - real_started
+    
+    log.info(f'\n📈 Soak curves ({args.soak_hours:g}h simulated in {real_duration:.0f}s)')
+    log.info(f"  {'sim_h':>6} {'rss_mb':>8} {'series_kib':>10} {'p50_ms':>8} {'p99_ms':>8}")
+    for point in curve:
+        log.info(f"  {point['sim_hours']:>6.1f} {point['rss_mb']:>8.1f} {point['series_kib']:>10.0f} {point['round_p50_ms']:>8.2f} {point['round_p99_ms']:>8.2f}")
+    
+    # Skip the first quarter (imports, pools, rings filling up), then compare the first and last third of the rest
+    steady = curve[len(curve) // 4:]
+    third = max(len(steady) // 3, 1)
+    early, late = steady[:third], steady[-third:]
+    
+    def mean(points, key):
+        return sum(point[key] for point in points) / len(points) if points else 0.0
+    
+    rss_growth = mean(late, 'rss_mb') - mean(early, 'rss_mb')
+    p50_early, p50_late = mean(early, 'round_p50_ms'), mean(late, 'round_p50_ms')
+    
+    return {
+        'sim_hours': args.soak_hours,
+        'rounds': summary['total_rounds'],
+        'restocks': summary['total_available_found'],
+        'requests': server.mock_state['requests'],
+        'gone_requests': server.mock_state['missing_requests'],
+        'late_restocks': sum(at >= duration * 0.75 for at in restock_times),
+        'rss_growth_mb': rss_growth,
+        'round_p50_early_ms': p50_early,
+        'round_p50_late_ms': p50_late,
+        'rss_flat': len(steady) >= 2 and rss_growth <= max(args.soak_rss_tolerance_mb, mean(early, 'rss_mb') * 0.1),
+        'latency_flat': len(steady) >= 2 and p50_late <= p50_early * 1.5 + 1.0
+    }
+
+def tail_run(args, urls, policy, mock_config, duration):
+    """
+    Monitor the mock for duration seconds with one request policy (round_budget, hedge, breaker)
+    Returns the mock state, per-request latencies, restock detections as (tag, time) and per-round (time, ok fetches)
+    """
+    stock_client.HEDGE_REQUESTS = policy['hedge']
+    stock_client.BREAKER_ENABLED = policy['breaker']
+    server, api_url = start_mock_server(skus=args.skus, **mock_config)
+    stock_client.STOCK_API_URL = api_url
+    session = stock_client.create_stock_session(pool_size=max(args.per_host, 1))
+    
+    latencies = []
+    detections = []
+    rounds = []
+    stop_event = threading.Event()
+    timer = threading.Timer(duration, stop_event.set)
+    
+    def on_round(round_result):
+        latencies.extend(result['elapsed'] for result in round_result['results'])
+        rounds.append((time.time(), sum(fetch['goods'] is not None for fetch in round_result['fetches'].values())))
+    
+    def on_event(event):
+        if event['type'] == 'restock':
+            detections.append((event['tag'], time.time()))
+    
+    timer.start()
+    try:
+        with quiet_logging():
+            stock_checker.monitor_all_urls_continuous(urls, args.tail_interval, session, args.workers, args.per_host, on_event=on_event,
+                                                      on_round=on_round, stop_event=stop_event, round_budget=policy['round_budget'])
+    finally:
+        timer.cancel()
+        server.shutdown()
+    
+    return server.mock_state, latencies, detections, rounds, session
+
+def detected_windows(state, detections, timeline, tags, in_stock_for, duration):
+    """
+    In-stock windows that closed before the run stopped, and detection latency per window that was seen
+    Returns (windows, {(tag, window start): latency})
+    """
+    # Only windows that closed before the run stopped - later ones had no fair chance
+    windows = {(tag, offset) for tag in tags for offset, available in timeline[tag] if available and offset + in_stock_for <= duration}
+    detected = {}
+    for tag, detected_at in detections:
+        elapsed = detected_at - state['started_at']
+        starts = [offset for offset, available in timeline[tag] if available and offset <= elapsed]
+        if starts and (tag, starts[-1]) in windows:
+            detected.setdefault((tag, starts[-1]), elapsed - starts[-1])
+    return windows, detected
+
+def bench_tail(args):
+    """
+    Restock detection latency against a mock with tail stalls, per request policy
+    Tags restock on a cycle; detection latency = restock event time - start of the in-stock window it belongs to
+    A window that ends unseen counts as missed. Also runs a host outage with the circuit breaker off and on,
+    and a host that always answers slower than the round budget
+    """
+    urls = bench_urls(args.products)
+    tags = [stock_client.extract_product_tag(url) for url in urls]
+    duration = args.tail_seconds
+    period, in_stock_for = args.tail_period, args.tail_period / 2
+    timeline = cycle_timeline(tags, period, in_stock_for, duration + period)
+    budget = args.tail_budget if args.tail_budget is not None else args.tail_interval * 0.9
+    policies = [
+        ('no budget', {'round_budget': 0, 'hedge': False, 'breaker': False}),
+        ('round budget', {'round_budget': budget, 'hedge': False, 'breaker': True}),
+        ('budget + hedging', {'round_budget': budget, 'hedge': True, 'breaker': True})
+    ]
+    saved = stock_client.HEDGE_REQUESTS, stock_client.BREAKER_ENABLED
+    reports = {}
+    
+    try:
+        for label, policy in policies:
+            mock_config = {'latency': 'lognormal', 'latency_ms': args.tail_latency_ms, 'slow_rate': args.tail_slow_rate,
+                           'slow_ms': args.tail_slow_ms, 'timeline': timeline}
+            state, latencies, detections, rounds, session = tail_run(args, urls, policy, mock_config, duration)
+            windows, detected = detected_windows(state, detections, timeline, tags, in_stock_for, duration)
+            detection_latencies = list(detected.values())
+            hedge = stock_client.get_hedge_stats(session)
+            
+            reports[label] = {
+                'requests': state['requests'],
+                'stalled': state['slow'],
+                'request_p99_ms': percentile(latencies, 99) * 1000,
+                'detected': f'{len(detected)}/{len(windows)}',
+                'detect_p50_ms': percentile(detection_latencies, 50) * 1000,
+                'detect_p99_ms': percentile(detection_latencies, 99) * 1000,
+                'hedges': hedge['hedges'],
+                'hedge_wins': hedge['hedge_wins']
+            }
+        
+        # Outage: every request fails for a while - compare load on the dead host and time to the first good round after it
+        outage = (args.tail_seconds / 4, args.tail_seconds / 2)
+        for label, breaker in (('outage, breaker off', False), ('outage, breaker on', True)):
+            policy = {'round_budget': budget, 'hedge': False, 'breaker': breaker}
+            mock_config = {'latency': 'fixed', 'latency_ms': args.tail_latency_ms, 'outages': [outage]}
+            state, latencies, detections, rounds, session = tail_run(args, urls, policy, mock_config, duration)
+            
+            outage_end = state['started_at'] + outage[1]
+            recovered = [at for at, ok in rounds if at >= outage_end and ok]
+            breakers = stock_client.get_breaker_stats(session)
+            reports[label] = {
+                'requests': state['requests'],
+                'outage_requests': state['outage_requests'],
+                'recovery_s': recovered[0] - outage_end if recovered else float('nan'),
+                'breaker_opens': sum(entry['opens'] for entry in breakers.values()),
+                'shed': sum(entry['shed'] for entry in breakers.values())
+            }
+        
+        # Slow host: every answer takes longer than the budget - the budget floor must still let them through
+        for label, round_budget in (('slow host, no budget', 0), ('slow host, round budget', budget)):
+            policy = {'round_budget': round_budget, 'hedge': False, 'breaker': True}
+            mock_config = {'latency': 'fixed', 'latency_ms': budget * 1000 * 1.3, 'timeline': timeline}
+            state, latencies, detections, rounds, session = tail_run(args, urls, policy, mock_config, duration)
+            windows, detected = detected_windows(state, detections, timeline, tags, in_stock_for, duration)
+            breakers = stock_client.get_breaker_stats(session)
+            reports[label] = {
+                'requests': state['requests'],
+                'detected': f'{len(detected)}/{len(windows)}',
+                'detect_p50_ms': percentile(list(detected.values()), 50) * 1000,
+                'breaker_opens': sum(entry['opens'] for entry in breakers.values())
+            }
+    finally:
+        stock_client.HEDGE_REQUESTS, stock_client.BREAKER_ENABLED = saved
+    
+    return reports
+
+def print_report(name, report):
+    """
+    One benchmark result block
+    """
+    log.info(f'\n📊 {name}')
+    log.info('-' * 40)
+    for key, value in report.items():
+        if isinstance(value, float):
+            value = f'{value:.3f}' if key in ('reuse_rate',) else f'{value:.1f}'
+        log.info(f'  {key:<16} {value}')
+
+def parse_args(argv=None):
+    """
+    Benchmark options
+    """
+    parser = argparse.ArgumentParser(description='Offline stock_checker benchmark against a local mock API')
+    parser.add_argument('--products', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--interval', type=float, default=1.0, help='monitor check interval (s)')
+    parser.add_argument('--flip-after', type=float, default=3.0, help='seconds until the mock flips every tag in stock')
+    parser.add_argument('--latency', choices=['fixed', 'uniform', 'lognormal'], default='lognormal')
+    parser.add_argument('--latency-ms', type=float, default=80)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--skus', type=int, default=3)
+    parser.add_argument('--padding-bytes', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=stock_checker.ROUND_MAX_WORKERS)
+    parser.add_argument('--per-host', type=int, default=stock_checker.PER_HOST_LIMIT)
+    parser.add_argument('--soak-hours', type=float, default=24.0, help='simulated monitor time for the soak run')
+    parser.add_argument('--soak-interval', type=float, default=30.0, help='monitor check interval during the soak run (simulated s)')
+    parser.add_argument('--soak-sample-minutes', type=float, default=60.0, help='simulated minutes between RSS / latency samples')
+    parser.add_argument('--soak-latency-ms', type=float, default=2.0, help='mock latency during the soak run')
+    parser.add_argument('--soak-rss-tolerance-mb', type=float, default=5.0, help='allowed RSS growth after warm-up')
+    parser.add_argument('--tail-seconds', type=float, default=30.0, help='real seconds per request policy in the tail run')
+    parser.add_argument('--tail-interval', type=float, default=0.5, help='monitor check interval during the tail run (s)')
+    parser.add_argument('--tail-budget', type=float, default=None, help='round budget of the budget policies (s, default 0.9 x tail interval)')
+    parser.add_argument('--tail-period', type=float, default=6.0, help='restock cycle per tag during the tail run (s) - in stock half of it')
+    parser.add_argument('--tail-latency-ms', type=float, default=20.0, help='mock latency during the tail run')
+    parser.add_argument('--tail-slow-rate', type=float, default=0.03, help='fraction of requests that stall during the tail run')
+    parser.add_argument('--tail-slow-ms', type=float, default=3000.0, help='length of a stall')
+    parser.add_argument('--only', choices=['once', 'monitor', 'decode', 'soak', 'tail'], default=None,
+                        help='run one benchmark - soak and tail only run when asked for')
+    add_logging_args(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """
+    Run the benchmark suite - history records go to a throwaway directory
+    Returns 1 when the soak run is not flat
+    """
+    args = parse_args(argv)
+    configure_from_args(args)
+    
+    log.info('🧪 STOCK CHECKER BENCHMARK (local mock API)')
+    log.info('=' * 40)
+    log.info(f'📦 Products: {args.products} | Rounds: {args.rounds} | Latency: {args.latency} {args.latency_ms}ms | Errors: {args.error_rate:.0%}')
+    log.info(f'⚙️  Workers: {args.workers} | Per-host limit: {args.per_host}')
+    
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            if args.only in (None, 'once'):
+                print_report('check_all_urls_once', bench_check_once(args))
+            if args.only in (None, 'monitor'):
+                print_report(f'monitor_all_urls_continuous (interval {args.interval}s, flip after {args.flip_after}s)', bench_monitor(args))
+            if args.only in (None, 'decode'):
+                for label, report in bench_decode(args).items():
+                    print_report(f'client CPU per poll - skip-decode {label}', report)
+            if args.only == 'soak':
+                report = bench_soak(args)
+                print_report(f'soak - monitor on an accelerated clock ({args.soak_hours:g}h, interval {args.soak_interval:g}s)', report)
+                if not (report['rss_flat'] and report['latency_flat']):
+                    log.error('❌ Soak run is not flat - see the curves above')
+                    return 1
+                if not report['late_restocks']:
+                    log.error('❌ No restocks reported in the last quarter of the soak run')
+                    return 1
+            if args.only == 'tail':
+                for label, report in bench_tail(args).items():
+                    print_report(f'tail - {label}', report)
+        finally:
+            os.chdir(cwd)
+            flush_logging()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,293 @@
+import os
+import time
+import threading
+from collections import deque
+from log_pipeline import get_logger
+
+log = get_logger('browser_pool')
+
+# Warm drivers kept ready - env CHECKOUT_POOL_SIZE (0 = no pool, every purchase launches its own browser)
+POOL_SIZE = int(os.environ.get('CHECKOUT_POOL_SIZE', 0))
+
+# Device presets (get_mobile_device_presets keys) the pool launches in turn - env CHECKOUT_POOL_DEVICES, comma separated
+POOL_DEVICES = tuple(device.strip() for device in os.environ.get('CHECKOUT_POOL_DEVICES', 'galaxy_s20').split(',') if device.strip())
+
+# First navigation done at launch - DNS, TLS and the HTTP cache are warm before a purchase needs them
+WARM_URL = os.environ.get('CHECKOUT_POOL_WARM_URL', 'https://www.mi.co.id/id/')
+
+# Recycling - a driver is retired after this many purchases or once its browser grew this much past the warm baseline
+MAX_USES = 20
+MAX_MEMORY_GROWTH_MB = 300
+
+# Pause after a failed launch before the refill thread tries again
+LAUNCH_RETRY_DELAY = 5.0
+
+def _process_tree_rss_mb(pid):
+    """
+    RSS of a process and all its descendants (chromedriver -> chrome -> renderers) - None without /proc
+    """
+    try:
+        children = {}
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # The command name can contain spaces - the parent pid is the second field after it
+                    parent = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, ValueError, IndexError):
+                continue
+            children.setdefault(parent, []).append(int(entry))
+        
+        total_pages = 0
+        pending = [pid]
+        while pending:
+            current = pending.pop()
+            try:
+                with open(f'/proc/{current}/statm') as f:
+                    total_pages += int(f.read().split()[1])
+            except (OSError, ValueError, IndexError):
+                pass
+            pending.extend(children.get(current, []))
+        return total_pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def driver_memory_mb(driver):
+    """
+    Memory held by a driver's browser - process tree RSS, or the page JS heap where /proc is not available
+    """
+    process = getattr(getattr(driver, 'service', None), 'process', None)
+    if process is not None:
+        rss = _process_tree_rss_mb(process.pid)
+        if rss is not None:
+            return rss
+    try:
+        heap = driver.execute_script('return performance.memory ? performance.memory.usedJSHeapSize : null')
+        return heap / 1024 / 1024 if heap else None
+    except Exception:
+        return None
+
+def driver_healthy(driver):
+    """
+    Cheap liveness check - driver process running, browser answering, a window open
+    """
+    process = getattr(getattr(driver, 'service', None), 'process', None)
+    if process is not None and process.poll() is not None:
+        return False
+    try:
+        return driver.execute_script('return 1') == 1 and bool(driver.window_handles)
+    except Exception:
+        return False
+
+def _count(pool, name):
+    with pool['condition']:
+        pool['stats'][name] += 1
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+def create_browser_pool(launch, size=POOL_SIZE, devices=POOL_DEVICES, max_uses=MAX_USES, max_memory_growth_mb=MAX_MEMORY_GROWTH_MB, warm_url=WARM_URL):
+    """
+    Own up to size pre-launched drivers - launch(device) starts one (get_driver_ultra_fast)
+    A background thread launches and warms drivers whenever idle + launching + leased drivers fall below size
+    """
+    pool = {
+        'launch': launch,
+        'size': max(size, 1),
+        'devices': devices or ('galaxy_s20',),
+        'max_uses': max_uses,
+        'max_memory_growth_mb': max_memory_growth_mb,
+        'warm_url': warm_url,
+        'condition': threading.Condition(),
+        'idle': deque(),
+        'launching': 0,
+        'leased': 0,
+        'launch_count': 0,
+        'failing': False,
+        'stopping': False,
+        'stats': {
+            'launched': 0,
+            'launch_failures': 0,
+            'warm_acquires': 0,
+            'cold_acquires': 0,
+            'unhealthy': 0,
+            'recycled_uses': 0,
+            'recycled_memory': 0
+        }
+    }
+    pool['thread'] = threading.Thread(target=_refill_loop, args=(pool,), name='browser-pool', daemon=True)
+    pool['thread'].start()
+    return pool
+
+def _launch_entry(pool):
+    """
+    Launch and warm one driver - returns the pool entry
+    """
+    with pool['condition']:
+        device = pool['devices'][pool['launch_count'] % len(pool['devices'])]
+        pool['launch_count'] += 1
+    
+    started = time.perf_counter()
+    driver = pool['launch'](device)
+    try:
+        if pool['warm_url']:
+            driver.get(pool['warm_url'])
+    except Exception as e:
+        # A slow warm page still leaves a started browser - keep it
+        log.debug(f'   ⚠️ Warm navigation failed: {str(e)[:50]}')
+    
+    entry = {
+        'driver': driver,
+        'device': device,
+        'uses': 0,
+        'launched_at': time.time(),
+        'baseline_mb': driver_memory_mb(driver)
+    }
+    log.info(f"🏊 Pool driver ready ({device}) in {time.perf_counter() - started:.2f}s")
+    return entry
+
+def _refill_loop(pool):
+    """
+    Launch drivers until the pool owns size - one at a time to keep CPU free for a running purchase
+    """
+    condition = pool['condition']
+    while True:
+        with condition:
+            while not pool['stopping'] and _owned(pool) >= pool['size']:
+                condition.wait()
+            if pool['stopping']:
+                return
+            pool['launching'] += 1
+        
+        try:
+            entry = _launch_entry(pool)
+        except Exception as e:
+            log.error(f'❌ Pool driver launch failed: {e}')
+            with condition:
+                pool['launching'] -= 1
+                pool['failing'] = True
+                pool['stats']['launch_failures'] += 1
+                condition.notify_all()
+            time.sleep(LAUNCH_RETRY_DELAY)
+            continue
+        
+        with condition:
+            pool['launching'] -= 1
+            pool['failing'] = False
+            pool['stats']['launched'] += 1
+            if pool['stopping']:
+                _quit(entry['driver'])
+                return
+            pool['idle'].append(entry)
+            condition.notify_all()
+
+def _owned(pool):
+    return len(pool['idle']) + pool['launching'] + pool['leased']
+
+def _launch_coming(pool):
+    """
+    A driver is launching or about to be - not when the pool is stopping or launches keep failing (caller holds the condition)
+    """
+    if pool['launching']:
+        return True
+    return not pool['stopping'] and not pool['failing'] and _owned(pool) < pool['size']
+
+def acquire_driver(pool, timeout=30.0):
+    """
+    Take a healthy warm driver - waits for a launch in progress, launches one cold only when none is coming
+    Returns the pool entry; give it back with release_driver
+    """
+    condition = pool['condition']
+    started = time.perf_counter()
+    deadline = time.monotonic() + timeout
+    
+    while True:
+        with condition:
+            while not pool['idle'] and _launch_coming(pool) and time.monotonic() < deadline:
+                condition.wait(deadline - time.monotonic())
+            entry = pool['idle'].popleft() if pool['idle'] else None
+            if entry is not None:
+                pool['leased'] += 1
+        
+        if entry is None:
+            break
+        if driver_healthy(entry['driver']):
+            _count(pool, 'warm_acquires')
+            log.info(f"🏊 Warm driver ({entry['device']}, use {entry['uses'] + 1}/{pool['max_uses']}) in {(time.perf_counter() - started) * 1000:.0f}ms")
+            return entry
+        
+        with condition:
+            pool['leased'] -= 1
+            pool['stats']['unhealthy'] += 1
+            # The discarded driver's slot is free - the refill thread replaces it
+            condition.notify_all()
+        log.warning(f"⚠️ Pool driver ({entry['device']}) failed its health check - discarded")
+        _quit(entry['driver'])
+    
+    log.warning('🥶 No warm driver ready - launching one cold')
+    entry = _launch_entry(pool)
+    with condition:
+        pool['leased'] += 1
+        pool['stats']['cold_acquires'] += 1
+    return entry
+
+def release_driver(pool, entry, reuse=True):
+    """
+    Return a driver after a purchase - retired after max_uses, on memory growth, when unhealthy or when reuse is False
+    Login cookies stay; the page is reset to about:blank
+    """
+    entry['uses'] += 1
+    driver = entry['driver']
+    retire = None
+    
+    if not reuse:
+        retire = 'not reusable'
+    elif entry['uses'] >= pool['max_uses']:
+        retire = f"{entry['uses']} uses"
+        _count(pool, 'recycled_uses')
+    else:
+        memory = driver_memory_mb(driver)
+        if memory is not None and entry['baseline_mb'] is not None and memory - entry['baseline_mb'] > pool['max_memory_growth_mb']:
+            retire = f"memory +{memory - entry['baseline_mb']:.0f}MB"
+            _count(pool, 'recycled_memory')
+    
+    if retire is None:
+        try:
+            driver.get('about:blank')
+        except Exception:
+            retire = 'reset failed'
+    
+    with pool['condition']:
+        pool['leased'] -= 1
+        pool['condition'].notify_all()
+        # A cold driver launched next to a full pool does not fit back in
+        if retire is None and not pool['stopping'] and _owned(pool) < pool['size']:
+            pool['idle'].append(entry)
+            return
+    
+    log.info(f"♻️ Pool driver ({entry['device']}) retired: {retire or 'pool full'}")
+    _quit(driver)
+
+def stop_browser_pool(pool):
+    """
+    Stop refilling and quit every idle driver - drivers still leased are quit by release_driver
+    """
+    with pool['condition']:
+        pool['stopping'] = True
+        idle = list(pool['idle'])
+        pool['idle'].clear()
+        pool['condition'].notify_all()
+    
+    for entry in idle:
+        _quit(entry['driver'])
+
+def pool_stats(pool):
+    """
+    Launch / acquire / recycle counters plus current idle, launching and leased counts
+    """
+    with pool['condition']:
+        return dict(pool['stats'], idle=len(pool['idle']), launching=pool['launching'], leased=pool['leased'])
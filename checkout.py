@@ -1,4 +1,3 @@
-import requests
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -7,15 +6,47 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException, NoSuchElementException, SessionNotCreatedException, WebDriverException
 import time
 import re
+import logging
 import os
-import json
+import argparse
+import threading
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
-from datetime import datetime
+from urllib.parse import urlparse
+from stock_client import (
+    extract_product_tag, extract_product_gid, fetch_goods_information, select_goods,
+    create_poll_schedule, record_poll_success, record_poll_cut, record_poll_failure
+)
+from stock_checker import monitor_all_urls_continuous, product_state_key
+from history_store import get_history_store, append_record
+from driver_cache import resolve_driver_path
+from session_store import restore_or_login, save_session
+from browser_pool import POOL_SIZE, create_browser_pool, acquire_driver, release_driver, stop_browser_pool, pool_stats
+from page_waits import (
+    wait_for, wait_for_url, wait_for_ready, wait_for_element, wait_for_dom_quiet, scroll_into_view, note_removed_sleep,
+    reset_waits, log_wait_report
+)
+from log_pipeline import get_logger, add_logging_args, configure_from_args
+
+log = get_logger('checkout')
+
+# Pause between stock API checks while waiting for a restock (seconds)
+STOCK_CHECK_INTERVAL = 2
+
+# Armed mode - stock monitor round interval while the logged-in session waits (seconds)
+ARMED_CHECK_INTERVAL = float(os.environ.get('CHECKOUT_ARMED_INTERVAL', 1))
+
+# Product page navigation - attempts, page load timeout and bounded backoff between attempts (seconds)
+NAV_ATTEMPTS = 5
+NAV_PAGE_LOAD_TIMEOUT = 15
+NAV_BACKOFF = 0.25
+NAV_BACKOFF_MAX = 2.0
+
+# HTTP status of the loaded document (Navigation Timing) - 0 when the browser does not report it
+NAV_STATUS_SCRIPT = "var entry = performance.getEntriesByType('navigation')[0]; return entry && entry.responseStatus ? entry.responseStatus : 0;"
 
 def get_mobile_device_presets():
     """
@@ -120,22 +151,30 @@ def get_driver_ultra_fast(device="galaxy_s20"):
     }
     options.add_experimental_option("prefs", prefs)
     
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
+    # Pinned chromedriver path - no version lookup / download on the critical path
+    started = time.perf_counter()
+    driver_path = resolve_driver_path()
+    resolved_at = time.perf_counter()
+    try:
+        driver = webdriver.Chrome(service=Service(driver_path), options=options)
+    except SessionNotCreatedException:
+        log.error(f'❌ Chrome did not accept the pinned chromedriver ({driver_path}) - after a Chrome update run: python driver_cache.py refresh')
+        raise
+    launched_at = time.perf_counter()
     
     # Ultra fast timeouts - NO IMPLICIT WAIT
     driver.set_page_load_timeout(8)
     # Remove implicit wait - use only explicit waits for better performance
     # driver.implicitly_wait(2)  # REMOVED
     
-    print(f"⚡ ULTRA FAST browser started ({device_config['name']}) - HEADLESS MODE")
+    log.info(f"⚡ ULTRA FAST browser started ({device_config['name']}) - HEADLESS MODE in {launched_at - started:.2f}s (driver resolve {(resolved_at - started) * 1000:.0f}ms)")
     return driver
 
 def fast_login(driver, username, password):
     """
     Ultra fast login - explicit waits only
     """
-    print("🚀 FAST LOGIN...")
+    log.info("🚀 FAST LOGIN...")
     
     driver.get("https://account.xiaomi.com/pass/serviceLogin")
     
@@ -164,59 +203,57 @@ def fast_login(driver, username, password):
     submit_button = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button[type='submit']")))
     driver.execute_script("arguments[0].click();", submit_button)
     
-    time.sleep(2)  # Minimal wait
-    
-    current_url = driver.current_url
-    if "serviceLogin" not in current_url:
-        print("✅ Login SUCCESS!")
+    # Logged in = serviceLogin redirects away - capped at the 2s sleep it replaces, a slower login still counted as failed
+    if wait_for_url(driver, 'login', lambda url: "serviceLogin" not in url, budget=2, replaces=2):
+        log.info("✅ Login SUCCESS!")
         return True
     
-    print("❌ Login failed")
+    log.error("❌ Login failed")
     return False
 
 def fast_click_button(driver, selector, description):
     """
     Ultra fast button clicking with explicit waits only
     """
-    print(f"🎯 {description}...")
+    log.info(f"🎯 {description}...")
     
     # Enhanced checkout handling with comprehensive selectors
     if "Checkout" in description:
-        print("   🔍 DEBUG: Searching for checkout button...")
+        log.debug("   🔍 DEBUG: Searching for checkout button...")
         
-        # First, scroll to bottom to ensure checkout button is visible
+        # First, scroll to bottom to ensure checkout button is visible - instant, no animation to wait out
         try:
             driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(1)
+            note_removed_sleep('scroll', 1)
         except:
             pass
         
-        # Wait for page to be stable before proceeding
+        # Wait for page to be stable before proceeding - the cart footer rendering is the signal, not a fixed buffer
         try:
-            print("   ⏳ Waiting for page to be stable...")
-            WebDriverWait(driver, 10).until(
-                lambda d: d.execute_script("return document.readyState") == "complete"
-            )
-            time.sleep(2)  # Additional buffer for dynamic content
+            log.debug("   ⏳ Waiting for page to be stable...")
+            wait_for_ready(driver, 'cart')
+            if not wait_for_element(driver, 'cart', '.cart-footer__submit, .cart-footer button', state='enabled', replaces=2):
+                log.debug("   ⚠️ Cart footer not ready, continuing...")
         except:
-            print("   ⚠️ Page readiness check failed, continuing...")
+            log.debug("   ⚠️ Page readiness check failed, continuing...")
         
-        # Debug: Show all buttons on the page
-        try:
-            all_buttons = driver.find_elements(By.TAG_NAME, "button")
-            print(f"   📊 Total buttons found: {len(all_buttons)}")
-            for idx, btn in enumerate(all_buttons[:15]):  # Show first 15 buttons
-                try:
-                    btn_text = btn.text.strip()
-                    btn_class = btn.get_attribute('class') or ''
-                    btn_visible = btn.is_displayed()
-                    btn_enabled = btn.is_enabled()
-                    if btn_text or 'checkout' in btn_class.lower() or 'cart' in btn_class.lower():
-                        print(f"   📋 Button {idx+1}: '{btn_text}' | Class: '{btn_class[:60]}...' | Visible: {btn_visible} | Enabled: {btn_enabled}")
-                except:
-                    continue
-        except:
-            pass
+        # Debug: Show all buttons on the page - dozens of WebDriver calls, so only at debug level
+        if log.isEnabledFor(logging.DEBUG):
+            try:
+                all_buttons = driver.find_elements(By.TAG_NAME, "button")
+                log.debug(f"   📊 Total buttons found: {len(all_buttons)}")
+                for idx, btn in enumerate(all_buttons[:15]):  # Show first 15 buttons
+                    try:
+                        btn_text = btn.text.strip()
+                        btn_class = btn.get_attribute('class') or ''
+                        btn_visible = btn.is_displayed()
+                        btn_enabled = btn.is_enabled()
+                        if btn_text or 'checkout' in btn_class.lower() or 'cart' in btn_class.lower():
+                            log.debug(f"   📋 Button {idx+1}: '{btn_text}' | Class: '{btn_class[:60]}...' | Visible: {btn_visible} | Enabled: {btn_enabled}")
+                    except:
+                        continue
+            except:
+                pass
         
         # Comprehensive checkout selectors
         checkout_selectors = [
@@ -252,25 +289,25 @@ def fast_click_button(driver, selector, description):
         
         for i, checkout_selector in enumerate(checkout_selectors, 1):
             try:
-                print(f"   🔄 Checkout Method {i}: {checkout_selector}")
+                log.debug(f"   🔄 Checkout Method {i}: {checkout_selector}")
                 
                 # Find elements fresh each time to avoid stale references
                 elements = driver.find_elements(By.CSS_SELECTOR, checkout_selector)
                 
                 if not elements:
-                    print(f"   ❌ No elements found")
+                    log.debug(f"   ❌ No elements found")
                     continue
                 
                 for idx, element in enumerate(elements):
                     try:
-                        print(f"   📍 Trying element {idx+1}/{len(elements)}")
+                        log.debug(f"   📍 Trying element {idx+1}/{len(elements)}")
                         
                         # Re-check element freshness before each operation
                         try:
                             # Test if element is still valid
                             element.tag_name  # This will throw if stale
                         except:
-                            print(f"   ⚠️ Element became stale, re-finding...")
+                            log.debug(f"   ⚠️ Element became stale, re-finding...")
                             # Re-find elements
                             fresh_elements = driver.find_elements(By.CSS_SELECTOR, checkout_selector)
                             if idx < len(fresh_elements):
@@ -281,30 +318,29 @@ def fast_click_button(driver, selector, description):
                         # Check if element is visible and enabled
                         try:
                             if not element.is_displayed():
-                                print(f"   ⏭️ Element not visible")
+                                log.debug(f"   ⏭️ Element not visible")
                                 continue
-                                
+                            
                             if not element.is_enabled():
-                                print(f"   ⏭️ Element not enabled")
+                                log.debug(f"   ⏭️ Element not enabled")
                                 continue
                         except:
-                            print(f"   ⚠️ Cannot check element state, skipping...")
+                            log.debug(f"   ⚠️ Cannot check element state, skipping...")
                             continue
                         
                         # Get element info
                         try:
                             element_text = element.text.strip()
                             element_class = element.get_attribute('class') or ''
-                            print(f"   📝 Element text: '{element_text}' | Class: '{element_class[:50]}...'")
+                            log.debug(f"   📝 Element text: '{element_text}' | Class: '{element_class[:50]}...'")
                         except:
-                            print(f"   ⚠️ Cannot get element info")
+                            log.debug(f"   ⚠️ Cannot get element info")
                         
                         # Scroll to element with retry
                         try:
-                            driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", element)
-                            time.sleep(0.8)
+                            scroll_into_view(driver, element, replaces=0.8)
                         except:
-                            print(f"   ⚠️ Scroll failed, continuing...")
+                            log.debug(f"   ⚠️ Scroll failed, continuing...")
                         
                         # Multiple click methods with stale element handling
                         click_methods = [
@@ -316,69 +352,69 @@ def fast_click_button(driver, selector, description):
                         
                         for method_name, method in click_methods:
                             try:
-                                print(f"   🔄 Trying {method_name}...")
+                                log.debug(f"   🔄 Trying {method_name}...")
                                 
                                 # Re-find element right before click to avoid stale reference
                                 fresh_elements = driver.find_elements(By.CSS_SELECTOR, checkout_selector)
                                 if idx >= len(fresh_elements):
-                                    print(f"   ⚠️ Element disappeared, skipping method...")
+                                    log.debug(f"   ⚠️ Element disappeared, skipping method...")
                                     break
-                                    
+                                
                                 fresh_element = fresh_elements[idx]
                                 
                                 # Verify element is still clickable
                                 if not fresh_element.is_displayed() or not fresh_element.is_enabled():
-                                    print(f"   ⚠️ Element no longer clickable, skipping method...")
+                                    log.debug(f"   ⚠️ Element no longer clickable, skipping method...")
                                     continue
                                 
                                 # Attempt click
                                 method(fresh_element)
-                                print(f"   ✅ Checkout Method {i}.{idx+1} SUCCESS with {method_name}!")
+                                log.debug(f"   ✅ Checkout Method {i}.{idx+1} SUCCESS with {method_name}!")
                                 
-                                # Wait for page response
-                                time.sleep(2)
+                                # Wait for page response - done as soon as the checkout page URL shows up, never longer than the old 2s sleep
+                                wait_for_url(driver, 'checkout_page', ['checkout', 'order', 'payment'], budget=2, replaces=2)
                                 
                                 # Check if page changed
                                 try:
                                     current_url = driver.current_url
-                                    print(f"   📍 URL after click: {current_url}")
+                                    log.debug(f"   📍 URL after click: {current_url}")
                                     
                                     # Check for checkout page indicators
                                     if any(indicator in current_url for indicator in ['checkout', 'order', 'payment']):
-                                        print(f"   ✅ Page navigation detected!")
+                                        log.debug(f"   ✅ Page navigation detected!")
                                         return True
                                     
                                     # Also check if we're still on cart page but something changed
                                     if 'cart' in current_url:
-                                        print(f"   ⚠️ Still on cart page, but click registered")
+                                        log.debug(f"   ⚠️ Still on cart page, but click registered")
                                         return True
-                                        
+                                
                                 except Exception as e:
-                                    print(f"   ⚠️ URL check failed: {str(e)[:30]}...")
+                                    log.debug(f"   ⚠️ URL check failed: {str(e)[:30]}...")
                                 
                                 return True
-                                
+                            
                             except Exception as e:
                                 error_msg = str(e)
                                 if "stale element" in error_msg.lower():
-                                    print(f"   ⚠️ {method_name} - stale element, retrying...")
-                                    # Wait a bit for page to stabilize
-                                    time.sleep(1)
+                                    log.debug(f"   ⚠️ {method_name} - stale element, retrying...")
+                                    # Wait for page to stabilize
+                                    wait_for_dom_quiet(driver, replaces=1)
                                     continue
                                 else:
-                                    print(f"   ❌ {method_name} failed: {error_msg[:40]}...")
+                                    log.debug(f"   ❌ {method_name} failed: {error_msg[:40]}...")
                                     continue
-                                
+                    
                     except Exception as e:
-                        print(f"   ❌ Element processing failed: {str(e)[:40]}...")
+                        log.debug(f"   ❌ Element processing failed: {str(e)[:40]}...")
                         continue
-                        
+            
             except Exception as e:
-                print(f"   ❌ Checkout Method {i} failed: {str(e)[:40]}...")
+                log.debug(f"   ❌ Checkout Method {i} failed: {str(e)[:40]}...")
                 continue
         
         # Final XPath fallback for checkout with stale element handling
-        print("   🔄 Final checkout fallback: XPath text search...")
+        log.debug("   🔄 Final checkout fallback: XPath text search...")
         try:
             xpath_selectors = [
                 "//button[contains(text(), 'Checkout')]",
@@ -396,25 +432,25 @@ def fast_click_button(driver, selector, description):
                     for element in elements:
                         try:
                             if element.is_displayed() and element.is_enabled():
-                                print(f"   📝 XPath element: '{element.text}' | Tag: '{element.tag_name}'")
-                                driver.execute_script("arguments[0].scrollIntoView(true);", element)
-                                time.sleep(0.5)
+                                if log.isEnabledFor(logging.DEBUG):
+                                    log.debug(f"   📝 XPath element: '{element.text}' | Tag: '{element.tag_name}'")
+                                scroll_into_view(driver, element, replaces=0.5)
                                 
                                 # Try JavaScript click first (most reliable for dynamic pages)
                                 driver.execute_script("arguments[0].click();", element)
-                                print(f"   ✅ XPath checkout SUCCESS!")
-                                time.sleep(2)
+                                log.debug(f"   ✅ XPath checkout SUCCESS!")
+                                wait_for_url(driver, 'checkout_page', ['checkout', 'order', 'payment'], budget=2, replaces=2)
                                 return True
                         except Exception as e:
                             if "stale element" not in str(e).lower():
-                                print(f"   ❌ XPath element failed: {str(e)[:30]}...")
+                                log.debug(f"   ❌ XPath element failed: {str(e)[:30]}...")
                             continue
                 except:
                     continue
         except:
             pass
         
-        print(f"   ❌ All checkout methods failed")
+        log.warning(f"   ❌ All checkout methods failed")
         return False
     
     # Original logic for non-checkout buttons
@@ -424,10 +460,10 @@ def fast_click_button(driver, selector, description):
         element = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, selector)))
         driver.execute_script("arguments[0].scrollIntoView(true);", element)
         driver.execute_script("arguments[0].click();", element)
-        print(f"   ✅ {description} SUCCESS!")
+        log.info(f"   ✅ {description} SUCCESS!")
         return True
     except Exception as e:
-        print(f"   ❌ Direct selector failed: {str(e)}")
+        log.debug(f"   ❌ Direct selector failed: {str(e)}")
     
     try:
         # Method 2: By text content with explicit wait
@@ -439,29 +475,29 @@ def fast_click_button(driver, selector, description):
             element = wait.until(EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Bayar sekarang')]")))
         else:
             return False
-            
+        
         driver.execute_script("arguments[0].scrollIntoView(true);", element)
         driver.execute_script("arguments[0].click();", element)
-        print(f"   ✅ {description} SUCCESS!")
+        log.info(f"   ✅ {description} SUCCESS!")
         return True
     except Exception as e:
-        print(f"   ❌ Text search failed: {str(e)}")
+        log.debug(f"   ❌ Text search failed: {str(e)}")
     
-    print(f"   ❌ {description} FAILED")
+    log.warning(f"   ❌ {description} FAILED")
     return False
 
 def fast_click_radio(driver, selector, description):
     """
     Fast radio button clicking with enhanced BCA support
     """
-    print(f"📡 {description}...")
+    log.info(f"📡 {description}...")
     
     try:
         # Method 1: Direct selector
         element = driver.find_element(By.CSS_SELECTOR, selector)
         driver.execute_script("arguments[0].scrollIntoView(true);", element)
         driver.execute_script("arguments[0].click();", element)
-        print(f"   ✅ {description} SUCCESS!")
+        log.info(f"   ✅ {description} SUCCESS!")
         return True
     except:
         pass
@@ -504,14 +540,13 @@ def fast_click_radio(driver, selector, description):
                     
                     for method in click_methods:
                         try:
-                            driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", element)
-                            time.sleep(0.3)
+                            scroll_into_view(driver, element, replaces=0.3)
                             method()
-                            print(f"   ✅ {description} SUCCESS with {bca_selector}!")
+                            log.info(f"   ✅ {description} SUCCESS with {bca_selector}!")
                             return True
                         except:
                             continue
-                            
+                
                 except:
                     continue
         
@@ -550,123 +585,87 @@ def fast_click_radio(driver, selector, description):
                     
                     for method in click_methods:
                         try:
-                            driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", element)
-                            time.sleep(0.2)
+                            scroll_into_view(driver, element, replaces=0.2)
                             method()
-                            print(f"   ✅ {description} SUCCESS with {shipping_selector}!")
+                            log.info(f"   ✅ {description} SUCCESS with {shipping_selector}!")
                             return True
                         except:
                             continue
-                            
+                
                 except:
                     continue
         
-        print(f"   ❌ {description} FAILED")
+        log.warning(f"   ❌ {description} FAILED")
         return False
-        
+    
     except Exception as e:
-        print(f"   ❌ {description} FAILED: {e}")
+        log.warning(f"   ❌ {description} FAILED: {e}")
         return False
 
-def check_stock_api(product_url):
+def check_stock_api(product_url, check_interval=STOCK_CHECK_INTERVAL):
     """
     Check stock availability via API - Loop until available
+    Uses the shared stock client: pooled connection, one parser, backoff with jitter on errors
     """
-    print('📊 Checking stock availability...')
+    log.info('📊 Checking stock availability...')
     
     try:
-        # Extract product tag from URL
         # URL format: https://www.mi.co.id/id/product/redmi-13x/?skupanel=1&gid=4223716725
-        # Extract tag from path: /product/redmi-13x/
-        if '/product/' not in product_url:
-            print('❌ Invalid product URL format')
+        tag = extract_product_tag(product_url)
+        if not tag:
             return False
-            
-        # Extract tag between /product/ and /
-        url_parts = product_url.split('/product/')
-        if len(url_parts) < 2:
-            print('❌ Cannot extract product tag from URL')
-            return False
-            
-        tag = url_parts[1].split('/')[0].split('?')[0]
-        
-        # Xiaomi stock API endpoint (correct one from user)
-        stock_api_url = f"https://go.buy.mi.co.id/id/misc/getgoodsinformation?from=mobile&tag={tag}"
+        gid = extract_product_gid(product_url)
         
-        headers = {
-            'accept': '*/*',
-            'accept-language': 'en-US,en;q=0.9',
-            'cache-control': 'no-cache',
-            'content-type': 'application/x-www-form-urlencoded; charset=UTF-8',
-            'origin': 'https://www.mi.co.id',
-            'pragma': 'no-cache',
-            'priority': 'u=1, i',
-            'referer': 'https://www.mi.co.id/id/product/redmi-13x/',
-            'sec-ch-ua': '"Google Chrome";v="137", "Chromium";v="137", "Not/A)Brand";v="24"',
-            'sec-ch-ua-mobile': '?1',
-            'sec-ch-ua-platform': '"Android"',
-            'sec-fetch-dest': 'empty',
-            'sec-fetch-mode': 'cors',
-            'sec-fetch-site': 'same-site',
-            'user-agent': 'Mozilla/5.0 (Linux; Android 8.0.0; SM-G955U Build/R16NW) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Mobile Safari/537.36'
-        }
-        
-        print(f'   🔍 Checking product tag: {tag}')
-        print('   🔄 Continuous stock monitoring started...')
+        log.info(f'   🔍 Checking product tag: {tag}' + (f' (gid {gid})' if gid else ''))
+        log.info('   🔄 Continuous stock monitoring started...')
         
+        schedule = create_poll_schedule([tag], check_interval, time.monotonic())
         check_count = 0
         while True:
             check_count += 1
-            print(f'   📡 Stock check #{check_count}...', end=' ')
+            check_label = f'   📡 Stock check #{check_count}...'
             
-            try:
-                response = requests.get(stock_api_url, headers=headers, timeout=10)
-                
-                if response.status_code == 200:
-                    try:
-                        stock_data = response.json()
-                        
-                        # Parse JSON directly without .get() - access nested structure
-                        is_cos = str(stock_data['data']['goodsinformation'][0]['is_cos'])
-                        
-                        if is_cos == "False":
-                            print('✅ AVAILABLE! (is_cos: False)')
-                            print(f'   🎉 Stock became available after {check_count} checks!')
-                            return True
-                        else:
-                            print(f'❌ OUT OF STOCK (is_cos: {is_cos})')
-                        
-                    except (json.JSONDecodeError, KeyError, IndexError) as e:
-                        print(f'❌ JSON parsing error: {str(e)[:30]}...')
-                else:
-                    print(f'❌ HTTP {response.status_code}')
-                    
-            except requests.exceptions.RequestException as e:
-                print(f'❌ Request failed - {str(e)[:30]}...')
+            fetch = fetch_goods_information(tag, prefix=f'[check #{check_count}] ')
+            now = time.monotonic()
             
-            # Wait before next check
-            print(f'   ⏰ Waiting 2 seconds before next check...')
-            time.sleep(2)
+            # Parse every SKU once - the URL gid selects the one we want
+            product_info = select_goods(fetch['goods'], gid) if fetch['goods'] is not None else None
+            if product_info is not None:
+                record_poll_success(schedule[tag], now)
+                if product_info['available']:
+                    log.warning(f'{check_label} ✅ AVAILABLE! (is_cos: False)')
+                    log.warning(f'   🎉 Stock became available after {check_count} checks!')
+                    return True
+                log.info(f"{check_label} ❌ OUT OF STOCK (is_cos: {product_info['is_cos']})")
+            elif fetch['error'] in ('deadline', 'budget', 'circuit_open'):
+                record_poll_cut(schedule[tag], now, fetch['retry_after'])
+                log.warning(f"{check_label} ⏱️ {fetch['error']} - checking again")
+            else:
+                delay = record_poll_failure(schedule[tag], now, fetch['retry_after'])
+                log.warning(f"   ⏳ {fetch['error'] or 'empty response'} - backing off {delay:.1f}s")
             
+            # Wait before next check
+            wait_time = max(schedule[tag]['next_due'] - time.monotonic(), 0)
+            log.debug(f'   ⏰ Waiting {wait_time:.1f} seconds before next check...')
+            time.sleep(wait_time)
+    
     except Exception as e:
-        print(f'   ❌ Unexpected error during stock check: {e}')
+        log.error(f'   ❌ Unexpected error during stock check: {e}')
         return False
 
 def accept_cookies_early(driver):
     """
     Enhanced cookie acceptance - Direct to method 6
     """
-    print('🍪 Accepting cookies...')
-    
-    # Wait a bit for page to load
-    time.sleep(2)
+    log.info('🍪 Accepting cookies...')
     
-    # Direct to Method 6: #truste-consent-button
+    # Direct to Method 6: #truste-consent-button - taken the moment the banner renders instead of after a fixed 2s
     try:
-        print('   🔄 Cookie Method 6: #truste-consent-button')
+        log.debug('   🔄 Cookie Method 6: #truste-consent-button')
         
-        wait = WebDriverWait(driver, 3)
-        cookie_btn = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, '#truste-consent-button')))
+        cookie_btn = wait_for_element(driver, 'cookie_banner', '#truste-consent-button', state='visible', replaces=2)
+        if cookie_btn is None:
+            raise NoSuchElementException('#truste-consent-button')
         
         # Multiple click methods
         click_methods = [
@@ -679,214 +678,380 @@ def accept_cookies_early(driver):
         for j, method in enumerate(click_methods, 1):
             try:
                 # Scroll into view first
-                driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", cookie_btn)
-                time.sleep(0.3)
+                scroll_into_view(driver, cookie_btn, replaces=0.3)
                 
                 method()
-                print(f'   ✅ Cookie Method 6.{j} SUCCESS!')
-                time.sleep(1)  # Wait for cookie banner to disappear
+                log.debug(f'   ✅ Cookie Method 6.{j} SUCCESS!')
+                # Wait for cookie banner to disappear
+                wait_for(driver, 'cookie_banner_gone', lambda d: not any(btn.is_displayed() for btn in d.find_elements(By.CSS_SELECTOR, '#truste-consent-button')),
+                         replaces=1)
                 return True
             except Exception as e:
-                print(f'   ❌ Click method {j} failed: {str(e)[:30]}...')
+                log.debug(f'   ❌ Click method {j} failed: {str(e)[:30]}...')
                 continue
-                
+    
     except (TimeoutException, NoSuchElementException):
-        print(f'   ❌ Cookie Method 6 not found')
+        log.debug(f'   ❌ Cookie Method 6 not found')
     except Exception as e:
-        print(f'   ❌ Cookie Method 6 failed: {str(e)[:30]}...')
-        
-    print('   ✅ Cookie method 6 completed!')
-    time.sleep(1)
+        log.debug(f'   ❌ Cookie Method 6 failed: {str(e)[:30]}...')
+    
+    log.debug('   ✅ Cookie method 6 completed!')
+    note_removed_sleep('cookie_banner', 1)
+    return True
+
+def classify_navigation_failure(driver, error=None):
+    """
+    Why a navigation failed: timeout, network (no response), error_page (HTTP 5xx / 429) or unknown
+    """
+    if isinstance(error, TimeoutException):
+        return 'timeout'
+    if error is not None and 'net::ERR_' in str(error):
+        return 'network'
+    
+    try:
+        if driver.current_url.startswith('chrome-error://'):
+            return 'network'
+        status = driver.execute_script(NAV_STATUS_SCRIPT)
+    except WebDriverException:
+        return 'unknown'
+    if status >= 500 or status == 429:
+        return 'error_page'
+    return 'unknown' if error is not None else None
+
+def page_usable(driver, url):
+    """
+    Timed-out loads often have a usable page - the DOM is parsed and only slow subresources are pending
+    """
+    try:
+        driver.execute_script("window.stop();")
+        return urlparse(driver.current_url).netloc == urlparse(url).netloc and driver.execute_script("return document.readyState") in ('interactive', 'complete')
+    except WebDriverException:
+        return False
+
+def navigate_with_recovery(driver, url, attempts=NAV_ATTEMPTS):
+    """
+    Open a page with targeted recovery per failure kind - cookies and storage are never cleared
+    timeout: stop loading and keep the page when its DOM is there, else load again
+    network / error_page / unknown: load again after a short bounded backoff
+    Time spent recovering is logged and recorded in the history
+    """
+    driver.set_page_load_timeout(NAV_PAGE_LOAD_TIMEOUT)
+    failures = []
+    first_failure_at = None
+    
+    for attempt in range(1, attempts + 1):
+        log.info(f"   📡 Attempt {attempt}/{attempts}...")
+        error = None
+        try:
+            driver.get(url)
+            WebDriverWait(driver, 10).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
+        except WebDriverException as e:
+            error = e
+        
+        kind = classify_navigation_failure(driver, error)
+        if kind == 'timeout' and page_usable(driver, url):
+            log.info("   ✅ Product page usable (slow resources stopped)")
+            kind = None
+        
+        if kind is None:
+            if error is None:
+                log.info("   ✅ Product page loaded!")
+            break
+        
+        failures.append(kind)
+        if first_failure_at is None:
+            first_failure_at = time.perf_counter()
+        log.warning(f"   ❌ Attempt {attempt} failed ({kind}): {str(error or 'error page')[:50]}...")
+        
+        if attempt < attempts:
+            backoff = min(NAV_BACKOFF * 2 ** (attempt - 1), NAV_BACKOFF_MAX)
+            log.info(f"   ⏰ Retrying in {backoff:.2f}s (session kept)")
+            time.sleep(backoff)
+    
+    report = {
+        'url': url,
+        'ok': kind is None,
+        'attempts': len(failures) + (1 if kind is None else 0),
+        'failures': failures,
+        'recovery_seconds': round(time.perf_counter() - first_failure_at, 3) if first_failure_at is not None else 0.0
+    }
+    if failures:
+        outcome = 'recovered' if report['ok'] else 'gave up'
+        log.warning(f"   🩹 Navigation {outcome} after {', '.join(failures)} - {report['recovery_seconds']:.2f}s in recovery",
+                    extra={'fields': {'event': 'navigation_recovery', 'ok': report['ok'], 'failures': failures, 'recovery_seconds': report['recovery_seconds']}})
+    append_record(get_history_store(), 'checkout_navigation', report)
+    if not report['ok']:
+        log.warning("   ❌ All navigation attempts failed!")
+    return report
+
+def prepare_checkout_session(driver, username, password, product_url):
+    """
+    Steps 1-3 - log in, open the product page and accept cookies, ready to click Beli Sekarang
+    """
+    # Step 1: Login - the saved session when it is still valid, fast_login otherwise
+    log.info("🔐 Step 1: Ultra fast login...")
+    login_started = time.perf_counter()
+    logged_in, how = restore_or_login(driver, username, password, fast_login)
+    append_record(get_history_store(), 'checkout_login', {'how': how, 'ok': logged_in, 'seconds': round(time.perf_counter() - login_started, 3)})
+    if not logged_in:
+        log.error("❌ Login failed!")
+        return False
+    
+    log.info("✅ Login SUCCESS!")
+    note_removed_sleep('login', 1)
+    
+    # Step 2: Navigate to product URL - retries keep cookies and storage, so the login survives
+    log.info("🛒 Step 2: Navigating to product...")
+    if not navigate_with_recovery(driver, product_url)['ok']:
+        return False
+    
+    # Store-side localStorage is only reachable on the store origin - save it now that we are there
+    try:
+        save_session(driver, username)
+    except OSError as e:
+        log.warning(f'⚠️ Session not saved: {e}')
+    note_removed_sleep('product_page', 1)
+    
+    # Step 3: Accept cookies early
+    log.info("🍪 Step 3: Accepting cookies...")
+    accept_cookies_early(driver)
+    note_removed_sleep('cookie_banner', 0.5)
+    
+    return True
+
+def report_handoff_latency(handoff, clicked_at, clicked):
+    """
+    Log and record detection -> Beli Sekarang latency of an armed checkout
+    """
+    handoff_ms = (handoff['woke_at'] - handoff['detected_at']) * 1000
+    click_ms = (clicked_at - handoff['detected_at']) * 1000
+    log.warning(f"⚡ Restock -> Beli Sekarang {'clicked' if clicked else 'FAILED'} in {click_ms:.0f}ms (handoff to checkout {handoff_ms:.1f}ms)",
+                extra={'fields': {'event': 'checkout_handoff', 'key': handoff['key'], 'clicked': clicked, 'handoff_ms': round(handoff_ms, 2), 'click_ms': round(click_ms, 1)}})
+    
+    append_record(get_history_store(), 'checkout_handoff', {
+        'key': handoff['key'],
+        'clicked': clicked,
+        'handoff_ms': round(handoff_ms, 2),
+        'click_ms': round(click_ms, 1)
+    }, flush=True)
+
+def report_wait_savings(mode):
+    """
+    Log and record the idle time the condition waits removed from this purchase
+    """
+    report = log_wait_report()
+    append_record(get_history_store(), 'checkout_waits', {
+        'mode': mode,
+        'waits': report['waits'],
+        'waited_s': report['waited_s'],
+        'replaced_s': report['replaced_s'],
+        'idle_removed_s': report['idle_removed_s'],
+        'timeouts': report['timeouts']
+    })
+
+def complete_purchase(driver, handoff=None):
+    """
+    Steps 5-10 - Beli Sekarang through Bayar sekarang, then extract the payment info
+    handoff: {'detected_at', 'woke_at'} perf_counter times from armed mode - the click latency is logged
+    """
+    # Step 5: Click "Beli Sekarang"
+    log.info("🎯 Step 5: Clicking Beli Sekarang...")
+    clicked = fast_click_button(driver, ".footer__btn.footer__submit.footer__submit--main", "Beli Sekarang")
+    if handoff:
+        report_handoff_latency(handoff, time.perf_counter(), clicked)
+    if not clicked:
+        log.error("❌ Beli Sekarang failed!")
+        return False
+    
+    # Cart page is there once its checkout button renders
+    wait_for_element(driver, 'cart', '.cart-footer__submit', replaces=1)
+    
+    # Step 6: Click "Checkout"
+    log.info("🛒 Step 6: Clicking Checkout...")
+    if not fast_click_button(driver, ".cart-footer__submit", "Checkout"):
+        log.error("❌ Checkout failed!")
+        return False
+    
+    note_removed_sleep('checkout_page', 1)
+    
+    # Step 7: Select shipping with loading wait
+    log.info("📦 Step 7: Waiting for shipping options to load...")
+    if wait_for_element(driver, 'shipping', 'input[name="delivery-item"], .radio__icon, .delivery-option'):
+        # Options render in batches - settled once the DOM stops changing
+        wait_for_dom_quiet(driver, replaces=1)
+        log.info("   ✅ Shipping options loaded!")
+    else:
+        log.warning("   ⚠️ Shipping options may still be loading, continuing...")
+    
+    shipping_success = enhanced_click_shipping(driver)
+    if not shipping_success:
+        log.warning("   ❌ All shipping methods failed, trying alternative...")
+        try:
+            alternative_elements = wait_for(driver, 'shipping', lambda d: d.find_elements(By.XPATH, "//*[contains(text(), 'Pengiriman standar')]"),
+                                            budget=5, replaces=5)
+            if alternative_elements:
+                alternative_elements[0].click()
+                log.info("   ✅ Pengiriman standar SUCCESS (alternative)!")
+            else:
+                log.warning("   ❌ Pengiriman standar FAILED completely")
+        except Exception as e:
+            log.warning("   ❌ Pengiriman standar FAILED completely")
+    
+    note_removed_sleep('shipping', 0.5)
+    
+    # Step 8: Select BCA payment with loading wait
+    log.info("💳 Step 8: Waiting for payment options to load...")
+    if wait_for_element(driver, 'payment', '.checkout-pay__item, .pay-item, img[alt="bca"]'):
+        wait_for_dom_quiet(driver, replaces=1)
+        log.info("   ✅ Payment options loaded!")
+    else:
+        log.warning("   ⚠️ Payment options may still be loading, continuing...")
+    
+    bca_success = enhanced_click_bca(driver)
+    if not bca_success:
+        log.warning("❌ All BCA methods failed, but continuing...")
+    
+    note_removed_sleep('payment', 0.5)
+    
+    # Step 9: Click agreement checkbox
+    log.info("☑️ Step 9: Clicking agreement checkbox...")
+    if wait_for_element(driver, 'checkbox', '.checkbox__icon, i[role="checkbox"], i[aria-labelledby="a11y-agree"]', state='visible', replaces=0.5):
+        log.info("   ✅ Checkbox found!")
+    else:
+        log.warning("   ⚠️ Checkbox may not be present, continuing...")
+    
+    checkbox_success = enhanced_click_checkbox(driver)
+    if not checkbox_success:
+        log.warning("⚠️ Checkbox click failed, but continuing...")
+    
+    note_removed_sleep('checkbox', 0.5)
+    
+    # Step 10: Click "Bayar sekarang" - ready once the button stops being aria-disabled
+    log.info("💰 Step 10: Waiting for payment button to be ready...")
+    if wait_for_element(driver, 'pay_button', '.checkout-footer__submit--pay, button[aria-disabled="false"]', state='enabled', replaces=1):
+        log.info("   ✅ Payment button ready!")
+    else:
+        log.warning("   ⚠️ Payment button may still be loading, continuing...")
+    
+    bayar_success = enhanced_click_bayar_sekarang(driver)
+    if not bayar_success:
+        log.error("❌ All Bayar sekarang methods failed!")
+        return False
+    
+    log.info("🎉 ULTRA FAST PURCHASE COMPLETED!")
+    log.info("💳 Payment page should be loading...")
+    
+    # Extract payment information - waits for the payment code itself, nothing to sit out afterwards
+    payment_info = extract_payment_info(driver)
+    note_removed_sleep('payment_page', 10)
+    
     return True
 
-def ultra_fast_purchase(username, password, product_url):
+def ultra_fast_purchase(username, password, product_url, pool=None):
+    """
+    Steps 1-10 in one go - pool (browser_pool) hands out an already running, warmed driver instead of launching one
+    """
     driver = None
+    lease = None
+    raised = False
     try:
-        print("🚀 ULTRA FAST PURCHASE STARTING...")
+        log.info("🚀 ULTRA FAST PURCHASE STARTING...")
+        reset_waits()
         
         # Get ultra fast driver
-        driver = get_driver_ultra_fast()
-        
-        # Step 1: Login
-        print("🔐 Step 1: Ultra fast login...")
-        if not fast_login(driver, username, password):
-            print("❌ Login failed!")
-            return False
-        
-        print("✅ Login SUCCESS!")
-        time.sleep(1)
-        
-        # Step 2: Navigate to product URL
-        print("🛒 Step 2: Navigating to product...")
-        success = False
-        for attempt in range(5):  # Increase attempts to 5
-            try:
-                print(f"   📡 Attempt {attempt + 1}/5...")
-                
-                # Clear any existing cookies/cache before navigation
-                if attempt > 0:
-                    print(f"   🧹 Clearing cache before attempt {attempt + 1}...")
-                    driver.delete_all_cookies()
-                    driver.execute_script("window.localStorage.clear();")
-                    driver.execute_script("window.sessionStorage.clear();")
-                
-                # Set longer timeout for navigation
-                driver.set_page_load_timeout(15)
-                driver.get(product_url)
-                
-                # Wait for page to be ready
-                WebDriverWait(driver, 10).until(
-                    lambda d: d.execute_script("return document.readyState") == "complete"
-                )
-                
-                print("   ✅ Product page loaded!")
-                success = True
-                break
-                
-            except Exception as e:
-                error_msg = str(e)
-                print(f"   ❌ Attempt {attempt + 1} failed: {error_msg[:50]}...")
-                
-                if attempt < 4:  # Not the last attempt
-                    wait_time = (attempt + 1) * 2  # Progressive wait: 2, 4, 6, 8 seconds
-                    print(f"   ⏰ Waiting {wait_time} seconds before retry...")
-                    time.sleep(wait_time)
-                    
-                    # Try to recover by refreshing
-                    try:
-                        print(f"   🔄 Attempting recovery...")
-                        driver.refresh()
-                        time.sleep(2)
-                    except:
-                        pass
-                else:
-                    print("   ❌ All navigation attempts failed!")
-                    return False
+        if pool is not None:
+            lease = acquire_driver(pool)
+            driver = lease['driver']
+        else:
+            driver = get_driver_ultra_fast()
         
-        if not success:
+        # Steps 1-3: Login, product page, cookies
+        if not prepare_checkout_session(driver, username, password, product_url):
             return False
         
-        time.sleep(1)
-        
-        # Step 3: Accept cookies early
-        print("🍪 Step 3: Accepting cookies...")
-        accept_cookies_early(driver)
-        time.sleep(0.5)
-        
         # Step 4: Check stock via API
-        print("📊 Step 4: Checking stock availability...")
+        log.info("📊 Step 4: Checking stock availability...")
         if not check_stock_api(product_url):
-            print("❌ Product out of stock! Stopping purchase flow.")
+            log.error("❌ Product out of stock! Stopping purchase flow.")
             return False
         
-        print("✅ Stock available! Continuing with purchase...")
-        time.sleep(1)
+        log.info("✅ Stock available! Continuing with purchase...")
         
-        # Step 5: Click "Beli Sekarang"
-        print("🎯 Step 5: Clicking Beli Sekarang...")
-        if not fast_click_button(driver, ".footer__btn.footer__submit.footer__submit--main", "Beli Sekarang"):
-            print("❌ Beli Sekarang failed!")
-            return False
-        
-        time.sleep(1)
-            
-        # Step 6: Click "Checkout"
-        print("🛒 Step 6: Clicking Checkout...")
-        if not fast_click_button(driver, ".cart-footer__submit", "Checkout"):
-            print("❌ Checkout failed!")
-            return False
-        
-        time.sleep(1)
-        
-        # Step 7: Select shipping with loading wait
-        print("📦 Step 7: Waiting for shipping options to load...")
-        try:
-            wait = WebDriverWait(driver, 10)
-            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'input[name="delivery-item"], .radio__icon, .delivery-option')))
-            time.sleep(1)  # Additional buffer
-            print("   ✅ Shipping options loaded!")
-        except TimeoutException:
-            print("   ⚠️ Shipping options may still be loading, continuing...")
-        
-        shipping_success = enhanced_click_shipping(driver)
-        if not shipping_success:
-            print("   ❌ All shipping methods failed, trying alternative...")
+        # Steps 5-10: Beli Sekarang -> Bayar sekarang
+        return complete_purchase(driver)
+    
+    except Exception as e:
+        raised = True
+        log.error(f"❌ Error: {e}")
+        return False
+    finally:
+        report_wait_savings('ultra_fast')
+        if lease is not None:
+            # A driver that raised mid-purchase is in an unknown state - replace it
+            # A purchase that just returned False (login failed, out of stock) leaves it fine for the next one
+            release_driver(pool, lease, reuse=not raised)
+        else:
             try:
-                time.sleep(5)
-                alternative_elements = driver.find_elements(By.XPATH, "//*[contains(text(), 'Pengiriman standar')]")
-                if alternative_elements:
-                    alternative_elements[0].click()
-                    print("   ✅ Pengiriman standar SUCCESS (alternative)!")
-                else:
-                    print("   ❌ Pengiriman standar FAILED completely")
-            except Exception as e:
-                print("   ❌ Pengiriman standar FAILED completely")
-        
-        time.sleep(0.5)
-        
-        # Step 8: Select BCA payment with loading wait
-        print("💳 Step 8: Waiting for payment options to load...")
-        try:
-            wait = WebDriverWait(driver, 10)
-            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '.checkout-pay__item, .pay-item, img[alt="bca"]')))
-            time.sleep(1)  # Additional buffer
-            print("   ✅ Payment options loaded!")
-        except TimeoutException:
-            print("   ⚠️ Payment options may still be loading, continuing...")
-        
-        bca_success = enhanced_click_bca(driver)
-        if not bca_success:
-            print("❌ All BCA methods failed, but continuing...")
-        
-        time.sleep(0.5)
-        
-        # Step 9: Click agreement checkbox
-        print("☑️ Step 9: Clicking agreement checkbox...")
-        try:
-            wait = WebDriverWait(driver, 10)
-            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '.checkbox__icon, i[role="checkbox"], i[aria-labelledby="a11y-agree"]')))
-            time.sleep(0.5)
-            print("   ✅ Checkbox found!")
-        except TimeoutException:
-            print("   ⚠️ Checkbox may not be present, continuing...")
-        
-        checkbox_success = enhanced_click_checkbox(driver)
-        if not checkbox_success:
-            print("⚠️ Checkbox click failed, but continuing...")
-        
-        time.sleep(0.5)
-        
-        # Step 10: Click "Bayar sekarang"
-        print("💰 Step 10: Waiting for payment button to be ready...")
-        try:
-            wait = WebDriverWait(driver, 10)
-            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '.checkout-footer__submit--pay, button[aria-disabled="false"]')))
-            time.sleep(1)
-            print("   ✅ Payment button ready!")
-        except TimeoutException:
-            print("   ⚠️ Payment button may still be loading, continuing...")
+                driver.quit()
+            except:
+                pass
+
+def armed_purchase(username, password, product_url, check_interval=ARMED_CHECK_INTERVAL):
+    """
+    Armed mode - log in and open the product page first, then watch stock in the same process
+    The stock monitor runs in a background thread; a restock of this product wakes the checkout
+    on the main thread (which owns the driver) and Beli Sekarang is clicked right away
+    """
+    tag = extract_product_tag(product_url)
+    if not tag:
+        return False
+    key = product_state_key(tag, extract_product_gid(product_url))
+    
+    driver = None
+    stop_event = threading.Event()
+    restocked = threading.Event()
+    handoff = {'key': key}
+    
+    def on_event(event):
+        # Runs on the monitor thread - only take the time and wake the checkout
+        if event['type'] == 'restock' and event['key'] == key and not restocked.is_set():
+            handoff['detected_at'] = time.perf_counter()
+            restocked.set()
+    
+    try:
+        log.info("🚀 ARMED PURCHASE STARTING...")
+        reset_waits()
+        driver = get_driver_ultra_fast()
         
-        bayar_success = enhanced_click_bayar_sekarang(driver)
-        if not bayar_success:
-            print("❌ All Bayar sekarang methods failed!")
+        # Steps 1-3 before any stock is there - the session waits on the product page
+        if not prepare_checkout_session(driver, username, password, product_url):
             return False
         
-        print("🎉 ULTRA FAST PURCHASE COMPLETED!")
-        print("💳 Payment page should be loading...")
+        # Step 4: In-process stock monitor
+        monitor = threading.Thread(target=monitor_all_urls_continuous, args=([product_url], check_interval),
+                                   kwargs={'on_event': on_event, 'stop_event': stop_event}, name='stock-monitor', daemon=True)
+        monitor.start()
+        log.info(f"🎯 ARMED: watching {key} every {check_interval:g}s - Beli Sekarang fires on restock")
         
-        # Extract payment information
-        payment_info = extract_payment_info(driver)
+        while not restocked.wait(1.0):
+            if not monitor.is_alive():
+                log.error("❌ Stock monitor stopped - disarming")
+                return False
         
-        # Keep running for a bit to ensure extraction
-        print("\n⏸️  Payment info extracted. Process will complete in 10 seconds...")
-        time.sleep(10)
-        
-        return True
+        handoff['woke_at'] = time.perf_counter()
+        stop_event.set()
         
+        # Steps 5-10
+        return complete_purchase(driver, handoff)
+    
     except Exception as e:
-        print(f"❌ Error: {e}")
+        log.error(f"❌ Error: {e}")
         return False
     finally:
+        stop_event.set()
+        report_wait_savings('armed')
         try:
             driver.quit()
         except:
@@ -896,7 +1061,7 @@ def enhanced_click_shipping(driver):
     """
     Enhanced shipping selection with multiple methods and proper waits
     """
-    print("📦 Selecting Pengiriman standar...")
+    log.info("📦 Selecting Pengiriman standar...")
     
     # Multiple shipping selectors in priority order
     shipping_selectors = [
@@ -915,7 +1080,7 @@ def enhanced_click_shipping(driver):
     
     for i, selector in enumerate(shipping_selectors, 1):
         try:
-            print(f"   🔄 Shipping Method {i}: {selector}")
+            log.debug(f"   🔄 Shipping Method {i}: {selector}")
             
             # Wait for element to be present
             element = WebDriverWait(driver, 3).until(
@@ -923,8 +1088,7 @@ def enhanced_click_shipping(driver):
             )
             
             # Scroll into view first
-            driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", element)
-            time.sleep(0.3)
+            scroll_into_view(driver, element, replaces=0.3)
             
             # Multiple click methods
             click_methods = [
@@ -943,30 +1107,30 @@ def enhanced_click_shipping(driver):
             for j, method in enumerate(click_methods, 1):
                 try:
                     method()
-                    print(f"   ✅ Shipping Method {i}.{j} SUCCESS!")
+                    log.debug(f"   ✅ Shipping Method {i}.{j} SUCCESS!")
                     
-                    # Verify selection worked
-                    time.sleep(0.5)
+                    # Verify selection worked - at most as long as the old fixed wait
                     try:
-                        if element.get_attribute('checked') or element.get_attribute('aria-checked') == 'true':
-                            print(f"   ✅ Shipping selection verified!")
+                        if wait_for(driver, 'selection', lambda d: element.get_attribute('checked') or element.get_attribute('aria-checked') == 'true',
+                                    budget=0.5, replaces=0.5):
+                            log.debug(f"   ✅ Shipping selection verified!")
                             return True
                     except:
                         pass
                     
                     return True
-                    
+                
                 except Exception as e:
-                    print(f"   ❌ Click method {j} failed: {str(e)[:30]}...")
+                    log.debug(f"   ❌ Click method {j} failed: {str(e)[:30]}...")
                     continue
-                    
+        
         except Exception as e:
-            print(f"   ❌ Shipping Method {i} failed: {str(e)[:50]}...")
+            log.debug(f"   ❌ Shipping Method {i} failed: {str(e)[:50]}...")
             continue
     
     # Final fallback with XPath text search
     try:
-        print("   🔄 Final shipping fallback: text search...")
+        log.debug("   🔄 Final shipping fallback: text search...")
         xpath_selectors = [
             "//div[contains(text(), 'Pengiriman standar')]",
             "//span[contains(text(), 'Pengiriman standar')]",
@@ -979,36 +1143,61 @@ def enhanced_click_shipping(driver):
                 element = driver.find_element(By.XPATH, xpath)
                 driver.execute_script("arguments[0].scrollIntoView(true);", element)
                 driver.execute_script("arguments[0].click();", element)
-                print(f"   ✅ Final shipping fallback SUCCESS!")
+                log.debug(f"   ✅ Final shipping fallback SUCCESS!")
                 return True
             except:
                 continue
-        
+    
     except:
         pass
-        
-    print("   ❌ All shipping methods failed!")
+    
+    log.warning("   ❌ All shipping methods failed!")
     return False
 
+def bca_selection_shown(element):
+    """
+    BCA option (or its container) marked as selected
+    """
+    is_selected = (
+        element.get_attribute('checked') == 'true' or
+        element.get_attribute('aria-checked') == 'true' or
+        'selected' in (element.get_attribute('class') or '') or
+        'checked' in (element.get_attribute('class') or '')
+    )
+    
+    # Also check parent for selection indicators
+    try:
+        parent = element.find_element(By.XPATH, "./..")
+        parent_selected = (
+            'selected' in (parent.get_attribute('class') or '') or
+            'checked' in (parent.get_attribute('class') or '') or
+            'active' in (parent.get_attribute('class') or '')
+        )
+        is_selected = is_selected or parent_selected
+    except NoSuchElementException:
+        pass
+    return is_selected
+
 def enhanced_click_bca(driver):
     """
     Enhanced BCA payment selection with comprehensive selectors and explicit waits
     """
-    print("💳 Selecting BCA payment...")
+    log.info("💳 Selecting BCA payment...")
     
     # First, debug what payment options are available
-    try:
-        print("   🔍 DEBUG: Payment options available:")
-        payment_items = driver.find_elements(By.CSS_SELECTOR, ".checkout-pay__item, .pay-item, .payment-method")
-        for idx, item in enumerate(payment_items):
-            try:
-                item_text = item.text.strip()
-                item_class = item.get_attribute('class') or ''
-                print(f"   📋 Payment {idx+1}: '{item_text[:50]}...' | Class: '{item_class[:50]}...'")
-            except:
-                continue
-    except:
-        pass
+    if log.isEnabledFor(logging.DEBUG):
+        try:
+            log.debug("   🔍 DEBUG: Payment options available:")
+            payment_items = driver.find_elements(By.CSS_SELECTOR, ".checkout-pay__item, .pay-item, .payment-method")
+            for idx, item in enumerate(payment_items):
+                try:
+                    item_text = item.text.strip()
+                    item_class = item.get_attribute('class') or ''
+                    log.debug(f"   📋 Payment {idx+1}: '{item_text[:50]}...' | Class: '{item_class[:50]}...'")
+                except:
+                    continue
+        except:
+            pass
     
     # Comprehensive BCA selectors in priority order
     bca_selectors = [
@@ -1042,7 +1231,7 @@ def enhanced_click_bca(driver):
     
     for i, selector in enumerate(bca_selectors, 1):
         try:
-            print(f"   🔄 BCA Method {i}: {selector}")
+            log.debug(f"   🔄 BCA Method {i}: {selector}")
             
             # Use explicit wait for element presence
             try:
@@ -1057,17 +1246,17 @@ def enhanced_click_bca(driver):
                     elements = driver.find_elements(By.CSS_SELECTOR, selector)
                 
                 if not elements:
-                    print(f"   ❌ No elements found")
+                    log.debug(f"   ❌ No elements found")
                     continue
-                    
+            
             except Exception as e:
-                print(f"   ❌ Element search failed: {str(e)[:30]}...")
+                log.debug(f"   ❌ Element search failed: {str(e)[:30]}...")
                 continue
             
             # Try each element found
             for elem_idx, element in enumerate(elements):
                 try:
-                    print(f"   📍 Trying element {elem_idx+1}/{len(elements)}")
+                    log.debug(f"   📍 Trying element {elem_idx+1}/{len(elements)}")
                     
                     # Check if this element is related to BCA
                     element_context = ""
@@ -1095,24 +1284,23 @@ def enhanced_click_bca(driver):
                                 continue
                         
                         element_context = f"{element_alt} {element_src} {element_text} {element_value} {parent_text} {' '.join(sibling_texts)}".lower()
-                        print(f"   📝 Element context: '{element_context[:100]}...'")
-                        
+                        log.debug(f"   📝 Element context: '{element_context[:100]}...'")
+                    
                     except Exception as e:
-                        print(f"   ⚠️ Context check failed: {str(e)[:30]}...")
+                        log.debug(f"   ⚠️ Context check failed: {str(e)[:30]}...")
                     
                     # Skip if not BCA related (for generic selectors)
                     if i > 15 and "bca" not in element_context:
-                        print(f"   ⏭️ Skipping non-BCA element")
+                        log.debug(f"   ⏭️ Skipping non-BCA element")
                         continue
                     
                     # Check if element is visible and interactable
                     if not element.is_displayed():
-                        print(f"   ⏭️ Element not visible")
+                        log.debug(f"   ⏭️ Element not visible")
                         continue
                     
                     # Scroll into view first
-                    driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", element)
-                    time.sleep(0.5)
+                    scroll_into_view(driver, element, replaces=0.5)
                     
                     # Multiple click methods with enhanced debugging
                     click_methods = [
@@ -1134,58 +1322,37 @@ def enhanced_click_bca(driver):
                     
                     for method_name, method in click_methods:
                         try:
-                            print(f"   🔄 Trying {method_name}...")
+                            log.debug(f"   🔄 Trying {method_name}...")
                             method()
-                            print(f"   ✅ BCA Method {i}.{elem_idx+1} SUCCESS with {method_name}!")
+                            log.debug(f"   ✅ BCA Method {i}.{elem_idx+1} SUCCESS with {method_name}!")
                             
-                            # Verify selection worked
-                            time.sleep(0.8)
+                            # Verify selection worked - at most as long as the old fixed wait
                             try:
-                                # Check various indicators of selection
-                                is_selected = (
-                                    element.get_attribute('checked') == 'true' or
-                                    element.get_attribute('aria-checked') == 'true' or
-                                    'selected' in (element.get_attribute('class') or '') or
-                                    'checked' in (element.get_attribute('class') or '')
-                                )
-                                
-                                # Also check parent for selection indicators
-                                try:
-                                    parent = element.find_element(By.XPATH, "./..")
-                                    parent_selected = (
-                                        'selected' in (parent.get_attribute('class') or '') or
-                                        'checked' in (parent.get_attribute('class') or '') or
-                                        'active' in (parent.get_attribute('class') or '')
-                                    )
-                                    is_selected = is_selected or parent_selected
-                                except:
-                                    pass
-                                
-                                if is_selected:
-                                    print(f"   ✅ BCA selection verified!")
+                                if wait_for(driver, 'selection', lambda d: bca_selection_shown(element), budget=0.8, replaces=0.8):
+                                    log.debug(f"   ✅ BCA selection verified!")
                                 else:
-                                    print(f"   ⚠️ Selection not verified, but continuing...")
-                                    
+                                    log.debug(f"   ⚠️ Selection not verified, but continuing...")
+                            
                             except Exception as e:
-                                print(f"   ⚠️ Verification failed: {str(e)[:30]}...")
+                                log.debug(f"   ⚠️ Verification failed: {str(e)[:30]}...")
                             
                             return True
-                            
+                        
                         except Exception as e:
-                            print(f"   ❌ {method_name} failed: {str(e)[:40]}...")
+                            log.debug(f"   ❌ {method_name} failed: {str(e)[:40]}...")
                             continue
-                            
+                
                 except Exception as e:
-                    print(f"   ❌ Element {elem_idx+1} processing failed: {str(e)[:50]}...")
+                    log.debug(f"   ❌ Element {elem_idx+1} processing failed: {str(e)[:50]}...")
                     continue
-                    
+        
         except Exception as e:
-            print(f"   ❌ BCA Method {i} failed: {str(e)[:50]}...")
+            log.debug(f"   ❌ BCA Method {i} failed: {str(e)[:50]}...")
             continue
     
     # Final fallback with XPath text search and explicit waits
     try:
-        print("   🔄 Final BCA fallback: comprehensive text search...")
+        log.debug("   🔄 Final BCA fallback: comprehensive text search...")
         xpath_selectors = [
             "//img[@alt='bca' or @alt='BCA']",
             "//img[contains(@src, 'bca') or contains(@src, 'BCA')]",
@@ -1206,47 +1373,47 @@ def enhanced_click_bca(driver):
                 for element in elements:
                     if not element.is_displayed():
                         continue
-                        
-                    print(f"   📝 XPath element found: '{element.get_attribute('alt') or element.text or 'no text'}' with tag '{element.tag_name}'")
                     
-                    driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", element)
-                    time.sleep(0.3)
+                    if log.isEnabledFor(logging.DEBUG):
+                        log.debug(f"   📝 XPath element found: '{element.get_attribute('alt') or element.text or 'no text'}' with tag '{element.tag_name}'")
+                    
+                    scroll_into_view(driver, element, replaces=0.3)
                     
                     # Try multiple click approaches for XPath elements
                     try:
                         # Try clicking the element itself
                         driver.execute_script("arguments[0].click();", element)
-                        print(f"   ✅ Final BCA fallback SUCCESS (direct)!")
+                        log.debug(f"   ✅ Final BCA fallback SUCCESS (direct)!")
                         return True
                     except:
                         try:
                             # Try clicking parent container
                             driver.execute_script("var container = arguments[0].closest('.checkout-pay__item, .pay-item'); if(container) container.click();", element)
-                            print(f"   ✅ Final BCA fallback SUCCESS (container)!")
+                            log.debug(f"   ✅ Final BCA fallback SUCCESS (container)!")
                             return True
                         except:
                             try:
                                 # Try standard click
                                 element.click()
-                                print(f"   ✅ Final BCA fallback SUCCESS (standard)!")
+                                log.debug(f"   ✅ Final BCA fallback SUCCESS (standard)!")
                                 return True
                             except:
                                 continue
-                        
+            
             except:
                 continue
-                
+    
     except:
         pass
     
-    print("   ❌ All BCA methods failed!")
+    log.warning("   ❌ All BCA methods failed!")
     return False
 
 def enhanced_click_bayar_sekarang(driver):
     """
     Enhanced "Bayar sekarang" button clicking with multiple methods
     """
-    print("💰 Clicking Bayar sekarang...")
+    log.info("💰 Clicking Bayar sekarang...")
     
     # Multiple selectors for "Bayar sekarang" button in priority order
     bayar_selectors = [
@@ -1268,7 +1435,7 @@ def enhanced_click_bayar_sekarang(driver):
     
     for i, selector in enumerate(bayar_selectors, 1):
         try:
-            print(f"   🔄 Bayar Method {i}: {selector}")
+            log.debug(f"   🔄 Bayar Method {i}: {selector}")
             
             # Wait for element to be present and clickable
             element = WebDriverWait(driver, 3).until(
@@ -1278,18 +1445,17 @@ def enhanced_click_bayar_sekarang(driver):
             # Check if button is enabled
             aria_disabled = element.get_attribute('aria-disabled')
             if aria_disabled == 'true':
-                print(f"   ⏭️ Button is disabled, skipping...")
+                log.debug(f"   ⏭️ Button is disabled, skipping...")
                 continue
             
             # Check if this is the correct button by text content
             button_text = element.text.strip().lower()
             if i > 5 and 'bayar' not in button_text and 'sekarang' not in button_text and 'pay' not in button_text:
-                print(f"   ⏭️ Not payment button: '{button_text}', skipping...")
+                log.debug(f"   ⏭️ Not payment button: '{button_text}', skipping...")
                 continue
             
             # Scroll into view first
-            driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", element)
-            time.sleep(0.5)
+            scroll_into_view(driver, element, replaces=0.5)
             
             # Multiple click methods
             click_methods = [
@@ -1310,28 +1476,26 @@ def enhanced_click_bayar_sekarang(driver):
             for j, method in enumerate(click_methods, 1):
                 try:
                     method()
-                    print(f"   ✅ Bayar Method {i}.{j} SUCCESS!")
+                    log.debug(f"   ✅ Bayar Method {i}.{j} SUCCESS!")
                     
                     # Check if page changed or loading started
-                    time.sleep(1)
-                    current_url = driver.current_url
-                    if 'payment' in current_url or 'bayar' in current_url or 'checkout' not in current_url:
-                        print(f"   ✅ Payment page navigation detected!")
+                    if wait_for_url(driver, 'payment_page', lambda url: 'payment' in url or 'bayar' in url or 'checkout' not in url, budget=1, replaces=1):
+                        log.debug(f"   ✅ Payment page navigation detected!")
                         return True
                     
                     return True
-                    
+                
                 except Exception as e:
-                    print(f"   ❌ Bayar click method {j} failed: {str(e)[:30]}...")
+                    log.debug(f"   ❌ Bayar click method {j} failed: {str(e)[:30]}...")
                     continue
-                    
+        
         except Exception as e:
-            print(f"   ❌ Bayar Method {i} failed: {str(e)[:50]}...")
+            log.debug(f"   ❌ Bayar Method {i} failed: {str(e)[:50]}...")
             continue
     
     # Final fallback with XPath text search
     try:
-        print("   🔄 Final Bayar fallback: text search...")
+        log.debug("   🔄 Final Bayar fallback: text search...")
         xpath_selectors = [
             "//button[contains(text(), 'Bayar sekarang')]",
             "//button[contains(text(), 'Bayar')]",
@@ -1348,36 +1512,35 @@ def enhanced_click_bayar_sekarang(driver):
                 if element.get_attribute('aria-disabled') == 'true':
                     continue
                 
-                driver.execute_script("arguments[0].scrollIntoView(true);", element)
-                time.sleep(0.3)
+                scroll_into_view(driver, element, replaces=0.3)
                 
                 # Try multiple click methods
                 try:
                     driver.execute_script("arguments[0].click();", element)
-                    print(f"   ✅ Final Bayar fallback SUCCESS (JS click)!")
+                    log.debug(f"   ✅ Final Bayar fallback SUCCESS (JS click)!")
                     return True
                 except:
                     try:
                         element.click()
-                        print(f"   ✅ Final Bayar fallback SUCCESS (direct click)!")
+                        log.debug(f"   ✅ Final Bayar fallback SUCCESS (direct click)!")
                         return True
                     except:
                         continue
-                        
+            
             except:
                 continue
-                
+    
     except:
         pass
     
-    print("   ❌ All Bayar sekarang methods failed!")
+    log.warning("   ❌ All Bayar sekarang methods failed!")
     return False
 
 def enhanced_click_checkbox(driver):
     """
     Enhanced checkbox clicking for agreement checkbox
     """
-    print("☑️ Clicking agreement checkbox...")
+    log.info("☑️ Clicking agreement checkbox...")
     
     # Multiple selectors for checkbox in priority order
     checkbox_selectors = [
@@ -1398,7 +1561,7 @@ def enhanced_click_checkbox(driver):
     
     for i, selector in enumerate(checkbox_selectors, 1):
         try:
-            print(f"   🔄 Checkbox Method {i}: {selector}")
+            log.debug(f"   🔄 Checkbox Method {i}: {selector}")
             
             # Wait for element to be present
             element = WebDriverWait(driver, 3).until(
@@ -1408,12 +1571,11 @@ def enhanced_click_checkbox(driver):
             # Check if checkbox is already checked
             aria_checked = element.get_attribute('aria-checked')
             if aria_checked == 'true':
-                print(f"   ✅ Checkbox already checked!")
+                log.debug(f"   ✅ Checkbox already checked!")
                 return True
             
             # Scroll into view first
-            driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", element)
-            time.sleep(0.3)
+            scroll_into_view(driver, element, replaces=0.3)
             
             # Multiple click methods for checkbox
             click_methods = [
@@ -1434,32 +1596,30 @@ def enhanced_click_checkbox(driver):
             for j, method in enumerate(click_methods, 1):
                 try:
                     method()
-                    print(f"   ✅ Checkbox Method {i}.{j} SUCCESS!")
+                    log.debug(f"   ✅ Checkbox Method {i}.{j} SUCCESS!")
                     
                     # Verify checkbox is now checked
-                    time.sleep(0.3)
                     try:
-                        new_aria_checked = element.get_attribute('aria-checked')
-                        class_name = element.get_attribute('class') or ''
-                        if new_aria_checked == 'true' or 'checked' in class_name:
-                            print(f"   ✅ Checkbox verification SUCCESS!")
+                        if wait_for(driver, 'selection', lambda d: element.get_attribute('aria-checked') == 'true' or 'checked' in (element.get_attribute('class') or ''),
+                                    budget=0.3, replaces=0.3):
+                            log.debug(f"   ✅ Checkbox verification SUCCESS!")
                             return True
                     except:
                         pass
                     
                     return True
-                    
+                
                 except Exception as e:
-                    print(f"   ❌ Checkbox click method {j} failed: {str(e)[:30]}...")
+                    log.debug(f"   ❌ Checkbox click method {j} failed: {str(e)[:30]}...")
                     continue
-                    
+        
         except Exception as e:
-            print(f"   ❌ Checkbox Method {i} failed: {str(e)[:50]}...")
+            log.debug(f"   ❌ Checkbox Method {i} failed: {str(e)[:50]}...")
             continue
     
     # Final fallback with XPath and label search
     try:
-        print("   🔄 Final checkbox fallback: text/label search...")
+        log.debug("   🔄 Final checkbox fallback: text/label search...")
         fallback_selectors = [
             # XPath for agreement related text
             "//i[contains(@aria-labelledby, 'agree')]",
@@ -1480,29 +1640,28 @@ def enhanced_click_checkbox(driver):
                 else:
                     element = driver.find_element(By.CSS_SELECTOR, selector)
                 
-                driver.execute_script("arguments[0].scrollIntoView(true);", element)
-                time.sleep(0.2)
+                scroll_into_view(driver, element, replaces=0.2)
                 
                 # Try both JS and direct click
                 try:
                     driver.execute_script("arguments[0].click();", element)
-                    print(f"   ✅ Final checkbox fallback SUCCESS (JS)!")
+                    log.debug(f"   ✅ Final checkbox fallback SUCCESS (JS)!")
                     return True
                 except:
                     try:
                         element.click()
-                        print(f"   ✅ Final checkbox fallback SUCCESS (direct)!")
+                        log.debug(f"   ✅ Final checkbox fallback SUCCESS (direct)!")
                         return True
                     except:
                         continue
-                        
+            
             except:
                 continue
-                
+    
     except:
         pass
     
-    print("   ❌ All checkbox methods failed!")
+    log.warning("   ❌ All checkbox methods failed!")
     return False
 
 def load_config_simple(filename="data.txt"):
@@ -1510,7 +1669,7 @@ def load_config_simple(filename="data.txt"):
     Simple config loader
     """
     if not os.path.exists(filename):
-        print(f"File {filename} not found!")
+        log.error(f"File {filename} not found!")
         return None
     
     with open(filename, 'r', encoding='utf-8') as file:
@@ -1530,11 +1689,11 @@ def extract_payment_info(driver):
     """
     Extract payment information from BCA payment page
     """
-    print("💰 Extracting payment information...")
+    log.info("💰 Extracting payment information...")
     
     try:
-        # Wait for payment page to load
-        time.sleep(3)
+        # Wait for payment page to load - the virtual account code is what gets extracted
+        wait_for_element(driver, 'payment_page', '.payment-code .code, .bca__topuserinfo .code, .virtual-account-number, .va-number', state='visible', replaces=3)
         
         payment_info = {
             "virtualAccount": None,
@@ -1617,67 +1776,96 @@ def extract_payment_info(driver):
                 continue
         
         # Display extracted information
-        print('\n🎉 PAYMENT INFORMATION EXTRACTED:')
-        print('=' * 50)
+        log.info('\n🎉 PAYMENT INFORMATION EXTRACTED:')
+        log.info('=' * 50)
         
         if payment_info["virtualAccount"]:
-            print(f"💳 No. Virtual Account: {payment_info['virtualAccount']}")
+            log.info(f"💳 No. Virtual Account: {payment_info['virtualAccount']}")
         else:
-            print("❌ Virtual Account: Not found")
+            log.warning("❌ Virtual Account: Not found")
         
         if payment_info["totalPayment"]:
-            print(f"💰 Total Pembayaran: {payment_info['totalPayment']}")
+            log.info(f"💰 Total Pembayaran: {payment_info['totalPayment']}")
         else:
-            print("❌ Total Payment: Not found")
+            log.warning("❌ Total Payment: Not found")
         
         if payment_info["invoiceNumber"]:
-            print(f"📄 No. Tagihan: {payment_info['invoiceNumber']}")
+            log.info(f"📄 No. Tagihan: {payment_info['invoiceNumber']}")
         else:
-            print("❌ Invoice Number: Not found")
+            log.warning("❌ Invoice Number: Not found")
         
         if payment_info["timeRemaining"]:
-            print(f"⏰ Waktu Tersisa: {payment_info['timeRemaining']}")
+            log.info(f"⏰ Waktu Tersisa: {payment_info['timeRemaining']}")
         else:
-            print("❌ Time Remaining: Not found")
-        
-        print('=' * 50)
+            log.warning("❌ Time Remaining: Not found")
         
-        # Save to file
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"payment_info_{timestamp}.json"
+        log.info('=' * 50)
         
-        with open(filename, 'w') as f:
-            json.dump(payment_info, f, indent=2)
+        # Save to history - flushed right away, payment info must not sit in a buffer
+        history = get_history_store()
+        append_record(history, 'payment_info', payment_info, flush=True)
         
-        print(f"💾 Payment info saved to: {filename}")
+        log.info(f"💾 Payment info saved to history: {history['directory']}/")
         
         return payment_info
-        
+    
     except Exception as e:
-        print(f"❌ Error extracting payment info: {str(e)}")
+        log.error(f"❌ Error extracting payment info: {str(e)}")
         return None
 
+def parse_cli_args(argv=None):
+    """
+    CLI flags - --armed keeps the logged-in session waiting on the product page while stock is monitored in-process
+    """
+    parser = argparse.ArgumentParser(description='Xiaomi ultra fast purchase bot')
+    parser.add_argument('--config', default='data.txt', help='username|password|product_url file')
+    parser.add_argument('--armed', action='store_true', default=os.environ.get('CHECKOUT_ARMED', '0') == '1',
+                        help='log in first, click Beli Sekarang the moment the stock monitor sees a restock - env CHECKOUT_ARMED=1')
+    parser.add_argument('--interval', type=float, default=ARMED_CHECK_INTERVAL,
+                        help='armed mode stock check interval in seconds - env CHECKOUT_ARMED_INTERVAL')
+    parser.add_argument('--pool-size', type=int, default=POOL_SIZE,
+                        help='pre-launched warm browsers for purchases (0 = launch per purchase) - env CHECKOUT_POOL_SIZE')
+    add_logging_args(parser)
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    print("🚀 XIAOMI ULTRA FAST PURCHASE BOT")
-    print("⚡ Optimized for maximum speed")
-    print("=" * 40)
-    
-    config = load_config_simple("data.txt")
-    if not config:
-        print("❌ Configuration not found!")
-        exit()
-    
-    print(f"📧 Username: {config['username']}")
-    print(f"🔗 Product URL: {config['product_url']}")
-    print("\n🚀 Starting ultra fast purchase...")
-    
-    success = ultra_fast_purchase(
-        config['username'],
-        config['password'],
-        config['product_url']
-        )
+    args = parse_cli_args()
+    configure_from_args(args)
+    
+    # Start launching right away - the browser warms up while the config loads
+    pool = create_browser_pool(get_driver_ultra_fast, args.pool_size) if args.pool_size and not args.armed else None
+    
+    # A missing config exits from inside the try - the warm browsers are stopped on every way out
+    try:
+        log.info("🚀 XIAOMI ULTRA FAST PURCHASE BOT")
+        log.info("⚡ Optimized for maximum speed")
+        log.info("=" * 40)
+        
+        config = load_config_simple(args.config)
+        if not config:
+            log.error("❌ Configuration not found!")
+            exit()
+        
+        log.info(f"📧 Username: {config['username']}")
+        log.info(f"🔗 Product URL: {config['product_url']}")
+        
+        if args.armed:
+            log.info("\n🎯 Starting armed purchase...")
+            success = armed_purchase(config['username'], config['password'], config['product_url'], args.interval)
+        else:
+            log.info("\n🚀 Starting ultra fast purchase...")
+            success = ultra_fast_purchase(
+                config['username'],
+                config['password'],
+                config['product_url'],
+                pool
+                )
+    finally:
+        if pool is not None:
+            log.info(f"🏊 Browser pool: {pool_stats(pool)}")
+            stop_browser_pool(pool)
     
     if success:
-        print("✅ Process completed!")
+        log.info("✅ Process completed!")
     else:
-        print("❌ Process failed!") 
+        log.error("❌ Process failed!")
@@ -0,0 +1,197 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from datetime import datetime
+from log_pipeline import get_logger, add_logging_args, configure_from_args
+
+log = get_logger('driver_cache')
+
+# Pinned chromedriver - looked up once by `python driver_cache.py refresh`, later starts only read this file
+DRIVER_CACHE_FILE = os.environ.get('CHECKOUT_DRIVER_CACHE', 'driver_cache.json')
+
+# Explicit chromedriver binary - used as is, no cache file and no lookup
+DRIVER_PATH = os.environ.get('CHECKOUT_CHROMEDRIVER')
+
+# chromedriver version to pin on refresh - default: the one matching the installed Chrome
+DRIVER_VERSION = os.environ.get('CHECKOUT_CHROMEDRIVER_VERSION')
+
+# Opt-in: let a start with nothing pinned look a driver up once (network) instead of failing
+# Default off - browser starts never touch the network, only `python driver_cache.py refresh` does
+DRIVER_BOOTSTRAP = os.environ.get('CHECKOUT_DRIVER_BOOTSTRAP', '0') == '1'
+
+class DriverNotCached(Exception):
+    """
+    No usable pinned chromedriver and downloading is not allowed
+    """
+
+def _usable(path):
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+def load_driver_pin(cache_file=DRIVER_CACHE_FILE):
+    """
+    Pinned driver record from the cache file - None when missing or unreadable
+    """
+    try:
+        with open(cache_file, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        log.warning(f'⚠️ Driver cache {cache_file} unreadable ({e}) - ignoring it')
+        return None
+
+def driver_binary_version(path):
+    """
+    Version reported by a chromedriver binary - None when it does not run
+    """
+    try:
+        output = subprocess.run([path, '--version'], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    # "ChromeDriver 120.0.6099.109 (3419140ab665596f21b385ce136419fde0924272-refs/branch-heads/6099@{#1483})"
+    parts = output.split()
+    return parts[1] if len(parts) > 1 else None
+
+def lookup_driver_path(version=None):
+    """
+    Ask webdriver-manager for a chromedriver - a network version lookup and maybe a download
+    This is what every browser start used to pay; only refresh (and the timing report) call it now
+    """
+    from webdriver_manager.chrome import ChromeDriverManager
+    return ChromeDriverManager(driver_version=version).install()
+
+def refresh_driver(cache_file=DRIVER_CACHE_FILE, version=DRIVER_VERSION):
+    """
+    Maintenance: look up / download chromedriver and pin it in the cache file
+    """
+    started = time.perf_counter()
+    path = lookup_driver_path(version)
+    pin = {
+        'driver_path': os.path.abspath(path),
+        'driver_version': driver_binary_version(path),
+        'requested_version': version,
+        'refreshed_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+    
+    tmp_path = f'{cache_file}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(pin, f, indent=2)
+    os.replace(tmp_path, cache_file)
+    
+    log.info(f"📌 chromedriver {pin['driver_version'] or '?'} pinned in {cache_file} ({time.perf_counter() - started:.2f}s)")
+    log.info(f"   {pin['driver_path']}")
+    return pin
+
+def resolve_driver_path(cache_file=DRIVER_CACHE_FILE, bootstrap=DRIVER_BOOTSTRAP):
+    """
+    chromedriver path for a browser start - never goes to the network
+    Order: CHECKOUT_CHROMEDRIVER, then the pinned path; DriverNotCached when neither is usable
+    bootstrap (CHECKOUT_DRIVER_BOOTSTRAP=1) allows a one-time refresh instead of failing
+    """
+    if DRIVER_PATH:
+        if not _usable(DRIVER_PATH):
+            raise DriverNotCached(f'CHECKOUT_CHROMEDRIVER={DRIVER_PATH} is not an executable file')
+        return DRIVER_PATH
+    
+    pin = load_driver_pin(cache_file)
+    if pin and _usable(pin.get('driver_path')):
+        return pin['driver_path']
+    
+    if pin:
+        log.warning(f"⚠️ Pinned chromedriver {pin.get('driver_path')} is gone")
+    if not bootstrap:
+        raise DriverNotCached(f'No usable chromedriver pinned in {cache_file} - run: python driver_cache.py refresh')
+    
+    log.warning('📥 No chromedriver pinned yet - looking one up once (later starts skip this)')
+    return refresh_driver(cache_file)['driver_path']
+
+def _launch_seconds(path):
+    """
+    Start and quit a bare headless Chrome with the given driver - seconds until the session was ready
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    
+    started = time.perf_counter()
+    driver = webdriver.Chrome(service=Service(path), options=options)
+    elapsed = time.perf_counter() - started
+    driver.quit()
+    return elapsed
+
+def report_cold_start(cache_file=DRIVER_CACHE_FILE, runs=3, launch=False):
+    """
+    Driver resolution time per start: webdriver-manager lookup (before) vs the pinned path (after)
+    launch also starts a headless Chrome each run, so the totals are the full cold start
+    """
+    results = {}
+    for label, resolve in (('lookup (before)', lookup_driver_path), ('pinned (after)', lambda: resolve_driver_path(cache_file, bootstrap=True))):
+        resolve_times = []
+        launch_times = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            path = resolve()
+            resolve_times.append(time.perf_counter() - started)
+            if launch:
+                launch_times.append(_launch_seconds(path))
+        
+        results[label] = {
+            'resolve_ms': sorted(resolve_times)[len(resolve_times) // 2] * 1000,
+            'launch_s': sorted(launch_times)[len(launch_times) // 2] if launch_times else None
+        }
+    
+    log.info(f'\n⏱️  Browser cold start (median of {runs})')
+    log.info(f"  {'driver':<16} {'resolve_ms':>10} {'launch_s':>9} {'total_s':>8}")
+    for label, result in results.items():
+        if result['launch_s'] is None:
+            log.info(f"  {label:<16} {result['resolve_ms']:>10.1f} {'-':>9} {'-':>8}")
+        else:
+            log.info(f"  {label:<16} {result['resolve_ms']:>10.1f} {result['launch_s']:>9.2f} {result['resolve_ms'] / 1000 + result['launch_s']:>8.2f}")
+    return results
+
+def show_driver_pin(cache_file=DRIVER_CACHE_FILE):
+    """
+    Print the pinned driver and whether it is still usable
+    """
+    pin = load_driver_pin(cache_file)
+    if not pin:
+        log.info(f'📭 Nothing pinned in {cache_file} - run: python driver_cache.py refresh')
+        return 1
+    
+    usable = _usable(pin.get('driver_path'))
+    log.info(f"📌 chromedriver {pin.get('driver_version') or '?'} pinned {pin.get('refreshed_at')}")
+    log.info(f"   {pin.get('driver_path')} {'✅' if usable else '❌ missing'}")
+    return 0 if usable else 1
+
+def main(argv=None):
+    """
+    Maintenance commands: refresh (look up + pin), show, timing
+    """
+    parser = argparse.ArgumentParser(description='Pinned chromedriver for offline browser starts')
+    parser.add_argument('command', choices=['refresh', 'show', 'timing'])
+    parser.add_argument('--cache-file', default=DRIVER_CACHE_FILE, help='pin file - env CHECKOUT_DRIVER_CACHE')
+    parser.add_argument('--version', default=DRIVER_VERSION, help='chromedriver version to pin - env CHECKOUT_CHROMEDRIVER_VERSION')
+    parser.add_argument('--runs', type=int, default=3, help='timing: starts per method')
+    parser.add_argument('--launch', action='store_true', help='timing: also launch headless Chrome each run')
+    add_logging_args(parser)
+    args = parser.parse_args(argv)
+    configure_from_args(args)
+    
+    if args.command == 'refresh':
+        refresh_driver(args.cache_file, args.version)
+        return 0
+    if args.command == 'show':
+        return show_driver_pin(args.cache_file)
+    report_cold_start(args.cache_file, args.runs, args.launch)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+import json
+import os
+import re
+import sys
+import glob
+import time
+import atexit
+import threading
+from datetime import datetime
+from log_pipeline import get_logger
+
+log = get_logger('history_store')
+
+# Append-only history - JSON lines split into size-rotated segments
+HISTORY_DIR = "history"
+SEGMENT_MAX_BYTES = 4 * 1024 * 1024
+MAX_SEGMENTS = 50
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 2.0
+
+SEGMENT_PATTERN = re.compile(r'^history-(\d{8}-\d{6})-\d+-\d+\.jsonl$')
+
+# Timestamped files written before the history store existed
+LEGACY_PATTERNS = {
+    'stock_check_*.json': 'stock_check',
+    'stock_found_*.json': 'stock_found',
+    'monitoring_summary_*.json': 'session_summary',
+    'payment_info_*.json': 'payment_info'
+}
+
+_history_store = None
+
+def open_history_store(directory=HISTORY_DIR, segment_max_bytes=SEGMENT_MAX_BYTES, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, max_segments=MAX_SEGMENTS):
+    """
+    Open an append-only history store - records are buffered and written in batches
+    """
+    os.makedirs(directory, exist_ok=True)
+    
+    return {
+        'directory': directory,
+        'segment_max_bytes': segment_max_bytes,
+        'batch_size': batch_size,
+        'flush_interval': flush_interval,
+        'max_segments': max_segments,
+        'buffer': [],
+        'lock': threading.Lock(),
+        'segment_path': None,
+        'segment_bytes': 0,
+        'segment_count': 0,
+        'last_flush': time.monotonic()
+    }
+
+def get_history_store():
+    """
+    Shared history store - opened on first use and flushed at exit
+    """
+    global _history_store
+    if _history_store is None:
+        _history_store = open_history_store()
+        atexit.register(flush_history, _history_store)
+    return _history_store
+
+def append_record(store, kind, record, ts=None, flush=False):
+    """
+    Buffer one record - written when the batch is full, the flush interval passed or flush=True
+    """
+    entry = {'ts': ts if ts is not None else time.time(), 'kind': kind}
+    entry.update(record)
+    line = json.dumps(entry, ensure_ascii=False, default=str) + '\n'
+    
+    with store['lock']:
+        store['buffer'].append(line)
+        due = (
+            flush or
+            len(store['buffer']) >= store['batch_size'] or
+            time.monotonic() - store['last_flush'] >= store['flush_interval']
+        )
+    
+    if due:
+        flush_history(store)
+
+def _new_segment_path(store):
+    """
+    Segment name carries its start time, pid and a counter - no collisions within the same second
+    """
+    store['segment_count'] += 1
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    return os.path.join(store['directory'], f"history-{stamp}-{os.getpid()}-{store['segment_count']}.jsonl")
+
+def _list_segments(directory):
+    """
+    Segment paths sorted oldest first
+    """
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory) if SEGMENT_PATTERN.match(name))
+    return [os.path.join(directory, name) for name in names]
+
+def flush_history(store):
+    """
+    Write buffered records to the current segment, rotating when it is full
+    """
+    with store['lock']:
+        lines = store['buffer']
+        store['buffer'] = []
+        store['last_flush'] = time.monotonic()
+        
+        if not lines:
+            return
+        
+        if store['segment_path'] is None or store['segment_bytes'] >= store['segment_max_bytes']:
+            store['segment_path'] = _new_segment_path(store)
+            store['segment_bytes'] = 0
+            _prune_segments(store)
+        
+        data = ''.join(lines).encode('utf-8')
+        with open(store['segment_path'], 'ab') as f:
+            f.write(data)
+        store['segment_bytes'] += len(data)
+
+def _prune_segments(store):
+    """
+    Keep at most max_segments segment files (including the one being opened) - oldest go first
+    """
+    segments = _list_segments(store['directory'])
+    for path in segments[:max(len(segments) - store['max_segments'] + 1, 0)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def iter_records(directory=HISTORY_DIR, kind=None, since=None, until=None):
+    """
+    Iterate stored records oldest first, optionally filtered by kind and time range
+    """
+    segments = _list_segments(directory)
+    
+    for path in segments:
+        try:
+            # Last write before since - nothing in this segment can match
+            if since is not None and os.path.getmtime(path) < since:
+                continue
+            
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    
+                    if kind is not None and record.get('kind') != kind:
+                        continue
+                    if since is not None and record.get('ts', 0) < since:
+                        continue
+                    if until is not None and record.get('ts', 0) > until:
+                        continue
+                    yield record
+        except OSError:
+            continue
+
+def availability_history(tag, hours=24, directory=HISTORY_DIR):
+    """
+    Availability samples and transitions for a product tag in the last N hours
+    available is None when unknown - an older price_change record with no earlier sample of its SKU
+    """
+    since = time.time() - hours * 3600
+    history = []
+    last_available = {}
+    
+    for record in iter_records(directory, since=since):
+        if record.get('tag') != tag or record.get('kind') not in ('stock_check', 'stock_event'):
+            continue
+        
+        gid = record.get('gid')
+        available = record.get('available')
+        if available is None:
+            # Events written before they carried availability - a restock / sold_out says it, a price change does not
+            available = {'restock': True, 'sold_out': False}.get(record.get('type'), last_available.get(gid))
+        last_available[gid] = available
+        
+        history.append({
+            'ts': record['ts'],
+            'kind': record['kind'],
+            'event': record.get('type'),
+            'gid': gid,
+            'available': available,
+            'sale_price': record.get('sale_price')
+        })
+    
+    return history
+
+def _legacy_timestamp(path):
+    """
+    Timestamp from a legacy file name like stock_check_20240101_120000.json
+    """
+    match = re.search(r'(\d{8}_\d{6})\.json$', path)
+    if not match:
+        return os.path.getmtime(path)
+    return datetime.strptime(match.group(1), '%Y%m%d_%H%M%S').timestamp()
+
+def migrate_legacy_files(source_dir='.', store=None, remove=False):
+    """
+    Import the old timestamped JSON files into the history store
+    Returns the number of migrated files
+    """
+    store = store or get_history_store()
+    
+    files = []
+    for pattern, kind in LEGACY_PATTERNS.items():
+        for path in glob.glob(os.path.join(source_dir, pattern)):
+            files.append((_legacy_timestamp(path), path, kind))
+    files.sort()
+    
+    migrated = 0
+    for ts, path, kind in files:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            log.warning(f'⚠️ Skipping {path}: {e}')
+            continue
+        
+        # stock_check files hold one result per product
+        records = payload if isinstance(payload, list) else [payload]
+        for record in records:
+            if not isinstance(record, dict):
+                record = {'value': record}
+            record = dict(record, migrated_from=os.path.basename(path))
+            append_record(store, kind, record, ts=ts)
+        
+        migrated += 1
+        if remove:
+            os.remove(path)
+    
+    flush_history(store)
+    log.info(f'✅ Migrated {migrated} legacy files into {store["directory"]}/')
+    return migrated
+
+def main():
+    """
+    History maintenance commands
+    python history_store.py migrate [source_dir] [--remove]
+    python history_store.py query <tag> [hours]
+    """
+    args = sys.argv[1:]
+    
+    if args and args[0] == 'migrate':
+        source_dir = args[1] if len(args) > 1 and not args[1].startswith('--') else '.'
+        migrate_legacy_files(source_dir, remove='--remove' in args)
+    
+    elif len(args) >= 2 and args[0] == 'query':
+        hours = float(args[2]) if len(args) > 2 else 24
+        history = availability_history(args[1], hours)
+        log.info(f'📜 {args[1]}: {len(history)} records in the last {hours:g}h')
+        for record in history:
+            stamp = datetime.fromtimestamp(record['ts']).strftime('%Y-%m-%d %H:%M:%S')
+            status = '❔ UNKNOWN' if record['available'] is None else '✅ AVAILABLE' if record['available'] else '❌ OUT OF STOCK'
+            event = f" ({record['event']})" if record['event'] else ''
+            log.info(f"  {stamp} {status}{event} | gid: {record['gid']} | price: {record['sale_price']}")
+    
+    else:
+        log.info(main.__doc__)
+
+if __name__ == "__main__":
+    main()
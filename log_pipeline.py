@@ -0,0 +1,168 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+# Every module logs under this root - levels and handlers are set once here
+ROOT_LOGGER = 'checkout_mi'
+
+# Defaults - override with STOCK_LOG_LEVEL / STOCK_LOG_FORMAT / STOCK_LOG_QUIET
+LOG_LEVEL = os.environ.get('STOCK_LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('STOCK_LOG_FORMAT', 'text')
+LOG_QUIET = os.environ.get('STOCK_LOG_QUIET', '0') == '1'
+
+# Bounded so a stalled terminal can never grow memory - records past the limit are dropped and counted
+LOG_QUEUE_SIZE = 10000
+
+_pipeline = {
+    'lock': threading.Lock(),
+    'queue': None,
+    'listener': None,
+    'handler': None,
+    'dropped': 0
+}
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Queue handler that never blocks the logging thread - a full queue drops the record
+    """
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _pipeline['dropped'] += 1
+
+class ConsoleHandler(logging.StreamHandler):
+    """
+    Stream handler that stays silent once the reading end of a pipe is gone
+    """
+    def handleError(self, record):
+        if isinstance(sys.exc_info()[1], BrokenPipeError):
+            return
+        super().handleError(record)
+
+class TextFormatter(logging.Formatter):
+    """
+    Message only - the same console output the scripts always printed
+    """
+    def format(self, record):
+        message = record.getMessage()
+        if record.exc_info:
+            message = f'{message}\n{self.formatException(record.exc_info)}'
+        return message
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line - ts, level, logger, msg and any extra fields=
+    """
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage().strip()
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def configure_logging(level=None, fmt=None, quiet=None, stream=None):
+    """
+    (Re)build the pipeline - records are queued on the calling thread and written by a listener thread
+    quiet keeps warnings, errors and restock alerts only
+    """
+    level = level or LOG_LEVEL
+    fmt = fmt or LOG_FORMAT
+    quiet = LOG_QUIET if quiet is None else quiet
+    
+    with _pipeline['lock']:
+        _stop_listener()
+        
+        log_queue = queue.Queue(LOG_QUEUE_SIZE)
+        output = ConsoleHandler(stream or sys.stdout)
+        output.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+        listener = QueueListener(log_queue, output, respect_handler_level=False)
+        listener.start()
+        
+        root = logging.getLogger(ROOT_LOGGER)
+        if _pipeline['handler'] is not None:
+            root.removeHandler(_pipeline['handler'])
+        handler = DroppingQueueHandler(log_queue)
+        root.addHandler(handler)
+        root.propagate = False
+        root.setLevel(logging.WARNING if quiet else level)
+        
+        _pipeline.update(queue=log_queue, listener=listener, handler=handler)
+
+def _stop_listener():
+    """
+    Stop the listener thread after it wrote everything already queued
+    """
+    if _pipeline['listener'] is not None:
+        _pipeline['listener'].stop()
+        _pipeline['listener'] = None
+
+def get_logger(name):
+    """
+    Logger for a module - the pipeline is configured from the environment on first use
+    """
+    if _pipeline['handler'] is None:
+        configure_logging()
+    return logging.getLogger(f'{ROOT_LOGGER}.{name}')
+
+def set_log_level(level):
+    """
+    Change the level at runtime - returns the previous level
+    """
+    root = logging.getLogger(ROOT_LOGGER)
+    previous = root.level
+    root.setLevel(level)
+    return previous
+
+def flush_logging():
+    """
+    Write everything queued so far - call before input() prompts and after a run
+    """
+    with _pipeline['lock']:
+        listener = _pipeline['listener']
+        if listener is None:
+            return
+        
+        # stop() drains the queue and joins the thread - then keep listening on the same queue
+        listener.stop()
+        listener.start()
+
+def dropped_records():
+    """
+    Records lost because the queue was full
+    """
+    return _pipeline['dropped']
+
+def add_logging_args(parser):
+    """
+    --log-level / --log-format / --quiet flags shared by every CLI
+    """
+    parser.add_argument('--log-level', default=LOG_LEVEL, choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], type=str.upper,
+                        help='log level - env STOCK_LOG_LEVEL')
+    parser.add_argument('--log-format', default=LOG_FORMAT, choices=['text', 'json'],
+                        help='text (console) or json (one object per line) - env STOCK_LOG_FORMAT')
+    parser.add_argument('--quiet', action='store_true', default=LOG_QUIET,
+                        help='warnings, errors and restock alerts only - env STOCK_LOG_QUIET=1')
+
+def configure_from_args(args):
+    """
+    Apply the flags added by add_logging_args
+    """
+    configure_logging(args.log_level, args.log_format, args.quiet)
+
+@atexit.register
+def _shutdown():
+    with _pipeline['lock']:
+        _stop_listener()
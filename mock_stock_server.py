@@ -0,0 +1,287 @@
+import json
+import time
+import hashlib
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from log_pipeline import get_logger
+
+log = get_logger('mock_stock_server')
+
+# Local stand-in for go.buy.mi.co.id /id/misc/getgoodsinformation
+API_PATH = '/id/misc/getgoodsinformation'
+
+def create_mock_state(latency='lognormal', latency_ms=80, latency_sigma=0.5, error_rate=0.0, rate_limit_rate=0.0, skus=3, padding_bytes=0, flip_after=None, timeline=None, etag=False, clock=time.time, slow_rate=0.0, slow_ms=3000, outages=None, missing_tags=()):
+    """
+    Mock server behaviour
+    latency: fixed | uniform | lognormal around latency_ms
+    error_rate / rate_limit_rate: fraction of requests answered 500 / 429 + Retry-After
+    flip_after: seconds after start when every tag goes out of stock -> in stock
+    timeline: tag -> [(seconds_after_start, available), ...] overrides flip_after per tag ('*' = every tag)
+    etag: send an ETag and answer If-None-Match with 304
+    slow_rate: fraction of requests that stall for slow_ms on top of the latency (tail latency)
+    outages: [(start, end), ...] seconds after start when every request is answered 503
+    missing_tags: tags always answered 404 (a product that was taken down)
+    """
+    return {
+        'latency': latency,
+        'latency_ms': latency_ms,
+        'latency_sigma': latency_sigma,
+        'error_rate': error_rate,
+        'rate_limit_rate': rate_limit_rate,
+        'skus': max(1, skus),
+        'padding': 'x' * padding_bytes,
+        'flip_after': flip_after,
+        'timeline': timeline or {},
+        'etag': etag,
+        'slow_rate': slow_rate,
+        'slow_ms': slow_ms,
+        'outages': outages or [],
+        'missing_tags': set(missing_tags),
+        'clock': clock,
+        'started_at': clock(),
+        'lock': threading.Lock(),
+        'requests': 0,
+        'errors': 0,
+        'slow': 0,
+        'outage_requests': 0,
+        'missing_requests': 0,
+        'not_modified': 0,
+        'first_seen_available': {}
+    }
+
+def sample_latency(state):
+    """
+    Simulated server time in seconds
+    """
+    base = state['latency_ms'] / 1000.0
+    
+    if state['latency'] == 'fixed':
+        return base
+    if state['latency'] == 'uniform':
+        return random.uniform(0, 2 * base)
+    return random.lognormvariate(0, state['latency_sigma']) * base
+
+def in_outage(state, now=None):
+    """
+    Whether the scripted outage windows cover the given time
+    """
+    now = state['clock']() if now is None else now
+    elapsed = now - state['started_at']
+    return any(start <= elapsed < end for start, end in state['outages'])
+
+def is_tag_available(state, tag, now=None):
+    """
+    Scripted availability of a tag at the given time
+    """
+    now = state['clock']() if now is None else now
+    elapsed = now - state['started_at']
+    
+    steps = state['timeline'].get(tag, state['timeline'].get('*'))
+    if steps is None:
+        if state['flip_after'] is None:
+            return False
+        steps = [(state['flip_after'], True)]
+    
+    available = False
+    for offset, step_available in sorted(steps):
+        if elapsed >= offset:
+            available = step_available
+    return available
+
+def cycle_timeline(tags, period, in_stock_for, duration):
+    """
+    Timeline where every tag restocks once per period for in_stock_for seconds, staggered across tags
+    """
+    timeline = {}
+    for index, tag in enumerate(tags):
+        offset = period * index / max(len(tags), 1)
+        steps = []
+        start = offset
+        while start < duration:
+            steps.append((start, True))
+            steps.append((start + in_stock_for, False))
+            start += period
+        timeline[tag] = steps
+    return timeline
+
+def flip_time(state, tag):
+    """
+    Absolute time (state clock) when the tag first becomes available, None if it never does
+    """
+    steps = state['timeline'].get(tag, state['timeline'].get('*'))
+    if steps is None:
+        steps = [] if state['flip_after'] is None else [(state['flip_after'], True)]
+    
+    for offset, available in sorted(steps):
+        if available:
+            return state['started_at'] + offset
+    return None
+
+def build_payload(state, tag, available):
+    """
+    getgoodsinformation-shaped payload - the first SKU follows the timeline
+    """
+    goods = []
+    for index in range(state['skus']):
+        item = {
+            'goods_id': str(4223700000 + index),
+            'goods_name': f'{tag} variant {index + 1}',
+            'is_cos': not available if index == 0 else True,
+            'market_price': '3999000',
+            'sale_price': '3499000'
+        }
+        if state['padding']:
+            item['description'] = state['padding']
+        goods.append(item)
+    
+    return {'code': 0, 'data': {'goodsinformation': goods}}
+
+class MockStockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    # Headers and body go out in separate writes - without TCP_NODELAY the body waits on a delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up on the request (deadline, or a hedge answered first)
+            self.close_connection = True
+    
+    def do_GET(self):
+        state = self.server.mock_state
+        parsed = urlparse(self.path)
+        
+        if parsed.path != API_PATH:
+            self._send(404, b'{"code": 404}')
+            return
+        
+        tag = parse_qs(parsed.query).get('tag', [''])[0]
+        
+        with state['lock']:
+            state['requests'] += 1
+        
+        if tag in state['missing_tags']:
+            with state['lock']:
+                state['missing_requests'] += 1
+            self._send(404, b'{"code": 404}')
+            return
+        
+        if in_outage(state):
+            with state['lock']:
+                state['outage_requests'] += 1
+            self._send(503, b'{"code": 503}')
+            return
+        
+        delay = sample_latency(state)
+        if state['slow_rate'] and random.random() < state['slow_rate']:
+            with state['lock']:
+                state['slow'] += 1
+            delay += state['slow_ms'] / 1000.0
+        time.sleep(delay)
+        
+        roll = random.random()
+        if roll < state['error_rate']:
+            with state['lock']:
+                state['errors'] += 1
+            self._send(500, b'{"code": 500}')
+            return
+        if roll < state['error_rate'] + state['rate_limit_rate']:
+            with state['lock']:
+                state['errors'] += 1
+            self._send(429, b'{"code": 429}', {'Retry-After': '1'})
+            return
+        
+        available = is_tag_available(state, tag)
+        if available:
+            with state['lock']:
+                state['first_seen_available'].setdefault(tag, state['clock']())
+        
+        body = json.dumps(build_payload(state, tag, available)).encode('utf-8')
+        if not state['etag']:
+            self._send(200, body)
+            return
+        
+        etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            with state['lock']:
+                state['not_modified'] += 1
+            self._send(304, b'', {'ETag': etag})
+            return
+        self._send(200, body, {'ETag': etag})
+
+def start_mock_server(port=0, **config):
+    """
+    Start the mock server in a background thread
+    Returns (server, api_url) - api_url is a STOCK_API_URL template with {tag}
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), MockStockHandler)
+    server.daemon_threads = True
+    server.mock_state = create_mock_state(**config)
+    
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    
+    api_url = f'http://127.0.0.1:{server.server_port}{API_PATH}?from=mobile&tag={{tag}}'
+    return server, api_url
+
+def main():
+    """
+    Run the mock server standalone - point stock_checker at it with STOCK_API_URL
+    """
+    parser = argparse.ArgumentParser(description='Local mock of the getgoodsinformation endpoint')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', choices=['fixed', 'uniform', 'lognormal'], default='lognormal')
+    parser.add_argument('--latency-ms', type=float, default=80)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--skus', type=int, default=3)
+    parser.add_argument('--padding-bytes', type=int, default=0)
+    parser.add_argument('--flip-after', type=float, default=None, help='seconds until every tag is in stock')
+    parser.add_argument('--etag', action='store_true', help='send ETags and answer If-None-Match with 304')
+    parser.add_argument('--slow-rate', type=float, default=0.0, help='fraction of requests that stall for --slow-ms')
+    parser.add_argument('--slow-ms', type=float, default=3000)
+    parser.add_argument('--outage', action='append', default=[], metavar='START:END',
+                        help='answer 503 between these seconds after start (repeatable)')
+    args = parser.parse_args()
+    
+    server, api_url = start_mock_server(
+        args.port,
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        skus=args.skus,
+        padding_bytes=args.padding_bytes,
+        flip_after=args.flip_after,
+        etag=args.etag,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        outages=[tuple(float(part) for part in outage.split(':')) for outage in args.outage]
+    )
+    
+    log.info(f'🧪 Mock stock API running on http://127.0.0.1:{server.server_port}{API_PATH}')
+    log.info(f'   STOCK_API_URL="{api_url}" python stock_checker.py')
+    
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        log.info('👋 Mock server stopped')
+
+if __name__ == "__main__":
+    main()
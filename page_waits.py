@@ -0,0 +1,265 @@
+import time
+import threading
+from collections import deque
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, WebDriverException
+from log_pipeline import get_logger
+
+log = get_logger('page_waits')
+
+# Timeout budget per purchase step (seconds) - a wait resolves as soon as its condition holds
+STEP_BUDGETS = {
+    'login': 8,
+    'product_page': 10,
+    'cookie_banner': 3,
+    'cookie_banner_gone': 2,
+    'cart': 10,
+    'checkout_page': 5,
+    'shipping': 10,
+    'payment': 10,
+    'checkbox': 10,
+    'pay_button': 10,
+    'payment_page': 15,
+    'settle': 1.5,
+    'selection': 1
+}
+DEFAULT_BUDGET = 10
+
+# How often polled conditions (URL, readyState, Python predicates) are re-checked
+POLL_INTERVAL = 0.05
+
+# A page counts as settled after this long without DOM mutations
+QUIET_MS = 150
+
+# Waits kept for the report - reset per purchase
+LEDGER_SIZE = 1000
+
+# True when an element matching arguments[0] is in state arguments[1] - present, visible or enabled
+ELEMENT_READY_FUNCTION = """
+function ready(selector, state) {
+    var elements = document.querySelectorAll(selector);
+    for (var i = 0; i < elements.length; i++) {
+        var el = elements[i];
+        if (state === 'present') return true;
+        var visible = !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+        if (state === 'visible' && visible) return true;
+        if (state === 'enabled' && visible && !el.disabled && el.getAttribute('aria-disabled') !== 'true') return true;
+    }
+    return false;
+}
+"""
+ELEMENT_READY_SCRIPT = ELEMENT_READY_FUNCTION + "return ready(arguments[0], arguments[1]);"
+
+# Resolves with true once the selector matches in the wanted state, false after timeoutMs
+# Checked on every DOM mutation instead of on a timer - fires in the same frame the element shows up
+ELEMENT_WAIT_SCRIPT = ELEMENT_READY_FUNCTION + """
+var selector = arguments[0], state = arguments[1], timeoutMs = arguments[2], done = arguments[arguments.length - 1];
+if (ready(selector, state)) { done(true); return; }
+var timer = null;
+var observer = new MutationObserver(function() {
+    if (ready(selector, state)) { observer.disconnect(); clearTimeout(timer); done(true); }
+});
+observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+timer = setTimeout(function() { observer.disconnect(); done(ready(selector, state)); }, timeoutMs);
+"""
+
+# Resolves once the DOM has had no mutations for quietMs (true) or after timeoutMs (false)
+DOM_QUIET_SCRIPT = """
+var quietMs = arguments[0], timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+var quietTimer = null, finished = false;
+function finish(result) {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearTimeout(quietTimer);
+    clearTimeout(limitTimer);
+    done(result);
+}
+var observer = new MutationObserver(function() {
+    clearTimeout(quietTimer);
+    quietTimer = setTimeout(function() { finish(true); }, quietMs);
+});
+observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+quietTimer = setTimeout(function() { finish(true); }, quietMs);
+var limitTimer = setTimeout(function() { finish(false); }, timeoutMs);
+"""
+
+_ledger = {
+    'lock': threading.Lock(),
+    'waits': deque(maxlen=LEDGER_SIZE)
+}
+
+def step_budget(name, budget=None):
+    """
+    Timeout budget of a step - explicit budget, else STEP_BUDGETS, else DEFAULT_BUDGET
+    """
+    if budget is not None:
+        return budget
+    return STEP_BUDGETS.get(name, DEFAULT_BUDGET)
+
+def _record(name, kind, replaces, waited, met):
+    with _ledger['lock']:
+        _ledger['waits'].append({'name': name, 'kind': kind, 'replaces': replaces, 'waited': waited, 'met': met})
+    if not met:
+        log.debug(f'   ⏳ {name}: {kind} condition not met within budget ({waited:.2f}s)')
+
+def note_removed_sleep(name, seconds):
+    """
+    Account for a fixed sleep that was dropped without a wait in its place
+    """
+    _record(name, 'removed', seconds, 0.0, True)
+
+def wait_for(driver, name, predicate, budget=None, replaces=0.0):
+    """
+    DOM predicate - predicate(driver) polled until truthy; returns that value, None when the budget runs out
+    """
+    started = time.perf_counter()
+    try:
+        result = WebDriverWait(driver, step_budget(name, budget), poll_frequency=POLL_INTERVAL,
+                               ignored_exceptions=(NoSuchElementException, StaleElementReferenceException)).until(predicate)
+    except TimeoutException:
+        result = None
+    _record(name, 'predicate', replaces, time.perf_counter() - started, result is not None)
+    return result
+
+def wait_for_url(driver, name, condition, budget=None, replaces=0.0):
+    """
+    URL change - condition(url) is True, or the URL contains one of the given strings
+    Returns the URL, None when the budget runs out
+    """
+    if not callable(condition):
+        fragments = (condition,) if isinstance(condition, str) else tuple(condition)
+        condition = lambda url: any(fragment in url for fragment in fragments)
+    
+    started = time.perf_counter()
+    try:
+        url = WebDriverWait(driver, step_budget(name, budget), poll_frequency=POLL_INTERVAL).until(
+            lambda d: d.current_url if condition(d.current_url) else None
+        )
+    except TimeoutException:
+        url = None
+    _record(name, 'url', replaces, time.perf_counter() - started, url is not None)
+    return url
+
+def wait_for_ready(driver, name, state='complete', budget=None, replaces=0.0):
+    """
+    document.readyState reached state ('interactive' also accepts 'complete')
+    """
+    accepted = ('interactive', 'complete') if state == 'interactive' else ('complete',)
+    started = time.perf_counter()
+    try:
+        WebDriverWait(driver, step_budget(name, budget), poll_frequency=POLL_INTERVAL).until(
+            lambda d: d.execute_script("return document.readyState") in accepted
+        )
+        met = True
+    except TimeoutException:
+        met = False
+    _record(name, 'ready', replaces, time.perf_counter() - started, met)
+    return met
+
+def _run_async(driver, budget, script, *args):
+    """
+    Run a promise-style script with a script timeout just past its own limit
+    The driver's own script timeout is put back afterwards
+    """
+    previous = driver.timeouts.script
+    driver.set_script_timeout(budget + 2)
+    try:
+        return driver.execute_async_script(script, *args)
+    finally:
+        driver.set_script_timeout(previous)
+
+def wait_for_element(driver, name, selector, state='present', budget=None, replaces=0.0):
+    """
+    CSS selector matching in state present / visible / enabled - MutationObserver-backed, no polling
+    Returns the first matching element, None when the budget runs out
+    A navigation during the wait aborts the script - the rest of the budget is polled instead
+    """
+    budget = step_budget(name, budget)
+    started = time.perf_counter()
+    try:
+        met = _run_async(driver, budget, ELEMENT_WAIT_SCRIPT, selector, state, int(budget * 1000))
+    except WebDriverException:
+        remaining = max(budget - (time.perf_counter() - started), 0)
+        try:
+            # Elements of the old document may be gone mid-check - a dead session still raises
+            WebDriverWait(driver, remaining, poll_frequency=POLL_INTERVAL,
+                          ignored_exceptions=(NoSuchElementException, StaleElementReferenceException)).until(
+                lambda d: d.execute_script(ELEMENT_READY_SCRIPT, selector, state)
+            )
+            met = True
+        except TimeoutException:
+            met = False
+    
+    element = None
+    if met:
+        elements = driver.find_elements(By.CSS_SELECTOR, selector)
+        element = elements[0] if elements else None
+    _record(name, 'mutation', replaces, time.perf_counter() - started, element is not None)
+    return element
+
+def wait_for_dom_quiet(driver, name='settle', quiet_ms=QUIET_MS, budget=None, replaces=0.0):
+    """
+    DOM stopped changing for quiet_ms - replaces "additional buffer" sleeps after content shows up
+    """
+    budget = step_budget(name, budget)
+    started = time.perf_counter()
+    try:
+        met = bool(_run_async(driver, budget, DOM_QUIET_SCRIPT, quiet_ms, int(budget * 1000)))
+    except WebDriverException:
+        met = False
+    _record(name, 'quiet', replaces, time.perf_counter() - started, met)
+    return met
+
+def scroll_into_view(driver, element, replaces=0.0):
+    """
+    Instant scroll to the element's centre - nothing to wait for, unlike a smooth scroll
+    """
+    driver.execute_script("arguments[0].scrollIntoView({block: 'center', inline: 'nearest'});", element)
+    if replaces:
+        note_removed_sleep('scroll', replaces)
+
+def reset_waits():
+    """
+    Start a new report - call at the start of a purchase
+    """
+    with _ledger['lock']:
+        _ledger['waits'].clear()
+
+def wait_report():
+    """
+    Fixed sleeps replaced vs time actually waited, in total and per step
+    """
+    with _ledger['lock']:
+        waits = list(_ledger['waits'])
+    
+    steps = {}
+    for entry in waits:
+        step = steps.setdefault(entry['name'], {'waits': 0, 'replaced_s': 0.0, 'waited_s': 0.0, 'timeouts': 0})
+        step['waits'] += 1
+        step['replaced_s'] += entry['replaces']
+        step['waited_s'] += entry['waited']
+        step['timeouts'] += not entry['met']
+    
+    replaced = sum(entry['replaces'] for entry in waits)
+    waited = sum(entry['waited'] for entry in waits)
+    return {
+        'waits': len(waits),
+        'replaced_s': round(replaced, 3),
+        'waited_s': round(waited, 3),
+        'idle_removed_s': round(replaced - waited, 3),
+        'timeouts': sum(not entry['met'] for entry in waits),
+        'steps': {name: {key: round(value, 3) if isinstance(value, float) else value for key, value in step.items()} for name, step in steps.items()}
+    }
+
+def log_wait_report():
+    """
+    Log the wait report - idle time removed compared to the fixed sleeps
+    """
+    report = wait_report()
+    log.info(f"🧹 Waits: {report['waits']} conditions, {report['waited_s']:.2f}s waited instead of {report['replaced_s']:.2f}s of fixed sleeps - {report['idle_removed_s']:.2f}s idle time removed ({report['timeouts']} budgets ran out)",
+             extra={'fields': {'event': 'wait_report', 'waited_s': report['waited_s'], 'replaced_s': report['replaced_s'], 'idle_removed_s': report['idle_removed_s']}})
+    for name, step in sorted(report['steps'].items(), key=lambda item: item[1]['replaced_s'] - item[1]['waited_s'], reverse=True):
+        log.debug(f"   {name:<20} {step['waited_s']:>6.2f}s waited / {step['replaced_s']:>6.2f}s fixed ({step['waits']} waits, {step['timeouts']} timeouts)")
+    return report
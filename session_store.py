@@ -0,0 +1,182 @@
+import os
+import json
+import time
+from datetime import datetime
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+from log_pipeline import get_logger
+
+log = get_logger('session_store')
+
+# Saved login (cookies + localStorage) - env CHECKOUT_SESSION_FILE, empty to never save or restore
+# Holds live auth cookies: written owner-only and kept out of git
+SESSION_FILE = os.environ.get('CHECKOUT_SESSION_FILE', 'session_state.json')
+
+# Domains whose cookies and origins whose localStorage are kept
+SESSION_COOKIE_DOMAINS = ('xiaomi.com', 'mi.co.id')
+SESSION_ORIGINS = ('https://account.xiaomi.com', 'https://www.mi.co.id')
+
+# Saved sessions older than this are not tried - a full login is cheaper than a doomed validation
+SESSION_MAX_AGE = float(os.environ.get('CHECKOUT_SESSION_MAX_AGE', 7 * 86400))
+
+# Logged in = serviceLogin redirects away instead of showing the login form
+VALIDATE_URL = "https://account.xiaomi.com/pass/serviceLogin"
+VALIDATE_TIMEOUT = 5
+
+# Cookie fields Network.setCookies accepts
+COOKIE_FIELDS = ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite', 'expires')
+
+# Runs before any page script on every document - fills localStorage once per origin per tab
+RESTORE_STORAGE_SCRIPT = """
+(function(saved) {
+    var items = saved[location.origin];
+    if (!items || sessionStorage.getItem('__session_restored')) return;
+    for (var key in items) {
+        if (localStorage.getItem(key) === null) localStorage.setItem(key, items[key]);
+    }
+    sessionStorage.setItem('__session_restored', '1');
+})(%s);
+"""
+
+def _matches_domain(domain):
+    domain = domain.lstrip('.')
+    return any(domain == kept or domain.endswith('.' + kept) for kept in SESSION_COOKIE_DOMAINS)
+
+def load_session(username, path=SESSION_FILE):
+    """
+    Saved session of this account - None when missing, unreadable, for another account or too old
+    """
+    if not path:
+        return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        log.warning(f'⚠️ Session file {path} unreadable ({e}) - ignoring it')
+        return None
+    
+    if state.get('username') != username:
+        return None
+    if time.time() - state.get('saved_ts', 0) > SESSION_MAX_AGE:
+        log.info(f"🕰️ Saved session from {state.get('saved_at')} is too old - logging in")
+        return None
+    return state
+
+def save_session(driver, username, path=SESSION_FILE):
+    """
+    Save cookies of the Xiaomi domains plus localStorage of the current page's origin
+    localStorage of other origins is kept from the previous save - no extra navigation needed
+    """
+    if not path:
+        return False
+    
+    try:
+        cookies = driver.execute_cdp_cmd('Network.getAllCookies', {})['cookies']
+    except Exception as e:
+        log.debug(f'   ⚠️ CDP cookies unavailable ({str(e)[:50]}) - saving current domain only')
+        cookies = driver.get_cookies()
+    
+    previous = load_session(username, path) or {}
+    storage = dict(previous.get('local_storage', {}))
+    try:
+        origin = driver.execute_script('return location.origin')
+        if origin in SESSION_ORIGINS:
+            storage[origin] = driver.execute_script(
+                'var items = {}; for (var i = 0; i < localStorage.length; i++) { var key = localStorage.key(i); items[key] = localStorage.getItem(key); } return items;')
+    except Exception as e:
+        log.debug(f'   ⚠️ localStorage not saved: {str(e)[:50]}')
+    
+    state = {
+        'username': username,
+        'saved_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'saved_ts': time.time(),
+        'cookies': [{field: cookie[field] for field in COOKIE_FIELDS if field in cookie} for cookie in cookies if _matches_domain(cookie.get('domain', ''))],
+        'local_storage': storage
+    }
+    
+    tmp_path = f'{path}.tmp'
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+    log.debug(f"   💾 Session saved ({len(state['cookies'])} cookies, localStorage for {len(storage)} origins)")
+    return True
+
+def restore_session(driver, state):
+    """
+    Put saved cookies and localStorage into the browser without loading any page
+    Returns what was installed - pass it to discard_restored_session when validation fails
+    """
+    now = time.time()
+    cookies = []
+    for cookie in state.get('cookies', []):
+        expires = cookie.get('expires', -1)
+        if expires is not None and 0 < expires < now:
+            continue
+        if expires is None or expires <= 0:
+            # Session cookie - no expiry field
+            cookie = {field: value for field, value in cookie.items() if field != 'expires'}
+        cookies.append(cookie)
+    
+    driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies})
+    script = None
+    if state.get('local_storage'):
+        script = driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': RESTORE_STORAGE_SCRIPT % json.dumps(state['local_storage'])})['identifier']
+    return {'cookies': len(cookies), 'script': script}
+
+def discard_restored_session(driver, restored):
+    """
+    Take an expired session back out so the full login starts clean
+    """
+    try:
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        if restored and restored['script']:
+            driver.execute_cdp_cmd('Page.removeScriptToEvaluateOnNewDocument', {'identifier': restored['script']})
+        driver.execute_script('window.localStorage.clear();')
+    except Exception as e:
+        log.debug(f'   ⚠️ Restored session not fully cleared: {str(e)[:50]}')
+
+def session_valid(driver):
+    """
+    One round trip - serviceLogin redirects a logged-in browser away, an expired session gets the login form
+    """
+    driver.get(VALIDATE_URL)
+    try:
+        WebDriverWait(driver, VALIDATE_TIMEOUT).until(
+            lambda d: 'serviceLogin' not in d.current_url or d.find_elements(By.NAME, 'account')
+        )
+    except TimeoutException:
+        return False
+    return 'serviceLogin' not in driver.current_url
+
+def restore_or_login(driver, username, password, login):
+    """
+    Log in with the saved session when it is still valid, else login(driver, username, password) and save the new one
+    Returns (logged_in, how) - how is 'restored' or 'login'
+    """
+    started = time.perf_counter()
+    state = load_session(username)
+    if state:
+        restored = None
+        try:
+            restored = restore_session(driver, state)
+            if session_valid(driver):
+                log.info(f"✅ Saved session restored ({restored['cookies']} cookies from {state['saved_at']}) - validated in {time.perf_counter() - started:.2f}s")
+                return True, 'restored'
+            log.info('🔑 Saved session expired - logging in')
+        except Exception as e:
+            log.warning(f'⚠️ Session restore failed ({str(e)[:60]}) - logging in')
+        discard_restored_session(driver, restored)
+    
+    if not login(driver, username, password):
+        return False, 'login'
+    
+    try:
+        save_session(driver, username)
+    except OSError as e:
+        log.warning(f'⚠️ Session not saved: {e}')
+    log.info(f'🔐 Logged in in {time.perf_counter() - started:.2f}s')
+    return True, 'login'
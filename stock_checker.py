@@ -1,16 +1,49 @@
-import requests
 import json
 import time
 import os
+import signal
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 from datetime import datetime
 import sys
+import logging
+
+from history_store import get_history_store, append_record, flush_history
+import stock_metrics
+import stock_series
+from stock_series import product_state_key
+from alert_dispatch import (
+    create_alert_dispatcher, enqueue_alert, stop_alert_dispatcher, dispatcher_stats,
+    console_sink, sound_sink, webhook_sink, file_drop_sink, history_flush_sink
+)
+import stock_client
+from stock_client import (
+    STOCK_POOL_SIZE,
+    create_stock_session, get_stock_session, get_session_stats, get_hedge_stats, get_breaker_stats,
+    extract_product_tag, extract_product_gid, emit_line,
+    select_goods, fetch_goods_information,
+    create_poll_schedule, record_poll_success, record_poll_cut, record_poll_failure, due_poll_tags
+)
+from log_pipeline import get_logger, flush_logging, add_logging_args, configure_from_args
+
+log = get_logger('stock_checker')
+
+# Concurrent round defaults - keep PER_HOST_LIMIT <= STOCK_POOL_SIZE so connections stay pooled
+ROUND_MAX_WORKERS = 8
+PER_HOST_LIMIT = 4
+
+# Round clock - what to do when a round overruns its interval ('skip' or 'catch_up')
+OVERRUN_POLICY = 'skip'
+MAX_CATCH_UP_TICKS = 3
 
 def load_urls_from_file(filename="url.txt"):
     """
     Load URLs from url.txt file - one URL per line
     """
     if not os.path.exists(filename):
-        print(f"❌ File {filename} not found!")
+        log.error(f"❌ File {filename} not found!")
         return []
     
     urls = []
@@ -22,314 +55,931 @@ def load_urls_from_file(filename="url.txt"):
                     if line.startswith('http'):
                         urls.append(line)
                     else:
-                        print(f"⚠️ Line {line_num}: Invalid URL format - {line}")
+                        log.warning(f"⚠️ Line {line_num}: Invalid URL format - {line}")
         
-        print(f"✅ Loaded {len(urls)} URLs from {filename}")
+        log.info(f"✅ Loaded {len(urls)} URLs from {filename}")
         return urls
-        
+    
     except Exception as e:
-        print(f"❌ Error reading {filename}: {e}")
+        log.error(f"❌ Error reading {filename}: {e}")
         return []
 
-def extract_product_tag(product_url):
+def build_watchlist(urls):
     """
-    Extract product tag from Xiaomi URL
-    URL format: https://www.mi.co.id/id/product/redmi-13x/?skupanel=1&gid=4223716725
+    Compile URLs into a watchlist index once at load time
+    tags: product tag -> list of entries (product_number, url, gid) that share it
     """
-    try:
-        if '/product/' not in product_url:
-            print('❌ Invalid product URL format')
-            return None
-            
-        # Extract tag between /product/ and /
-        url_parts = product_url.split('/product/')
-        if len(url_parts) < 2:
-            print('❌ Cannot extract product tag from URL')
-            return None
-            
-        tag = url_parts[1].split('/')[0].split('?')[0]
-        return tag
+    watchlist = {
+        'urls': list(urls),
+        'tags': {}
+    }
+    
+    for i, url in enumerate(urls, 1):
+        tag = extract_product_tag(url)
+        if not tag:
+            log.warning(f'⚠️ Product {i}: skipped, no product tag in {url}')
+            continue
         
-    except Exception as e:
-        print(f'❌ Error extracting product tag: {e}')
+        watchlist['tags'].setdefault(tag, []).append({
+            'product_number': i,
+            'url': url,
+            'gid': extract_product_gid(url)
+        })
+    
+    return watchlist
+
+def _as_watchlist(urls):
+    """
+    Accept either a compiled watchlist or a plain URL list
+    """
+    if isinstance(urls, dict):
+        return urls
+    return build_watchlist(urls)
+
+def _file_signature(path):
+    """
+    (mtime, size) of a file - None when it cannot be read
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
         return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def create_file_watch(path):
+    """
+    Remember the current version of a file - file_changed polls it for edits
+    """
+    return {'path': path, 'signature': _file_signature(path)}
+
+def file_changed(watch):
+    """
+    True once per edit of the watched file - a missing file counts as unchanged
+    """
+    signature = _file_signature(watch['path'])
+    if signature is None or signature == watch['signature']:
+        return False
+    watch['signature'] = signature
+    return True
+
+def diff_watchlists(old, new):
+    """
+    Tags added, removed, or whose URL entries changed between two watchlists
+    """
+    old_tags = old['tags']
+    new_tags = new['tags']
+    return {
+        'added': [tag for tag in new_tags if tag not in old_tags],
+        'removed': [tag for tag in old_tags if tag not in new_tags],
+        'changed': [tag for tag in new_tags if tag in old_tags and new_tags[tag] != old_tags[tag]]
+    }
+
+def apply_watchlist_diff(watchlist, new_watchlist, schedule, state_table, now, base_interval, session=None, series=None):
+    """
+    Switch a live watchlist to new_watchlist in place
+    New tags are due at now, removed tags leave the schedule, state, series and metrics
+    Unchanged tags keep their schedule (including backoff) and product state
+    """
+    diff = diff_watchlists(watchlist, new_watchlist)
+    
+    for tag in diff['removed']:
+        schedule.pop(tag, None)
+        stock_client.forget_tag(tag, session)
+    schedule.update(create_poll_schedule(diff['added'], base_interval, now))
+    
+    # SKUs no longer referenced by any URL lose their state
+    live_keys = {product_state_key(tag, entry['gid']) for tag, entries in new_watchlist['tags'].items() for entry in entries}
+    for key in [key for key in state_table if key not in live_keys]:
+        del state_table[key]
+    if series is not None:
+        stock_series.prune_series(series, live_keys)
+    
+    watchlist['urls'] = new_watchlist['urls']
+    watchlist['tags'] = new_watchlist['tags']
+    return diff
+
+def reload_watchlist_file(path, watchlist, schedule, state_table, now, base_interval, session=None, series=None):
+    """
+    Re-read the URL file and apply the difference to the running monitor
+    An empty or unreadable file keeps the current watchlist (editors often truncate before writing)
+    """
+    urls = load_urls_from_file(path)
+    if not urls:
+        log.warning(f'⚠️ {path} has no valid URLs - keeping the current watchlist')
+        return None
+    
+    diff = apply_watchlist_diff(watchlist, build_watchlist(urls), schedule, state_table, now, base_interval, session, series)
+    log.info(f"🔁 {path} reloaded: +{len(diff['added'])} / -{len(diff['removed'])} / ~{len(diff['changed'])} tags, {len(urls)} products",
+             extra={'fields': dict(diff, event='watchlist_reload')})
+    return diff
+
+def report_goods_availability(goods_map, gid=None, prefix='', output=None):
+    """
+    Print product info for the selected SKU and return whether it is available
+    """
+    product_info = select_goods(goods_map, gid)
+    if product_info is None:
+        emit_line(output, f'❌ {prefix}No SKU information in response', logging.WARNING)
+        return False
+    
+    if gid and gid not in goods_map:
+        emit_line(output, f'⚠️ {prefix}gid {gid} not in response, using first SKU', logging.WARNING)
+    
+    emit_line(output, f'📦 {prefix}Product: {product_info["goods_name"]}', logging.DEBUG)
+    emit_line(output, f'💰 {prefix}Market Price: {product_info["market_price"]}', logging.DEBUG)
+    emit_line(output, f'💸 {prefix}Sale Price: {product_info["sale_price"]}', logging.DEBUG)
+    
+    if product_info['available']:
+        emit_line(output, f'✅ {prefix}STOCK AVAILABLE! (is_cos: False)')
+        return True
+    
+    emit_line(output, f'❌ {prefix}OUT OF STOCK (is_cos: {product_info["is_cos"]})')
+    return False
 
-def check_stock_single(product_url, product_index=None):
+def check_stock_single(product_url, product_index=None, session=None, output=None):
     """
     Check stock availability once via API
+    The gid in the URL selects which SKU decides availability
+    Pass an output list to buffer the log lines instead of printing them
     """
-    try:
-        # Extract product tag from URL
-        tag = extract_product_tag(product_url)
-        if not tag:
-            return False
+    prefix = f'[{product_index}] ' if product_index else ''
+    
+    # Extract product tag from URL
+    tag = extract_product_tag(product_url)
+    if not tag:
+        return False
+    
+    goods_map = fetch_goods_information(tag, session, output, prefix)['goods']
+    if goods_map is None:
+        return False
+    
+    return report_goods_availability(goods_map, extract_product_gid(product_url), prefix, output)
+
+def create_tick_clock(interval, now, overrun_policy=OVERRUN_POLICY):
+    """
+    Fixed-cadence round clock on time.monotonic() deadlines
+    Rounds start at now, now + interval, now + 2 * interval ... no matter how long they take
+    """
+    if overrun_policy not in ('skip', 'catch_up'):
+        raise ValueError(f"Unknown overrun policy: {overrun_policy}")
+    
+    return {
+        'interval': interval,
+        'next_tick': now,
+        'policy': overrun_policy,
+        'overruns': 0,
+        'skipped_ticks': 0
+    }
+
+def advance_tick_clock(clock, tick, now):
+    """
+    Move to the deadline after tick and apply the overrun policy
+    skip: drop the deadlines already missed, catch_up: run missed deadlines back to back
+    Returns how far the round overran its interval in seconds (0 when on time)
+    """
+    interval = clock['interval']
+    clock['next_tick'] = tick + interval
+    
+    overrun = now - clock['next_tick']
+    if overrun <= 0:
+        return 0.0
+    
+    clock['overruns'] += 1
+    missed = int(overrun // interval) + 1
+    
+    if clock['policy'] == 'skip':
+        skipped = missed
+    else:
+        # Never fall more than MAX_CATCH_UP_TICKS behind the cadence
+        skipped = max(missed - MAX_CATCH_UP_TICKS, 0)
+    
+    clock['skipped_ticks'] += skipped
+    clock['next_tick'] += skipped * interval
+    return overrun
+
+def run_check_round(watchlist, session=None, max_workers=ROUND_MAX_WORKERS, per_host_limit=PER_HOST_LIMIT, tags=None, round_budget=None):
+    """
+    Check the watchlist concurrently with a bounded worker pool
+    Exactly one request per unique tag - the result is fanned out to every URL of that tag
+    Output is printed per tag in watchlist order as soon as each tag is done
+    Pass tags to check only part of the watchlist (e.g. the tags that are due)
+    round_budget (seconds) is a deadline shared by every request of the round - late tags fail as 'deadline' / 'budget'
+    It is raised to stock_client.budget_floor so an API slower than the budget still gets its answers through
+    """
+    watchlist = _as_watchlist(watchlist)
+    session = session or get_stock_session()
+    total_products = len(watchlist['urls'])
+    deadline = time.monotonic() + max(round_budget, stock_client.budget_floor(session)) if round_budget else None
+    
+    # Every stock check goes to the same API host - one slot limit per host
+    api_host = urlparse(stock_client.STOCK_API_URL).netloc
+    host_slots = {api_host: threading.BoundedSemaphore(per_host_limit)}
+    
+    def check_one(tag, entries):
+        numbers = ','.join(str(entry['product_number']) for entry in entries)
+        output = [(logging.DEBUG, f'\n🔍 Product {numbers}/{total_products}:'), (logging.DEBUG, '-' * 25)]
+        with host_slots[api_host]:
+            started = time.perf_counter()
+            fetch = fetch_goods_information(tag, session, output, f'[{numbers}] ', deadline)
+            elapsed = time.perf_counter() - started
+        goods_map = fetch['goods']
+        
+        # One response answers every SKU - each entry's gid selects its own
+        checked_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        results = []
+        for entry in entries:
+            is_available = False
+            product_info = None
+            if goods_map is not None:
+                is_available = report_goods_availability(goods_map, entry['gid'], f"[{entry['product_number']}] ", output)
+                product_info = select_goods(goods_map, entry['gid'])
             
-        # Xiaomi stock API endpoint
-        stock_api_url = f"https://go.buy.mi.co.id/id/misc/getgoodsinformation?from=mobile&tag={tag}"
+            results.append({
+                'product_number': entry['product_number'],
+                'tag': tag,
+                'gid': entry['gid'],
+                'url': entry['url'],
+                'ok': product_info is not None,
+                'available': is_available,
+                'goods_name': product_info['goods_name'] if product_info else None,
+                'market_price': product_info['market_price'] if product_info else None,
+                'sale_price': product_info['sale_price'] if product_info else None,
+                'unchanged': fetch['unchanged'] is not None,
+                'elapsed': round(elapsed, 4),
+                'checked_at': checked_at
+            })
+        return results, output, elapsed, fetch
+    
+    round_started = time.perf_counter()
+    results = []
+    fetches = {}
+    request_time = 0.0
+    
+    if tags is None:
+        tags = list(watchlist['tags'])
+    
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [(tag, executor.submit(check_one, tag, watchlist['tags'][tag])) for tag in tags]
         
-        headers = {
-            'accept': '*/*',
-            'accept-language': 'en-US,en;q=0.9',
-            'cache-control': 'no-cache',
-            'content-type': 'application/x-www-form-urlencoded; charset=UTF-8',
-            'origin': 'https://www.mi.co.id',
-            'pragma': 'no-cache',
-            'priority': 'u=1, i',
-            'referer': 'https://www.mi.co.id/id/product/redmi-13x/',
-            'sec-ch-ua': '"Google Chrome";v="137", "Chromium";v="137", "Not/A)Brand";v="24"',
-            'sec-ch-ua-mobile': '?1',
-            'sec-ch-ua-platform': '"Android"',
-            'sec-fetch-dest': 'empty',
-            'sec-fetch-mode': 'cors',
-            'sec-fetch-site': 'same-site',
-            'user-agent': 'Mozilla/5.0 (Linux; Android 8.0.0; SM-G955U Build/R16NW) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Mobile Safari/537.36'
-        }
+        # Collect in submission order to keep output ordered per product
+        for tag, future in futures:
+            tag_results, output, elapsed, fetch = future.result()
+            for level, line in output:
+                log.log(level, line)
+            results.extend(tag_results)
+            fetches[tag] = fetch
+            request_time += elapsed
+    
+    results.sort(key=lambda result: result['product_number'])
+    wall_time = time.perf_counter() - round_started
+    
+    return {
+        'results': results,
+        'fetches': fetches,
+        'requests': len(fetches),
+        'wall_time': wall_time,
+        'request_time': request_time
+    }
+
+def update_stock_state(state_table, results, checked_at):
+    """
+    Apply a round's results to the in-memory state table
+    Only transitions become events: restock (out -> in), sold_out (in -> out), price_change
+    Failed checks leave the state untouched
+    """
+    events = []
+    seen = {}
+    
+    for result in results:
+        if not result['ok']:
+            continue
         
-        prefix = f'[{product_index}] ' if product_index else ''
-        print(f'🔍 {prefix}Checking product: {tag}')
+        key = product_state_key(result['tag'], result['gid'])
+        if key in seen:
+            # Same SKU referenced by several URLs - one state, one event
+            seen[key]['product_numbers'].append(result['product_number'])
+            continue
         
-        response = requests.get(stock_api_url, headers=headers, timeout=10)
+        state = state_table.get(key)
+        event = None
         
-        if response.status_code == 200:
-            try:
-                stock_data = response.json()
-                
-                # Parse JSON directly - access nested structure
-                is_cos = str(stock_data['data']['goodsinformation'][0]['is_cos'])
-                product_name = stock_data['data']['goodsinformation'][0].get('goods_name', 'Unknown Product')
-                
-                # Get additional product info
-                product_info = stock_data['data']['goodsinformation'][0]
-                market_price = product_info.get('market_price', 'N/A')
-                sale_price = product_info.get('sale_price', 'N/A')
-                
-                print(f'📦 {prefix}Product: {product_name}')
-                print(f'💰 {prefix}Market Price: {market_price}')
-                print(f'💸 {prefix}Sale Price: {sale_price}')
-                
-                if is_cos == "False":
-                    print(f'✅ {prefix}STOCK AVAILABLE! (is_cos: False)')
-                    return True
-                else:
-                    print(f'❌ {prefix}OUT OF STOCK (is_cos: {is_cos})')
-                    return False
-                
-            except (json.JSONDecodeError, KeyError, IndexError) as e:
-                print(f'❌ {prefix}JSON parsing error: {str(e)}')
-                return False
+        if state is not None and result.get('unchanged'):
+            # Same bytes as the response this state came from - nothing to diff
+            state['last_checked'] = checked_at
+            seen[key] = {'product_numbers': []}
+            continue
+        
+        if state is None:
+            state = {
+                'tag': result['tag'],
+                'gid': result['gid'],
+                'url': result['url'],
+                'available': result['available'],
+                'goods_name': result['goods_name'],
+                'market_price': result['market_price'],
+                'sale_price': result['sale_price'],
+                'since': checked_at,
+                'last_checked': checked_at,
+                'restocks': 0
+            }
+            state_table[key] = state
+            
+            # Already in stock on the first check - still worth one alert
+            if result['available']:
+                state['restocks'] += 1
+                event = 'restock'
         else:
-            print(f'❌ {prefix}HTTP Error: {response.status_code}')
-            return False
+            previous_sale_price = state['sale_price']
+            previous_market_price = state['market_price']
             
-    except requests.exceptions.RequestException as e:
-        print(f'❌ {prefix}Request failed: {str(e)}')
-        return False
-    except Exception as e:
-        print(f'❌ {prefix}Unexpected error: {e}')
-        return False
+            if result['available'] != state['available']:
+                event = 'restock' if result['available'] else 'sold_out'
+                state['since'] = checked_at
+                if result['available']:
+                    state['restocks'] += 1
+            elif (result['sale_price'], result['market_price']) != (previous_sale_price, previous_market_price):
+                event = 'price_change'
+            
+            state.update({
+                'available': result['available'],
+                'goods_name': result['goods_name'],
+                'market_price': result['market_price'],
+                'sale_price': result['sale_price'],
+                'last_checked': checked_at
+            })
+        
+        if event:
+            seen[key] = {
+                'type': event,
+                'key': key,
+                'tag': result['tag'],
+                'gid': result['gid'],
+                'available': result['available'],
+                'product_numbers': [result['product_number']],
+                'goods_name': result['goods_name'],
+                'sale_price': result['sale_price'],
+                'market_price': result['market_price'],
+                'at': checked_at
+            }
+            if event == 'price_change':
+                seen[key]['previous_sale_price'] = previous_sale_price
+            events.append(seen[key])
+        else:
+            seen[key] = {'product_numbers': []}
+    
+    return events
 
-def check_all_urls_once(urls):
+def in_stock_products(state_table):
+    """
+    Keys of the products currently in stock according to the state table
+    """
+    return [key for key, state in state_table.items() if state['available']]
+
+def print_round_timing(round_result):
+    """
+    Show round wall time versus the sequential sum of request times
+    """
+    wall_time = round_result['wall_time']
+    request_time = round_result['request_time']
+    speedup = request_time / wall_time if wall_time > 0 else 0.0
+    log.info(f'⚡ Round time: {wall_time:.2f}s | Requests: {round_result["requests"]} | Sum of requests: {request_time:.2f}s | Speedup: x{speedup:.1f}',
+             extra={'fields': {'wall_time': round(wall_time, 4), 'requests': round_result['requests'], 'request_time': round(request_time, 4)}})
+
+def check_all_urls_once(urls, session=None, max_workers=ROUND_MAX_WORKERS, per_host_limit=PER_HOST_LIMIT):
     """
     Check stock status for all URLs once
+    urls can be a plain URL list or a watchlist from build_watchlist
     """
-    print('📦 CHECKING ALL PRODUCTS ONCE')
-    print('=' * 40)
+    watchlist = _as_watchlist(urls)
+    urls = watchlist['urls']
+    session = session or get_stock_session()
     
-    results = []
-    available_products = []
+    log.info('📦 CHECKING ALL PRODUCTS ONCE')
+    log.info('=' * 40)
     
-    for i, url in enumerate(urls, 1):
-        print(f'\n🔍 Product {i}/{len(urls)}:')
-        print('-' * 25)
-        
-        is_available = check_stock_single(url, i)
-        
-        result = {
-            'product_number': i,
-            'url': url,
-            'available': is_available,
-            'checked_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        results.append(result)
-        
-        if is_available:
-            available_products.append(i)
+    round_result = run_check_round(watchlist, session, max_workers, per_host_limit)
+    results = round_result['results']
+    available_products = [result['product_number'] for result in results if result['available']]
     
     # Summary
-    print('\n📊 STOCK CHECK SUMMARY')
-    print('=' * 30)
+    log.info('\n📊 STOCK CHECK SUMMARY')
+    log.info('=' * 30)
     
     for result in results:
         status = '✅ AVAILABLE' if result['available'] else '❌ OUT OF STOCK'
-        print(f"Product {result['product_number']}: {status}")
+        log.info(f"Product {result['product_number']}: {status}")
     
     available_count = len(available_products)
-    print(f'\n📈 Available: {available_count}/{len(urls)} products')
+    log.info(f'\n📈 Available: {available_count}/{len(urls)} products')
     
     if available_products:
-        print(f'🎉 Available products: {", ".join(map(str, available_products))}')
+        log.info(f'🎉 Available products: {", ".join(map(str, available_products))}')
+    
+    print_round_timing(round_result)
+    stats = get_session_stats(session)
+    log.info(f"🔌 Connections: {stats['connections_opened']} opened for {stats['requests']} requests (reuse: {stats['reuse_rate']:.0%})")
     
     # Save results
-    filename = f"stock_check_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(filename, 'w') as f:
-        json.dump(results, f, indent=2)
-    print(f'💾 Results saved to: {filename}')
+    history = get_history_store()
+    for result in results:
+        append_record(history, 'stock_check', result)
+    flush_history(history)
+    log.info(f"💾 Results saved to history: {history['directory']}/")
     
     return results
 
-def monitor_all_urls_continuous(urls, check_interval=5):
+def _system_wait(timeout, stop_event=None):
+    """
+    Sleep for timeout seconds - returns True when stop_event was set meanwhile
+    """
+    if stop_event is None:
+        time.sleep(timeout)
+        return False
+    return stop_event.wait(timeout)
+
+# Time source of the monitor - swap in create_sim_clock() to run simulated days in minutes
+SYSTEM_CLOCK = {
+    'monotonic': time.monotonic,
+    'time': time.time,
+    'wait': _system_wait
+}
+
+def create_sim_clock():
+    """
+    Accelerated clock for soak tests - waits return at once and move the clock forward instead
+    Work between waits (requests, parsing) still takes real time
+    """
+    sim = {'offset': 0.0}
+    
+    def wait(timeout, stop_event=None):
+        sim['offset'] += timeout
+        return stop_event is not None and stop_event.is_set()
+    
+    sim.update(
+        monotonic=lambda: time.monotonic() + sim['offset'],
+        time=lambda: time.time() + sim['offset'],
+        wait=wait
+    )
+    return sim
+
+def _wait_until(deadline, stop_event=None, time_source=SYSTEM_CLOCK):
+    """
+    Sleep until a monotonic deadline - returns True when stop_event was set meanwhile
+    """
+    timeout = max(deadline - time_source['monotonic'](), 0)
+    return time_source['wait'](timeout, stop_event)
+
+def write_heartbeat(path, status):
+    """
+    Atomically rewrite the heartbeat file - supervisors check its age for liveness
+    """
+    heartbeat = {
+        'pid': os.getpid(),
+        'updated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'timestamp': time.time()
+    }
+    heartbeat.update(status)
+    
+    try:
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(heartbeat, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        log.warning(f'⚠️ Heartbeat write failed: {e}')
+
+def install_stop_handlers(stop_event):
+    """
+    SIGTERM (and SIGHUP where available) set stop_event so the monitor flushes its summary and exits
+    """
+    def request_stop(signum, frame):
+        log.warning(f'\n⏹️  Received signal {signum} - stopping after the current round...')
+        stop_event.set()
+    
+    signal.signal(signal.SIGTERM, request_stop)
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, request_stop)
+
+def monitor_all_urls_continuous(urls, check_interval=5, session=None, max_workers=ROUND_MAX_WORKERS, per_host_limit=PER_HOST_LIMIT, overrun_policy=OVERRUN_POLICY, max_rounds=None, on_event=None, on_round=None, stop_event=None, heartbeat_file=None, urls_file=None, alerts=None, series=None, time_source=SYSTEM_CLOCK, round_budget=None):
     """
     Continuously monitor all URLs forever - never stop checking
+    urls can be a plain URL list or a watchlist from build_watchlist
+    max_rounds stops after that many rounds (benchmarks), on_event(event) is called for every stock transition
+    and on_round(round_result) after every round
+    stop_event (threading.Event) ends monitoring cleanly, heartbeat_file is rewritten every tick for liveness checks
+    urls_file is polled every tick - edits are applied to the live watchlist without a restart
+    alerts is an alert dispatcher - restock alerts are queued to it and delivered off the polling path
+    (default: console banner + history flush, stopped when monitoring ends)
+    series (stock_series store) collects price / availability history per product - pass one in to query it while running
+    time_source is SYSTEM_CLOCK or a create_sim_clock() for soak tests
+    round_budget caps the time a round spends on requests (opt-in, never below the observed p95 - default None = no cap)
+    Everything the monitor keeps is bounded by the watchlist size (state, schedule, series, metrics)
+    or by fixed capacities (alert queue, log queue, history segments)
+    A failing round is logged and skipped - monitoring keeps going
+    Returns the final summary
     """
-    print('🔄 CONTINUOUS MONITORING ALL PRODUCTS (NEVER STOP)')
-    print('=' * 60)
-    print(f'📦 Total products: {len(urls)}')
-    print(f'⏰ Check interval: {check_interval} seconds')
-    print(f'🚀 Started at: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
-    print(f'🔄 Will keep checking forever until manually stopped (Ctrl+C)')
-    print('=' * 60)
+    watchlist = _as_watchlist(urls)
+    urls = watchlist['urls']
+    session = session or get_stock_session()
+    
+    log.info('🔄 CONTINUOUS MONITORING ALL PRODUCTS (NEVER STOP)')
+    log.info('=' * 60)
+    log.info(f'📦 Total products: {len(urls)} ({len(watchlist["tags"])} unique tags)')
+    log.info(f'⏰ Check interval: {check_interval} seconds')
+    log.info(f'🚀 Started at: {datetime.fromtimestamp(time_source["time"]()).strftime("%Y-%m-%d %H:%M:%S")}')
+    log.info(f'🔄 Will keep checking forever until manually stopped (Ctrl+C)')
+    log.info('=' * 60)
     
     check_count = 0
-    start_time = datetime.now()
+    start_time = datetime.fromtimestamp(time_source['time']())
+    current_time = start_time.strftime("%H:%M:%S")
     total_available_found = 0
     
+    # Current state per product SKU - read by the round summary and the final report
+    state_table = {}
+    history = get_history_store()
+    
+    # Price / availability per product in bounded typed-array rings - flat memory however long the monitor runs
+    if series is None:
+        series = stock_series.create_series_store()
+    
+    # Restock banners, notifications and the history flush run on the dispatcher thread, never in the round
+    own_alerts = alerts is None
+    if own_alerts:
+        alerts = create_alert_dispatcher([console_sink(), history_flush_sink(history)])
+    
+    # Each tag has its own next-due time - healthy tags stay at check_interval, failing ones back off
+    schedule = create_poll_schedule(watchlist['tags'], check_interval, time_source['monotonic']())
+    
+    # Rounds start on fixed monotonic deadlines, so the period does not drift with round duration
+    clock = create_tick_clock(check_interval, time_source['monotonic'](), overrun_policy)
+    
+    stopped_by = 'max_rounds'
+    round_errors = 0
+    file_watch = create_file_watch(urls_file) if urls_file else None
+    
     try:
-        while True:  # Forever loop - never break
-            check_count += 1
-            current_time = datetime.now().strftime("%H:%M:%S")
+        while max_rounds is None or check_count < max_rounds:  # Forever loop unless max_rounds is set
+            tick = clock['next_tick']
+            if _wait_until(tick, stop_event, time_source):
+                stopped_by = 'stop_requested'
+                break
+            
+            if heartbeat_file:
+                write_heartbeat(heartbeat_file, {
+                    'round': check_count,
+                    'round_errors': round_errors,
+                    'restocks': total_available_found,
+                    'overruns': clock['overruns']
+                })
             
-            print(f'\n📡 Stock Check Round #{check_count} at {current_time}')
-            print('=' * 40)
+            if file_watch and file_changed(file_watch):
+                reload_watchlist_file(urls_file, watchlist, schedule, state_table, tick, check_interval, session, series)
             
-            available_products = []
+            due_tags = due_poll_tags(schedule, tick)
+            if not due_tags:
+                advance_tick_clock(clock, tick, time_source['monotonic']())
+                continue
             
-            for i, url in enumerate(urls, 1):
-                print(f'\n🔍 Product {i}/{len(urls)}:')
-                print('-' * 20)
+            check_count += 1
+            now = datetime.fromtimestamp(time_source['time']())
+            current_time = now.strftime("%H:%M:%S")
+            
+            log.info(f'\n📡 Stock Check Round #{check_count} at {current_time} ({len(due_tags)}/{len(schedule)} tags due)')
+            log.info('=' * 40)
+            
+            try:
+                round_result = run_check_round(watchlist, session, max_workers, per_host_limit, due_tags, round_budget)
+                if on_round:
+                    on_round(round_result)
                 
-                is_available = check_stock_single(url, i)
+                checked_at = time_source['monotonic']()
+                for tag, fetch in round_result['fetches'].items():
+                    if fetch['goods'] is not None:
+                        record_poll_success(schedule[tag], tick)
+                    elif fetch['error'] in ('deadline', 'budget', 'circuit_open'):
+                        record_poll_cut(schedule[tag], tick, fetch['retry_after'])
+                    else:
+                        delay = record_poll_failure(schedule[tag], checked_at, fetch['retry_after'])
+                        log.warning(f"⏳ {tag}: {fetch['error']} error #{schedule[tag]['failures']} - backing off {delay:.1f}s",
+                                    extra={'fields': {'event': 'backoff', 'tag': tag, 'error': fetch['error'], 'status': fetch['status_code'], 'delay': round(delay, 2)}})
                 
-                if is_available:
-                    available_products.append(i)
-            
-            # Show results for this round
-            if available_products:
-                total_available_found += len(available_products)
+                stock_series.record_round(series, round_result['results'], time_source['time']())
                 
-                print('\n' + '🎉' * 40)
-                print('🎉 STOCK AVAILABLE IN THIS ROUND! 🎉')
-                print('🎉' * 40)
-                print(f'✅ Available products: {", ".join(map(str, available_products))}')
-                print(f'📊 Total available products found so far: {total_available_found}')
-                print(f'🕐 Found at: {current_time}')
+                # Only transitions are reported - a product that stays in stock is not re-announced
+                events = update_stock_state(state_table, round_result['results'], now.strftime("%Y-%m-%d %H:%M:%S"))
+                restocks = [event for event in events if event['type'] == 'restock']
                 
-                # Save result to file each time we find available stock
-                result = {
-                    'timestamp': current_time,
-                    'round_number': check_count,
-                    'available_products_this_round': available_products,
-                    'total_products': len(urls),
-                    'total_available_found': total_available_found,
-                    'monitoring_duration': str(datetime.now() - start_time),
-                    'urls': urls
-                }
+                for event in events:
+                    append_record(history, 'stock_event', dict(event, round_number=check_count))
+                    if on_event:
+                        on_event(event)
                 
-                filename = f"stock_found_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-                with open(filename, 'w') as f:
-                    json.dump(result, f, indent=2)
-                print(f'💾 Result saved to: {filename}')
+                for event in events:
+                    products = ', '.join(map(str, event['product_numbers']))
+                    fields = {'fields': {'event': event['type'], 'key': event['key'], 'sale_price': event['sale_price']}}
+                    if event['type'] == 'sold_out':
+                        log.info(f"📉 Product {products} ({event['key']}) SOLD OUT again", extra=fields)
+                    elif event['type'] == 'price_change':
+                        log.info(f"💱 Product {products} ({event['key']}) price changed: {event['previous_sale_price']} -> {event['sale_price']}", extra=fields)
                 
-                print('\n🔄 CONTINUING TO MONITOR...')
-                print('=' * 40)
-            else:
-                print(f'\n❌ No products available in this round...')
-            
-            print(f'⏰ Waiting {check_interval} seconds before next round...')
-            print(f'📊 Stats: Round #{check_count} | Available found: {total_available_found} | Running time: {datetime.now() - start_time}')
-            time.sleep(check_interval)
+                # A price change is the only time the 24h drop can change - no need to scan every round
+                if any(event['type'] == 'price_change' for event in events):
+                    for drop in stock_series.price_drops(series, now=time_source['time']()):
+                        log.info(f"📉 {drop['key']} is {drop['drop_pct']:.1f}% below its 24h high ({drop['peak_price']:.0f} -> {drop['current_price']:.0f})",
+                                 extra={'fields': dict(drop, event='price_drop')})
                 
+                if restocks:
+                    total_available_found += len(restocks)
+                    for event in restocks:
+                        enqueue_alert(alerts, dict(event, round_number=check_count, total_restocks=total_available_found), key=event['key'])
+                    
+                    available_products = sorted(number for event in restocks for number in event['product_numbers'])
+                    log.warning(f'🔔 Restock alert queued for products {", ".join(map(str, available_products))} (total restocks: {total_available_found})',
+                                extra={'fields': {'event': 'restock', 'keys': [event['key'] for event in restocks], 'products': available_products}})
+                else:
+                    in_stock = in_stock_products(state_table)
+                    if in_stock:
+                        log.info(f'\n✅ Still in stock: {", ".join(in_stock)}')
+                    else:
+                        log.info(f'\n❌ No products available in this round...')
+                
+                print_round_timing(round_result)
+            except Exception as e:
+                # One bad round must not end monitoring - log it and keep the cadence
+                round_errors += 1
+                log.error(f'\n❌ Round #{check_count} error: {e}')
+                log.warning(f'🔄 Will try to continue... (round errors: {round_errors})')
+            
+            overrun = advance_tick_clock(clock, tick, time_source['monotonic']())
+            if overrun:
+                log.warning(f"⚠️ Round overran the {check_interval}s interval by {overrun:.2f}s (overruns: {clock['overruns']}, policy: {clock['policy']}, skipped ticks: {clock['skipped_ticks']})")
+            
+            wait_time = max(clock['next_tick'] - time_source['monotonic'](), 0)
+            log.debug(f'⏰ Waiting {wait_time:.1f} seconds before next round...')
+            stats = get_session_stats(session)
+            alert_stats = dispatcher_stats(alerts)
+            log.info(f'📊 Stats: Round #{check_count} | Restocks found: {total_available_found} | Running time: {datetime.fromtimestamp(time_source["time"]()) - start_time} | Connection reuse: {stats["reuse_rate"]:.0%} | Overruns: {clock["overruns"]} | Alert queue: {alert_stats["queue_depth"]}',
+                     extra={'fields': {'round': check_count, 'restocks': total_available_found, 'reuse_rate': round(stats['reuse_rate'], 3), 'overruns': clock['overruns'],
+                                       'alert_queue_depth': alert_stats['queue_depth'], 'alert_p99_ms': round(alert_stats['latency_p99_ms'], 1)}})
+    
     except KeyboardInterrupt:
-        end_time = datetime.now()
-        duration = end_time - start_time
-        
-        print('\n' + '⏹️ ' * 40)
-        print('⏹️  MONITORING STOPPED BY USER (Ctrl+C)')
-        print('⏹️ ' * 40)
-        print(f'⏱️  Total monitoring time: {duration}')
-        print(f'📊 Total check rounds completed: {check_count}')
-        print(f'🎯 Total available products found: {total_available_found}')
-        
-        # Save final summary
-        final_result = {
-            'session_ended': current_time,
-            'total_rounds': check_count,
-            'total_monitoring_time': str(duration),
-            'total_available_found': total_available_found,
-            'stopped_by': 'user_interrupt',
-            'urls_monitored': urls
-        }
-        
-        filename = f"monitoring_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(filename, 'w') as f:
-            json.dump(final_result, f, indent=2)
-        print(f'💾 Final summary saved to: {filename}')
-        print('👋 Goodbye!')
-        
-    except Exception as e:
-        print(f'\n❌ Monitoring error: {e}')
-        print('🔄 Will try to continue...')
-        time.sleep(5)  # Wait 5 seconds and continue
+        stopped_by = 'user_interrupt'
+    
+    # Deliver what is still queued before the summary
+    if own_alerts:
+        stop_alert_dispatcher(alerts)
+    alert_stats = dispatcher_stats(alerts)
+    
+    end_time = datetime.fromtimestamp(time_source['time']())
+    duration = end_time - start_time
+    
+    log.info('\n' + '⏹️ ' * 40)
+    if stopped_by == 'user_interrupt':
+        log.info('⏹️  MONITORING STOPPED BY USER (Ctrl+C)')
+    elif stopped_by == 'stop_requested':
+        log.info('⏹️  MONITORING STOPPED (stop requested / SIGTERM)')
+    else:
+        log.info(f'⏹️  MONITORING FINISHED AFTER {check_count} ROUNDS')
+    log.info('⏹️ ' * 40)
+    log.info(f'⏱️  Total monitoring time: {duration}')
+    log.info(f'📊 Total check rounds completed: {check_count}')
+    log.info(f'⚠️  Round overruns: {clock["overruns"]} ({clock["skipped_ticks"]} ticks skipped)')
+    log.info(f'🎯 Total restocks found: {total_available_found}')
+    log.info(f'🩹 Rounds recovered from errors: {round_errors}')
+    hedge_stats = get_hedge_stats(session)
+    breaker_stats = get_breaker_stats(session)
+    if stock_client.HEDGE_REQUESTS:
+        log.info(f"🏁 Hedged requests: {hedge_stats['hedges']} of {hedge_stats['requests']} ({hedge_stats['hedge_wins']} answered first)")
+    for host, breaker in breaker_stats.items():
+        if breaker['opens']:
+            log.info(f"🔌 Circuit {host}: opened {breaker['opens']}x, {breaker['shed']} requests shed, now {breaker['state']}")
+    log.info(f"🔔 Alerts: {alert_stats['delivered']} delivered, {alert_stats['failed']} failed, {alert_stats['dropped']} dropped, {alert_stats['coalesced']} coalesced | dispatch p50 {alert_stats['latency_p50_ms']:.1f}ms p99 {alert_stats['latency_p99_ms']:.1f}ms")
+    
+    in_stock = in_stock_products(state_table)
+    log.info(f'📦 In stock at exit: {", ".join(in_stock) if in_stock else "none"}')
+    
+    # Series samples carry time_source timestamps - queries must use the same clock
+    series_now = time_source['time']()
+    drops = stock_series.price_drops(series, now=series_now)
+    patterns = stock_series.restock_patterns(series, now=series_now)
+    for drop in drops:
+        log.info(f"📉 Price drop: {drop['key']} {drop['peak_price']:.0f} -> {drop['current_price']:.0f} (-{drop['drop_pct']:.1f}% vs 24h high)")
+    for pattern in patterns:
+        interval = f"every {pattern['mean_interval_s'] / 3600:.1f}h" if pattern['mean_interval_s'] else 'once'
+        log.info(f"🔁 Restock pattern: {pattern['key']} restocked {pattern['restocks']}x ({interval}), in stock {pattern['availability_pct']:.0f}% of checks")
+    log.info(f"🧮 Series memory: {stock_series.series_memory(series) / 1024:.0f} KiB for {len(series['series'])} products")
+    
+    # Save final summary
+    final_result = {
+        'session_ended': current_time,
+        'total_rounds': check_count,
+        'total_monitoring_time': str(duration),
+        'total_available_found': total_available_found,
+        'round_overruns': clock['overruns'],
+        'skipped_ticks': clock['skipped_ticks'],
+        'round_errors': round_errors,
+        'alerts': alert_stats,
+        'hedging': hedge_stats,
+        'breakers': breaker_stats,
+        'price_drops': drops,
+        'restock_patterns': patterns,
+        'current_state': state_table,
+        'stopped_by': stopped_by,
+        # Counts only - the URL list is in the watchlist file, not repeated in every summary
+        'products_monitored': len(watchlist['urls']),
+        'tags_monitored': len(watchlist['tags'])
+    }
+    
+    append_record(history, 'session_summary', final_result, flush=True)
+    log.info(f"💾 Final summary saved to history: {history['directory']}/")
+    
+    if heartbeat_file:
+        write_heartbeat(heartbeat_file, {'round': check_count, 'round_errors': round_errors, 'stopped_by': stopped_by})
+    
+    log.info('👋 Goodbye!')
+    return final_result
 
-def main():
+def parse_cli_args(argv=None):
     """
-    Main function with simple menu
+    CLI flags - every flag can also come from an environment variable
     """
-    print('🚀 XIAOMI STOCK CHECKER')
-    print('=' * 30)
+    parser = argparse.ArgumentParser(description='Xiaomi stock checker')
+    parser.add_argument('--mode', choices=['menu', 'once', 'monitor'], default=os.environ.get('STOCK_CHECKER_MODE', 'menu'),
+                        help='menu (interactive, default), once or monitor - env STOCK_CHECKER_MODE')
+    parser.add_argument('--urls-file', default=os.environ.get('STOCK_URLS_FILE', 'url.txt'),
+                        help='watchlist file - env STOCK_URLS_FILE')
+    parser.add_argument('--no-reload', action='store_true', default=os.environ.get('STOCK_URLS_RELOAD', '1') == '0',
+                        help='do not apply edits of the watchlist file while monitoring - env STOCK_URLS_RELOAD=0')
+    parser.add_argument('--interval', type=float, default=float(os.environ.get('STOCK_CHECK_INTERVAL', 5)),
+                        help='check interval in seconds - env STOCK_CHECK_INTERVAL')
+    parser.add_argument('--heartbeat-file', default=os.environ.get('STOCK_HEARTBEAT_FILE'),
+                        help='liveness file rewritten every tick - env STOCK_HEARTBEAT_FILE')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('STOCK_MAX_WORKERS', ROUND_MAX_WORKERS)),
+                        help='worker threads per round - env STOCK_MAX_WORKERS')
+    parser.add_argument('--per-host', type=int, default=int(os.environ.get('STOCK_PER_HOST_LIMIT', PER_HOST_LIMIT)),
+                        help='concurrent requests per host - env STOCK_PER_HOST_LIMIT')
+    parser.add_argument('--pool-size', type=int, default=int(os.environ.get('STOCK_POOL_SIZE', STOCK_POOL_SIZE)),
+                        help='pooled connections per host - env STOCK_POOL_SIZE')
+    parser.add_argument('--no-keep-alive', action='store_true', default=os.environ.get('STOCK_KEEP_ALIVE', '1') == '0',
+                        help='close connections after each request - env STOCK_KEEP_ALIVE=0')
+    parser.add_argument('--overrun-policy', choices=['skip', 'catch_up'], default=os.environ.get('STOCK_OVERRUN_POLICY', OVERRUN_POLICY),
+                        help='what to do when a round overruns the interval - env STOCK_OVERRUN_POLICY')
+    parser.add_argument('--metrics-port', type=int, default=int(os.environ.get('STOCK_METRICS_PORT', 0)) or None,
+                        help='serve Prometheus metrics on 127.0.0.1:PORT/metrics - env STOCK_METRICS_PORT')
+    parser.add_argument('--stats-file', default=os.environ.get('STOCK_STATS_FILE'),
+                        help='rewrite Prometheus-text metrics to this file periodically - env STOCK_STATS_FILE')
+    parser.add_argument('--alert-webhook', default=os.environ.get('STOCK_ALERT_WEBHOOK'),
+                        help='POST restock alerts as JSON to this URL - env STOCK_ALERT_WEBHOOK')
+    parser.add_argument('--alert-dir', default=os.environ.get('STOCK_ALERT_DIR'),
+                        help='write one JSON file per restock alert to this directory - env STOCK_ALERT_DIR')
+    parser.add_argument('--alert-sound', action='store_true', default=os.environ.get('STOCK_ALERT_SOUND', '0') == '1',
+                        help='ring the terminal bell on restock - env STOCK_ALERT_SOUND=1')
+    parser.add_argument('--round-budget', type=float, default=float(os.environ['STOCK_ROUND_BUDGET']) if os.environ.get('STOCK_ROUND_BUDGET') else None,
+                        help='seconds a round may spend on requests, raised to 1.5 x the observed p95 (default: no cap) - env STOCK_ROUND_BUDGET')
+    parser.add_argument('--hedge', action='store_true', default=stock_client.HEDGE_REQUESTS,
+                        help='send a second request when one is slower than the observed p95 - env STOCK_HEDGE=1')
+    parser.add_argument('--no-breaker', action='store_true', default=not stock_client.BREAKER_ENABLED,
+                        help='keep sending to a failing API host - env STOCK_BREAKER=0')
+    add_logging_args(parser)
+    return parser.parse_args(argv)
+
+def apply_request_policy(args):
+    """
+    Hedging and circuit breaker settings from the command line
+    """
+    stock_client.HEDGE_REQUESTS = args.hedge
+    stock_client.BREAKER_ENABLED = not args.no_breaker
+
+def build_alert_dispatcher(args):
+    """
+    Alert dispatcher with the console banner, history flush and the sinks requested on the command line
+    """
+    sinks = [console_sink(), history_flush_sink(get_history_store())]
+    if args.alert_sound:
+        sinks.append(sound_sink())
+    if args.alert_dir:
+        sinks.append(file_drop_sink(args.alert_dir))
+    if args.alert_webhook:
+        sinks.append(webhook_sink(args.alert_webhook))
+    return create_alert_dispatcher(sinks)
+
+def start_metrics_export(args):
+    """
+    Start the metrics endpoint and/or stats file writer requested on the command line
+    """
+    if args.metrics_port:
+        stock_metrics.start_metrics_server(args.metrics_port)
+    if args.stats_file:
+        stock_metrics.start_stats_file_writer(args.stats_file)
+
+def run_headless(args):
+    """
+    Non-interactive mode for supervisors - no prompts, SIGTERM flushes the summary
+    Returns the process exit code
+    """
+    urls = load_urls_from_file(args.urls_file)
+    if not urls:
+        log.error(f"❌ No valid URLs found in {args.urls_file}!")
+        return 1
+    
+    watchlist = build_watchlist(urls)
+    session = create_stock_session(args.pool_size, not args.no_keep_alive)
+    start_metrics_export(args)
+    
+    if args.mode == 'once':
+        check_all_urls_once(watchlist, session, args.workers, args.per_host)
+        if args.stats_file:
+            stock_metrics.write_stats_file(args.stats_file)
+        return 0
+    
+    stop_event = threading.Event()
+    install_stop_handlers(stop_event)
+    
+    alerts = build_alert_dispatcher(args)
+    monitor_all_urls_continuous(watchlist, args.interval, session, args.workers, args.per_host, args.overrun_policy,
+                                stop_event=stop_event, heartbeat_file=args.heartbeat_file,
+                                urls_file=None if args.no_reload else args.urls_file, alerts=alerts,
+                                round_budget=args.round_budget)
+    stop_alert_dispatcher(alerts)
+    if args.stats_file:
+        stock_metrics.write_stats_file(args.stats_file)
+    return 0
+
+def main(argv=None):
+    """
+    Main function with simple menu - or headless with --mode once/monitor
+    """
+    args = parse_cli_args(argv)
+    configure_from_args(args)
+    apply_request_policy(args)
+    
+    if args.mode != 'menu':
+        return run_headless(args)
+    
+    log.info('🚀 XIAOMI STOCK CHECKER')
+    log.info('=' * 30)
     
     # Load URLs from file
-    urls = load_urls_from_file("url.txt")
+    urls = load_urls_from_file(args.urls_file)
     
     if not urls:
-        print("❌ No valid URLs found!")
-        print("Please create url.txt with one URL per line:")
-        print("https://www.mi.co.id/id/product/product1/")
-        print("https://www.mi.co.id/id/product/product2/")
-        return
+        log.error("❌ No valid URLs found!")
+        log.info(f"Please create {args.urls_file} with one URL per line:")
+        log.info("https://www.mi.co.id/id/product/product1/")
+        log.info("https://www.mi.co.id/id/product/product2/")
+        return 1
     
-    print(f"\n📋 Found {len(urls)} products to check:")
-    for i, url in enumerate(urls, 1):
-        tag = extract_product_tag(url)
-        print(f"  {i}. {tag}")
+    watchlist = build_watchlist(urls)
+    session = create_stock_session(args.pool_size, not args.no_keep_alive)
+    start_metrics_export(args)
     
-    print('\nSelect an option:')
-    print('1. Check all products once')
-    print('2. Monitor all products continuously')
-    print('3. Exit')
+    log.info(f"\n📋 Found {len(urls)} products to check ({len(watchlist['tags'])} unique tags):")
+    for tag, entries in watchlist['tags'].items():
+        for entry in entries:
+            gid = f" (gid {entry['gid']})" if entry['gid'] else ''
+            log.info(f"  {entry['product_number']}. {tag}{gid}")
+    
+    log.info('\nSelect an option:')
+    log.info('1. Check all products once')
+    log.info('2. Monitor all products continuously')
+    log.info('3. Exit')
     
     try:
+        flush_logging()
         choice = input('\nEnter choice (1-3): ').strip()
         
         if choice == '1':
-            print('\n🔍 Checking all products once...')
-            check_all_urls_once(urls)
-            
+            log.info('\n🔍 Checking all products once...')
+            check_all_urls_once(watchlist, session, args.workers, args.per_host)
+        
         elif choice == '2':
+            flush_logging()
             interval = input('\nCheck interval in seconds (default 5): ').strip()
             interval = int(interval) if interval.isdigit() else 5
-            print(f'\n🔄 Starting continuous monitoring (interval: {interval}s)...')
-            monitor_all_urls_continuous(urls, interval)
+            log.info(f'\n🔄 Starting continuous monitoring (interval: {interval}s)...')
             
+            stop_event = threading.Event()
+            install_stop_handlers(stop_event)
+            alerts = build_alert_dispatcher(args)
+            monitor_all_urls_continuous(watchlist, interval, session, args.workers, args.per_host, args.overrun_policy,
+                                        stop_event=stop_event, heartbeat_file=args.heartbeat_file,
+                                        urls_file=None if args.no_reload else args.urls_file, alerts=alerts,
+                                        round_budget=args.round_budget)
+            stop_alert_dispatcher(alerts)
+        
         elif choice == '3':
-            print('👋 Goodbye!')
-            
+            log.info('👋 Goodbye!')
+        
         else:
-            print('❌ Invalid choice!')
-            
+            log.warning('❌ Invalid choice!')
+    
     except KeyboardInterrupt:
-        print('\n👋 Goodbye!')
+        log.info('\n👋 Goodbye!')
     except Exception as e:
-        print(f'❌ Error: {e}')
+        log.error(f'❌ Error: {e}')
+    
+    return 0
 
 if __name__ == "__main__":
-    main() 
+    sys.exit(main()) 
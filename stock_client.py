@@ -0,0 +1,686 @@
+import json
+import os
+import re
+import time
+import hashlib
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+import stock_metrics
+from log_pipeline import get_logger
+
+log = get_logger('stock_client')
+
+# Fastest installed JSON decoder - orjson, then ujson, then the standard library (all accept bytes)
+try:
+    import orjson
+    json_loads = orjson.loads
+    JSON_DECODER = 'orjson'
+except ImportError:
+    try:
+        import ujson
+        json_loads = ujson.loads
+        JSON_DECODER = 'ujson'
+    except ImportError:
+        json_loads = json.loads
+        JSON_DECODER = 'json'
+
+# One client for every getgoodsinformation poll - stock_checker and checkout share its pool, parser and backoff
+
+# Xiaomi stock API endpoint - override with STOCK_API_URL to point at a local mock server
+STOCK_API_URL = os.environ.get('STOCK_API_URL', "https://go.buy.mi.co.id/id/misc/getgoodsinformation?from=mobile&tag={tag}")
+
+# Built once - shared by every stock check through the pooled session
+STOCK_API_HEADERS = {
+    'accept': '*/*',
+    'accept-language': 'en-US,en;q=0.9',
+    'cache-control': 'no-cache',
+    'content-type': 'application/x-www-form-urlencoded; charset=UTF-8',
+    'origin': 'https://www.mi.co.id',
+    'pragma': 'no-cache',
+    'priority': 'u=1, i',
+    'referer': 'https://www.mi.co.id/id/product/redmi-13x/',
+    'sec-ch-ua': '"Google Chrome";v="137", "Chromium";v="137", "Not/A)Brand";v="24"',
+    'sec-ch-ua-mobile': '?1',
+    'sec-ch-ua-platform': '"Android"',
+    'sec-fetch-dest': 'empty',
+    'sec-fetch-mode': 'cors',
+    'sec-fetch-site': 'same-site',
+    'user-agent': 'Mozilla/5.0 (Linux; Android 8.0.0; SM-G955U Build/R16NW) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Mobile Safari/537.36'
+}
+
+# Connection pool defaults
+STOCK_POOL_SIZE = 10
+STOCK_KEEP_ALIVE = True
+REQUEST_TIMEOUT = 10
+
+# Reuse the previous parse when a tag's response did not change (ETag / Last-Modified or identical bytes)
+SKIP_UNCHANGED = os.environ.get('STOCK_SKIP_UNCHANGED', '1') != '0'
+
+# Deadline budgets - a request never runs past the deadline of the round that needs its answer
+MIN_REQUEST_BUDGET = 0.5
+
+# A round budget is never set below this multiple of the observed p95 latency (REQUEST_TIMEOUT until there is one)
+# - an API that is always slow still gets its answers through
+BUDGET_P95_HEADROOM = 1.5
+
+# Hedged requests - after the observed p95 latency a second request races the first
+# At most HEDGE_BUDGET hedges per request on average (token bucket, HEDGE_BURST deep) so load stays capped
+HEDGE_REQUESTS = os.environ.get('STOCK_HEDGE', '0') == '1'
+HEDGE_BUDGET = 0.05
+HEDGE_BURST = 10
+HEDGE_MIN_DELAY = 0.05
+HEDGE_MIN_SAMPLES = 20
+HEDGE_LATENCY_SAMPLES = 200
+HEDGE_WORKERS = 16
+
+# Per-host circuit breaker - open after BREAKER_FAILURES failures in a row, one probe after the cooldown
+# A failed probe doubles the cooldown up to BREAKER_MAX_COOLDOWN
+BREAKER_ENABLED = os.environ.get('STOCK_BREAKER', '1') != '0'
+BREAKER_FAILURES = 5
+BREAKER_COOLDOWN = 5.0
+BREAKER_MAX_COOLDOWN = 60.0
+
+# Adaptive polling - backoff with jitter on errors, tighten back to the base interval on success
+BACKOFF_MAX_INTERVAL = 120
+# Backoff doubles at most this many times - a tag failing for days must not overflow 2 ** failures
+BACKOFF_MAX_DOUBLINGS = 16
+POLL_JITTER = 0.2
+
+_stock_session = None
+_hedge_executor = None
+_client_lock = threading.Lock()
+
+class DeadlineExceeded(Exception):
+    """
+    No response before the round deadline - the request is abandoned, not waited for
+    """
+
+def create_stock_session(pool_size=STOCK_POOL_SIZE, keep_alive=STOCK_KEEP_ALIVE):
+    """
+    Create pooled HTTP session for the stock API - DNS/TCP/TLS paid once per connection
+    """
+    session = requests.Session()
+    adapter = stock_metrics.instrument_adapter(HTTPAdapter(pool_connections=4, pool_maxsize=pool_size))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    
+    session.headers.update(STOCK_API_HEADERS)
+    session.headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+    return session
+
+def get_stock_session():
+    """
+    Shared stock session - built on first use and reused afterwards
+    """
+    global _stock_session
+    if _stock_session is None:
+        _stock_session = create_stock_session()
+    return _stock_session
+
+def get_session_stats(session):
+    """
+    Connection reuse stats from the urllib3 pools behind the session
+    """
+    total_requests = 0
+    total_connections = 0
+    
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            total_requests += pool.num_requests
+            total_connections += pool.num_connections
+    
+    reused = max(total_requests - total_connections, 0)
+    reuse_rate = reused / total_requests if total_requests else 0.0
+    
+    return {
+        'requests': total_requests,
+        'connections_opened': total_connections,
+        'reuse_rate': reuse_rate
+    }
+
+def extract_product_tag(product_url):
+    """
+    Extract product tag from Xiaomi URL
+    URL format: https://www.mi.co.id/id/product/redmi-13x/?skupanel=1&gid=4223716725
+    """
+    try:
+        if '/product/' not in product_url:
+            log.error('❌ Invalid product URL format')
+            return None
+        
+        # Extract tag between /product/ and /
+        url_parts = product_url.split('/product/')
+        if len(url_parts) < 2:
+            log.error('❌ Cannot extract product tag from URL')
+            return None
+        
+        tag = url_parts[1].split('/')[0].split('?')[0]
+        return tag
+    
+    except Exception as e:
+        log.error(f'❌ Error extracting product tag: {e}')
+        return None
+
+def extract_product_gid(product_url):
+    """
+    Extract SKU gid from URL query - None when the URL has no gid
+    URL format: https://www.mi.co.id/id/product/redmi-13x/?skupanel=1&gid=4223716725
+    """
+    match = re.search(r'[?&]gid=(\d+)', product_url)
+    return match.group(1) if match else None
+
+def emit_line(output, message, level=logging.INFO):
+    """
+    Log the line now, or buffer it when running inside a concurrent round
+    """
+    if output is None:
+        log.log(level, message)
+    else:
+        output.append((level, message))
+
+def parse_goods_information(stock_data):
+    """
+    Parse every SKU of a getgoodsinformation payload in one pass
+    Returns gid -> {is_cos, available, goods_name, market_price, sale_price}, in payload order
+    """
+    goods_map = {}
+    
+    for position, item in enumerate(stock_data['data']['goodsinformation']):
+        gid = str(item.get('goods_id', item.get('gid', position)))
+        is_cos = str(item['is_cos'])
+        goods_map[gid] = {
+            'is_cos': is_cos,
+            'available': is_cos == "False",
+            'goods_name': item.get('goods_name', 'Unknown Product'),
+            'market_price': item.get('market_price', 'N/A'),
+            'sale_price': item.get('sale_price', 'N/A')
+        }
+    
+    return goods_map
+
+def select_goods(goods_map, gid=None):
+    """
+    Pick the SKU that decides availability - the URL gid, else the first SKU
+    """
+    if gid and gid in goods_map:
+        return goods_map[gid]
+    if goods_map:
+        return next(iter(goods_map.values()))
+    return None
+
+def parse_retry_after(value):
+    """
+    Retry-After header in seconds - accepts delta-seconds or an HTTP date
+    """
+    if not value:
+        return None
+    
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+def request_template(session, tag):
+    """
+    Prepared GET for a tag - URL, merged headers and proxy/TLS settings are built once per session and reused by every poll
+    Rebuilt when STOCK_API_URL changes (benchmarks point it at a mock server)
+    Carries no cookies - the jar changes between polls, so each send adds its own Cookie header
+    """
+    url = STOCK_API_URL.format(tag=tag)
+    templates = getattr(session, 'stock_templates', None)
+    if templates is None:
+        templates = session.stock_templates = {}
+    
+    template = templates.get(tag)
+    if template is None or template[0] != url:
+        prepared = session.prepare_request(requests.Request('GET', url))
+        prepared.headers.pop('Cookie', None)
+        send_settings = session.merge_environment_settings(url, {}, None, None, None)
+        template = templates[tag] = (url, prepared, send_settings)
+    
+    return template[1], template[2]
+
+def forget_tag(tag, session=None):
+    """
+    Drop the request template, cached response and metrics of a tag that left the watchlist
+    """
+    session = session or get_stock_session()
+    getattr(session, 'stock_templates', {}).pop(tag, None)
+    getattr(session, 'stock_responses', {}).pop(tag, None)
+    stock_metrics.forget_tag(tag)
+
+def _response_cache(session):
+    """
+    Per-session tag -> {fingerprint, goods, validators} of the last parsed response
+    """
+    cache = getattr(session, 'stock_responses', None)
+    if cache is None:
+        cache = session.stock_responses = {}
+    return cache
+
+def _response_validators(response):
+    """
+    Conditional request headers for the next poll - empty when the server sends neither ETag nor Last-Modified
+    """
+    validators = {}
+    if response.headers.get('ETag'):
+        validators['If-None-Match'] = response.headers['ETag']
+    if response.headers.get('Last-Modified'):
+        validators['If-Modified-Since'] = response.headers['Last-Modified']
+    return validators
+
+def _session_state(session, name, factory):
+    """
+    Per-session client state (hedge stats, breakers) - created once under the client lock
+    """
+    state = getattr(session, name, None)
+    if state is None:
+        with _client_lock:
+            state = getattr(session, name, None)
+            if state is None:
+                state = factory()
+                setattr(session, name, state)
+    return state
+
+def _host_breaker(session, host):
+    """
+    Circuit breaker of one API host
+    """
+    breakers = _session_state(session, 'stock_breakers', dict)
+    breaker = breakers.get(host)
+    if breaker is None:
+        with _client_lock:
+            breaker = breakers.setdefault(host, {
+                'host': host,
+                'state': 'closed',
+                'failures': 0,
+                'cooldown': BREAKER_COOLDOWN,
+                'opened_at': 0.0,
+                'opens': 0,
+                'shed': 0,
+                'lock': threading.Lock()
+            })
+    return breaker
+
+def _set_breaker_state(breaker, state):
+    breaker['state'] = state
+    stock_metrics.set_gauge('stock_breaker_state', {'host': breaker['host']}, {'closed': 0, 'half_open': 1, 'open': 2}[state])
+
+def breaker_allow(breaker, now):
+    """
+    Whether a request may go to the host - returns (allowed, seconds until the next probe)
+    After the cooldown one probe goes through (half-open); a probe that never reports is replaced after another cooldown
+    """
+    with breaker['lock']:
+        if breaker['state'] == 'closed':
+            return True, None
+        
+        remaining = breaker['opened_at'] + breaker['cooldown'] - now
+        if remaining <= 0:
+            breaker['opened_at'] = now
+            _set_breaker_state(breaker, 'half_open')
+            return True, None
+        
+        breaker['shed'] += 1
+        stock_metrics.inc_counter('stock_breaker_shed_total', {'host': breaker['host']})
+        # While a probe is out, ask again soon - the probe decides within one request
+        if breaker['state'] == 'half_open':
+            return False, MIN_REQUEST_BUDGET
+        return False, max(remaining, MIN_REQUEST_BUDGET)
+
+def breaker_record(breaker, ok, now):
+    """
+    Feed a request outcome to the breaker - opens after BREAKER_FAILURES failures in a row or a failed probe
+    """
+    with breaker['lock']:
+        if ok:
+            if breaker['state'] != 'closed':
+                log.warning(f"🟢 {breaker['host']} answered again - circuit closed")
+            breaker.update(failures=0, cooldown=BREAKER_COOLDOWN)
+            _set_breaker_state(breaker, 'closed')
+            return
+        
+        breaker['failures'] += 1
+        if breaker['state'] == 'half_open':
+            breaker['cooldown'] = min(breaker['cooldown'] * 2, BREAKER_MAX_COOLDOWN)
+        elif breaker['state'] == 'open' or breaker['failures'] < BREAKER_FAILURES:
+            # Requests sent before the circuit opened still report in - they do not extend it
+            return
+        else:
+            breaker['opens'] += 1
+        
+        breaker['opened_at'] = now
+        _set_breaker_state(breaker, 'open')
+        log.warning(f"🔴 {breaker['host']} failed {breaker['failures']}x in a row - circuit open, shedding requests for {breaker['cooldown']:g}s")
+
+def _hedge_state(session):
+    """
+    Per-session latency window and hedge token bucket
+    """
+    return _session_state(session, 'stock_hedge', lambda: {
+        'lock': threading.Lock(),
+        'latencies': deque(maxlen=HEDGE_LATENCY_SAMPLES),
+        'p95': None,
+        'new_samples': 0,
+        'tokens': HEDGE_BURST,
+        'requests': 0,
+        'hedges': 0,
+        'hedge_wins': 0
+    })
+
+def _record_latency(hedge, seconds):
+    """
+    Add a successful exchange to the latency window - p95 is recomputed every 10 samples
+    """
+    with hedge['lock']:
+        hedge['latencies'].append(seconds)
+        hedge['new_samples'] += 1
+        if hedge['new_samples'] >= 10 and len(hedge['latencies']) >= HEDGE_MIN_SAMPLES:
+            ordered = sorted(hedge['latencies'])
+            hedge['p95'] = ordered[int(len(ordered) * 0.95) - 1]
+            hedge['new_samples'] = 0
+
+def budget_floor(session):
+    """
+    Smallest usable round budget - BUDGET_P95_HEADROOM x the observed p95, REQUEST_TIMEOUT until enough samples
+    """
+    p95 = _hedge_state(session)['p95']
+    if p95 is None:
+        return REQUEST_TIMEOUT
+    return min(max(p95 * BUDGET_P95_HEADROOM, MIN_REQUEST_BUDGET), REQUEST_TIMEOUT)
+
+def _take_hedge_token(hedge):
+    with hedge['lock']:
+        if hedge['tokens'] < 1:
+            return False
+        hedge['tokens'] -= 1
+        hedge['hedges'] += 1
+        return True
+
+def get_hedge_stats(session):
+    """
+    Hedging counters of a session - requests, hedges sent, hedges that answered first, current p95 (s)
+    """
+    hedge = _hedge_state(session)
+    with hedge['lock']:
+        return {key: hedge[key] for key in ('requests', 'hedges', 'hedge_wins', 'p95')}
+
+def get_breaker_stats(session):
+    """
+    Circuit breaker state per host
+    """
+    return {host: {key: breaker[key] for key in ('state', 'failures', 'opens', 'shed', 'cooldown')}
+            for host, breaker in getattr(session, 'stock_breakers', {}).items()}
+
+def _get_hedge_executor():
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _client_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='stock-hedge')
+    return _hedge_executor
+
+def _send(session, prepared, send_settings, timeout):
+    """
+    One HTTP exchange on the calling thread - returns (response, phases, seconds)
+    """
+    started = time.perf_counter()
+    stock_metrics.start_request_timing()
+    response = session.send(prepared, timeout=timeout, **send_settings)
+    # Read the body here - on a hedge thread the caller must not block on it
+    response.content
+    return response, stock_metrics.response_phases(response, started), time.perf_counter() - started
+
+def _hedged_send(session, prepared, send_settings, timeout, deadline):
+    """
+    Send, and race a second request when the first is slower than the observed p95
+    The loser is left to finish on its own - its connection goes back to the pool
+    """
+    hedge = _hedge_state(session)
+    executor = _get_hedge_executor()
+    primary = executor.submit(_send, session, prepared, send_settings, timeout)
+    pending = {primary}
+    hedged = False
+    
+    def remaining():
+        return None if deadline is None else max(deadline - time.monotonic(), 0)
+    
+    if hedge['p95'] is not None:
+        delay = max(hedge['p95'], HEDGE_MIN_DELAY)
+        budget = remaining()
+        done, _ = wait(pending, timeout=delay if budget is None else min(delay, budget))
+        if not done and (budget is None or budget > delay) and _take_hedge_token(hedge):
+            pending.add(executor.submit(_send, session, prepared, send_settings, timeout))
+            hedged = True
+    
+    error = None
+    while pending:
+        done, pending = wait(pending, timeout=remaining(), return_when=FIRST_COMPLETED)
+        if not done:
+            raise DeadlineExceeded('no response within the round budget')
+        
+        for future in done:
+            if future.exception() is not None:
+                error = error or future.exception()
+                continue
+            if hedged:
+                winner = 'primary' if future is primary else 'hedge'
+                stock_metrics.inc_counter('stock_hedged_requests_total', {'winner': winner})
+                if winner == 'hedge':
+                    with hedge['lock']:
+                        hedge['hedge_wins'] += 1
+            return future.result()
+    
+    raise error
+
+def fetch_goods_information(tag, session=None, output=None, prefix='', deadline=None):
+    """
+    Request getgoodsinformation for a tag once and parse all SKUs
+    Returns {goods, status_code, retry_after, error, unchanged, phases, bytes, cpu} - goods is None when the check failed
+    unchanged is 'etag' (304) or 'fingerprint' (identical bytes) when the previous parse was reused
+    deadline (time.monotonic) caps the request - 'budget' when it already passed, 'deadline' when the answer came too late
+    error is 'circuit_open' (with retry_after) while the host breaker sheds load
+    """
+    fetch = {
+        'goods': None,
+        'status_code': None,
+        'retry_after': None,
+        'error': None,
+        'unchanged': None,
+        'phases': {},
+        'bytes': 0,
+        'cpu': 0.0
+    }
+    started = time.perf_counter()
+    cpu_started = time.thread_time()
+    breaker = None
+    hedge = None
+    sent_at = None
+    budget_limited = False
+    
+    try:
+        emit_line(output, f'🔍 {prefix}Checking product: {tag}', logging.DEBUG)
+        
+        session = session or get_stock_session()
+        prepared, send_settings = request_template(session, tag)
+        
+        breaker = _host_breaker(session, urlparse(prepared.url).netloc) if BREAKER_ENABLED else None
+        if breaker is not None:
+            allowed, retry_after = breaker_allow(breaker, time.monotonic())
+            if not allowed:
+                fetch['error'] = 'circuit_open'
+                fetch['retry_after'] = retry_after
+                emit_line(output, f'⛔ {prefix}{breaker["host"]} circuit open - not sent', logging.DEBUG)
+                return _finish_fetch(tag, fetch, started, cpu_started)
+        
+        timeout = REQUEST_TIMEOUT
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+            budget_limited = timeout < REQUEST_TIMEOUT
+            if timeout <= 0:
+                fetch['error'] = 'budget'
+                emit_line(output, f'⏱️ {prefix}Round budget used up - not sent', logging.WARNING)
+                return _finish_fetch(tag, fetch, started, cpu_started)
+        
+        cache = _response_cache(session)
+        cached = cache.get(tag) if SKIP_UNCHANGED else None
+        validators = cached['validators'] if cached else None
+        if validators or session.cookies:
+            prepared = prepared.copy()
+            prepared.prepare_cookies(session.cookies)
+            if validators:
+                prepared.headers.update(validators)
+        
+        hedge = _hedge_state(session)
+        with hedge['lock']:
+            hedge['requests'] += 1
+            hedge['tokens'] = min(hedge['tokens'] + HEDGE_BUDGET, HEDGE_BURST)
+        
+        sent_at = time.perf_counter()
+        if HEDGE_REQUESTS:
+            response, phases, seconds = _hedged_send(session, prepared, send_settings, timeout, deadline)
+        else:
+            response, phases, seconds = _send(session, prepared, send_settings, timeout)
+        if response.status_code < 500 and response.status_code != 429:
+            _record_latency(hedge, seconds)
+        
+        body = response.content
+        fetch['status_code'] = response.status_code
+        fetch['bytes'] = len(body)
+        fetch['phases'] = phases
+        
+        if response.status_code == 304 and cached:
+            fetch['goods'] = cached['goods']
+            fetch['unchanged'] = 'etag'
+        elif response.status_code == 200:
+            parse_started = time.perf_counter()
+            fingerprint = hashlib.blake2b(body, digest_size=16).digest() if SKIP_UNCHANGED else None
+            
+            if cached and cached['fingerprint'] == fingerprint:
+                fetch['goods'] = cached['goods']
+                fetch['unchanged'] = 'fingerprint'
+                cached['validators'] = _response_validators(response)
+            else:
+                try:
+                    fetch['goods'] = parse_goods_information(json_loads(body))
+                    if SKIP_UNCHANGED:
+                        cache[tag] = {'fingerprint': fingerprint, 'goods': fetch['goods'], 'validators': _response_validators(response)}
+                except (ValueError, KeyError, IndexError, TypeError) as e:
+                    fetch['error'] = 'parse'
+                    emit_line(output, f'❌ {prefix}JSON parsing error: {str(e)}', logging.WARNING)
+            fetch['phases']['parse'] = time.perf_counter() - parse_started
+        else:
+            fetch['error'] = 'http'
+            fetch['retry_after'] = parse_retry_after(response.headers.get('Retry-After'))
+            emit_line(output, f'❌ {prefix}HTTP Error: {response.status_code}', logging.WARNING)
+    
+    except DeadlineExceeded as e:
+        fetch['error'] = 'deadline'
+        emit_line(output, f'❌ {prefix}Request abandoned: {str(e)}', logging.WARNING)
+    except requests.exceptions.Timeout as e:
+        # A timeout shortened by the round budget is the budget's cut, not the host timing out
+        fetch['error'] = 'deadline' if budget_limited else 'timeout'
+        emit_line(output, f'❌ {prefix}Request timed out: {str(e)}', logging.WARNING)
+    except requests.exceptions.RequestException as e:
+        fetch['error'] = 'request'
+        emit_line(output, f'❌ {prefix}Request failed: {str(e)}', logging.WARNING)
+    except Exception as e:
+        fetch['error'] = 'unexpected'
+        emit_line(output, f'❌ {prefix}Unexpected error: {e}', logging.ERROR)
+    
+    if fetch['error'] == 'deadline' and sent_at is not None:
+        # The answer takes at least this long - keeps the p95 (and budget_floor) growing with a host that got slower
+        _record_latency(hedge, time.perf_counter() - sent_at)
+    
+    if breaker is not None and fetch['error'] not in ('unexpected', 'deadline'):
+        # Only host trouble counts - parse errors and 4xx say nothing about the host being down,
+        # round budget cuts say nothing either (the host may just be slower than the budget)
+        status = fetch['status_code']
+        host_failed = fetch['error'] in ('timeout', 'request') or (status is not None and (status >= 500 or status == 429))
+        breaker_record(breaker, not host_failed, time.monotonic())
+    
+    return _finish_fetch(tag, fetch, started, cpu_started)
+
+def _finish_fetch(tag, fetch, started, cpu_started):
+    """
+    Close the timings of a fetch and record its metrics
+    """
+    fetch['phases']['total'] = time.perf_counter() - started
+    fetch['cpu'] = time.thread_time() - cpu_started
+    stock_metrics.record_request(tag, fetch['status_code'], fetch['phases'], fetch['bytes'], fetch['error'], fetch['cpu'], fetch['unchanged'])
+    return fetch
+
+def create_poll_schedule(tags, base_interval, now):
+    """
+    Per-tag polling schedule - every tag is due immediately
+    """
+    return {tag: {
+        'base_interval': base_interval,
+        'interval': base_interval,
+        'failures': 0,
+        'next_due': now
+    } for tag in tags}
+
+def _jittered(seconds):
+    """
+    Spread polls so tags do not fire in lockstep
+    """
+    return seconds * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
+
+def record_poll_success(entry, now):
+    """
+    Healthy response - tighten the interval back toward the base interval
+    """
+    entry['failures'] = 0
+    entry['interval'] = max(entry['base_interval'], entry['interval'] / 2)
+    
+    # Healthy tags stay on the round cadence, recovering tags keep a jittered interval
+    if entry['interval'] > entry['base_interval']:
+        entry['next_due'] = now + _jittered(entry['interval'])
+    else:
+        entry['next_due'] = now + entry['interval']
+
+def record_poll_cut(entry, now, retry_after=None):
+    """
+    Request given up by the round budget or shed by the circuit breaker - no per-tag backoff
+    A slow or failing host is backed off once by its breaker instead; due again next round or after retry_after
+    """
+    entry['next_due'] = now + max(entry['interval'], retry_after or 0)
+
+def record_poll_failure(entry, now, retry_after=None):
+    """
+    Error, 429 or timeout - exponential backoff with jitter, never sooner than Retry-After
+    Returns the delay until the tag is due again
+    """
+    entry['failures'] += 1
+    entry['interval'] = min(BACKOFF_MAX_INTERVAL, entry['base_interval'] * 2 ** min(entry['failures'], BACKOFF_MAX_DOUBLINGS))
+    
+    delay = random.uniform(entry['base_interval'], entry['interval'])
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, BACKOFF_MAX_INTERVAL))
+    
+    entry['next_due'] = now + delay
+    return delay
+
+def due_poll_tags(schedule, now):
+    """
+    Tags whose next poll time has come
+    """
+    return [tag for tag, entry in schedule.items() if entry['next_due'] <= now]
@@ -0,0 +1,286 @@
+import os
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from log_pipeline import get_logger
+
+log = get_logger('stock_metrics')
+
+# Latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Request phases - dns_connect is DNS lookup + TCP connect (one socket call), tls only on new HTTPS connections
+PHASES = ('dns_connect', 'tls', 'ttfb', 'download', 'parse', 'total')
+
+METRIC_HELP = {
+    'stock_requests_total': ('counter', 'Stock API requests per product tag'),
+    'stock_request_errors_total': ('counter', 'Failed stock API requests by tag and status (HTTP code or error kind)'),
+    'stock_parse_failures_total': ('counter', 'Stock API responses that could not be parsed'),
+    'stock_response_bytes_total': ('counter', 'Stock API response body bytes'),
+    'stock_unchanged_responses_total': ('counter', 'Responses answered from the previous parse (via etag or fingerprint)'),
+    'stock_poll_cpu_seconds_total': ('counter', 'Client CPU time spent per tag (request, decode, parse)'),
+    'stock_request_phase_seconds': ('histogram', 'Stock API request time per phase'),
+    'stock_hedged_requests_total': ('counter', 'Hedged stock requests by winner (primary or hedge)'),
+    'stock_breaker_state': ('gauge', 'Circuit breaker state per API host (0 closed, 1 half-open, 2 open)'),
+    'stock_breaker_shed_total': ('counter', 'Stock requests not sent because the host circuit was open'),
+    'alert_queue_depth': ('gauge', 'Alerts waiting for dispatch per sink'),
+    'alert_dispatch_seconds': ('histogram', 'Time from enqueue to delivery per alert sink'),
+    'alerts_dropped_total': ('counter', 'Alerts dropped because the dispatch queue was full'),
+    'alerts_failed_total': ('counter', 'Alerts a sink could not deliver after all retries'),
+}
+
+_registry = {
+    'lock': threading.Lock(),
+    'counters': {},
+    'gauges': {},
+    'histograms': {}
+}
+
+_connection_timing = threading.local()
+
+def start_request_timing():
+    """
+    Reset the connection phase timers of the calling thread before a request
+    """
+    _connection_timing.phases = {}
+
+def take_connection_phases():
+    """
+    Connection phases measured on the calling thread since start_request_timing - empty when the connection was reused
+    """
+    return getattr(_connection_timing, 'phases', {})
+
+def _add_connection_phase(phase, seconds):
+    phases = getattr(_connection_timing, 'phases', None)
+    if phases is None:
+        phases = _connection_timing.phases = {}
+    phases[phase] = phases.get(phase, 0.0) + seconds
+
+def response_phases(response, started):
+    """
+    Phase breakdown of a finished requests response
+    response.elapsed runs from send to parsed headers, so ttfb is elapsed minus the connection phases
+    download is the body read after the headers (requests reads it eagerly unless stream=True)
+    """
+    phases = dict(take_connection_phases())
+    elapsed = response.elapsed.total_seconds()
+    
+    phases['ttfb'] = max(elapsed - phases.get('dns_connect', 0.0) - phases.get('tls', 0.0), 0.0)
+    phases['download'] = max(time.perf_counter() - started - elapsed, 0.0)
+    return phases
+
+class TimedHTTPConnection(HTTPConnection):
+    """
+    HTTP connection that records DNS + TCP connect time
+    """
+    def _new_conn(self):
+        started = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            _add_connection_phase('dns_connect', time.perf_counter() - started)
+
+class TimedHTTPSConnection(HTTPSConnection):
+    """
+    HTTPS connection that records DNS + TCP connect and TLS handshake time
+    """
+    def _new_conn(self):
+        started = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            self._socket_seconds = time.perf_counter() - started
+            _add_connection_phase('dns_connect', self._socket_seconds)
+    
+    def connect(self):
+        self._socket_seconds = 0.0
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            _add_connection_phase('tls', max(time.perf_counter() - started - self._socket_seconds, 0.0))
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+def instrument_adapter(adapter):
+    """
+    Make a requests HTTPAdapter open timed connections
+    """
+    adapter.poolmanager.pool_classes_by_scheme = {
+        'http': TimedHTTPConnectionPool,
+        'https': TimedHTTPSConnectionPool
+    }
+    return adapter
+
+def inc_counter(name, labels, value=1):
+    """
+    Add to a labelled counter
+    """
+    key = (name, tuple(sorted(labels.items())))
+    with _registry['lock']:
+        _registry['counters'][key] = _registry['counters'].get(key, 0) + value
+
+def set_gauge(name, labels, value):
+    """
+    Set a labelled gauge to its current value
+    """
+    key = (name, tuple(sorted(labels.items())))
+    with _registry['lock']:
+        _registry['gauges'][key] = value
+
+def observe(name, labels, value):
+    """
+    Record one observation in a labelled histogram
+    """
+    key = (name, tuple(sorted(labels.items())))
+    with _registry['lock']:
+        histogram = _registry['histograms'].get(key)
+        if histogram is None:
+            histogram = _registry['histograms'][key] = {'buckets': [0] * len(LATENCY_BUCKETS), 'sum': 0.0, 'count': 0}
+        
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                histogram['buckets'][index] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+def record_request(tag, status, phases, response_bytes=0, error=None, cpu=0.0, unchanged=None):
+    """
+    Record one stock API request
+    status: HTTP status code or None, error: error kind (http, parse, timeout, request...) or None
+    cpu: client thread CPU seconds, unchanged: 'etag' / 'fingerprint' when decoding was skipped
+    """
+    inc_counter('stock_requests_total', {'tag': tag})
+    
+    if cpu:
+        inc_counter('stock_poll_cpu_seconds_total', {'tag': tag}, cpu)
+    if unchanged:
+        inc_counter('stock_unchanged_responses_total', {'tag': tag, 'via': unchanged})
+    
+    if response_bytes:
+        inc_counter('stock_response_bytes_total', {'tag': tag}, response_bytes)
+    
+    if error == 'parse':
+        inc_counter('stock_parse_failures_total', {'tag': tag})
+    elif error:
+        inc_counter('stock_request_errors_total', {'tag': tag, 'status': str(status) if status else error})
+    
+    for phase, seconds in phases.items():
+        observe('stock_request_phase_seconds', {'tag': tag, 'phase': phase}, seconds)
+
+def forget_tag(tag):
+    """
+    Drop every series of a tag - used when a tag leaves the watchlist
+    """
+    with _registry['lock']:
+        for store in (_registry['counters'], _registry['gauges'], _registry['histograms']):
+            for key in [key for key in store if ('tag', tag) in key[1]]:
+                del store[key]
+
+def reset_metrics():
+    """
+    Clear all series
+    """
+    with _registry['lock']:
+        _registry['counters'].clear()
+        _registry['gauges'].clear()
+        _registry['histograms'].clear()
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = []
+    for name, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+def render_prometheus():
+    """
+    All series in Prometheus text exposition format
+    """
+    with _registry['lock']:
+        counters = dict(_registry['counters'])
+        counters.update(_registry['gauges'])
+        histograms = {key: dict(value, buckets=list(value['buckets'])) for key, value in _registry['histograms'].items()}
+    
+    lines = []
+    for name, (metric_type, help_text) in METRIC_HELP.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        
+        if metric_type in ('counter', 'gauge'):
+            for (series_name, labels), value in sorted(counters.items()):
+                if series_name == name:
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+            continue
+        
+        for (series_name, labels), histogram in sorted(histograms.items()):
+            if series_name != name:
+                continue
+            for bound, count in zip(LATENCY_BUCKETS, histogram['buckets']):
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", str(bound)),))} {count}')
+            lines.append(f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {histogram["count"]}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {histogram["sum"]:.6f}')
+            lines.append(f'{name}_count{_format_labels(labels)} {histogram["count"]}')
+    
+    return '\n'.join(lines) + '\n'
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+    
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_response(404)
+            self.end_headers()
+            return
+        
+        body = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_metrics_server(port, host='127.0.0.1'):
+    """
+    Serve /metrics on localhost in a background thread
+    """
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    log.info(f'📈 Metrics on http://{host}:{server.server_port}/metrics')
+    return server
+
+def write_stats_file(path):
+    """
+    Atomically rewrite the stats file with the current metrics
+    """
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+def start_stats_file_writer(path, interval=10.0):
+    """
+    Rewrite a Prometheus-text stats file every interval seconds in a background thread
+    """
+    stop_event = threading.Event()
+    
+    def write_loop():
+        while not stop_event.wait(interval):
+            try:
+                write_stats_file(path)
+            except OSError as e:
+                log.warning(f'⚠️ Stats file write failed: {e}')
+    
+    threading.Thread(target=write_loop, daemon=True).start()
+    log.info(f'📈 Stats file {path} rewritten every {interval:g}s')
+    return stop_event
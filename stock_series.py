@@ -0,0 +1,307 @@
+import os
+import math
+import time
+from array import array
+from datetime import datetime
+
+# Raw samples kept per product (720 = 1 hour at a 5 s interval) - env STOCK_SERIES_RAW_SAMPLES
+SERIES_RAW_SAMPLES = int(os.environ.get('STOCK_SERIES_RAW_SAMPLES', 720))
+
+# Downsampling tiers as (bucket seconds, buckets kept): 6 h of minutes, 7 days of 15 min, 90 days of 6 h
+SERIES_TIERS = ((60, 360), (900, 672), (21600, 360))
+
+# Column layouts - one typed array per column instead of a dict per sample
+RAW_COLUMNS = (('ts', 'd'), ('available', 'b'), ('sale_price', 'd'), ('market_price', 'd'))
+TIER_COLUMNS = (('ts', 'd'), ('samples', 'I'), ('available', 'I'), ('sale_min', 'd'), ('sale_max', 'd'), ('sale_last', 'd'))
+
+def create_series_store(raw_samples=SERIES_RAW_SAMPLES, tiers=SERIES_TIERS):
+    """
+    Per-product price / availability series - memory per product is bounded by the ring capacities
+    """
+    return {
+        'raw_samples': raw_samples,
+        'tiers': tiers,
+        'series': {}
+    }
+
+def _create_ring(capacity, columns):
+    """
+    Fixed-capacity ring buffer over typed arrays - arrays grow to capacity, then the oldest row is overwritten
+    """
+    return {
+        'capacity': capacity,
+        'start': 0,
+        'size': 0,
+        'columns': {name: array(code) for name, code in columns}
+    }
+
+def _ring_append(ring, row):
+    """
+    Append one row (values in column order)
+    """
+    columns = ring['columns']
+    if ring['size'] < ring['capacity']:
+        for column, value in zip(columns.values(), row):
+            column.append(value)
+        ring['size'] += 1
+        return
+    
+    index = ring['start']
+    for column, value in zip(columns.values(), row):
+        column[index] = value
+    ring['start'] = (index + 1) % ring['capacity']
+
+def _ring_rows(ring, since=None):
+    """
+    Rows oldest first as tuples in column order - only rows with ts >= since
+    """
+    columns = list(ring['columns'].values())
+    timestamps = columns[0]
+    for offset in range(ring['size']):
+        index = (ring['start'] + offset) % ring['capacity']
+        if since is not None and timestamps[index] < since:
+            continue
+        yield tuple(column[index] for column in columns)
+
+def _ring_oldest(ring):
+    """
+    Timestamp of the oldest row - None when empty
+    """
+    if not ring['size']:
+        return None
+    return ring['columns']['ts'][ring['start']]
+
+def _price(value):
+    """
+    API prices come as strings - NaN when missing or not a number
+    """
+    try:
+        return float(str(value).replace(',', ''))
+    except (TypeError, ValueError):
+        return math.nan
+
+def _create_series(store, key, tag):
+    """
+    Empty series for one product - raw ring plus one ring and one open bucket per tier
+    """
+    return {
+        'key': key,
+        'tag': tag,
+        'goods_name': None,
+        'raw': _create_ring(store['raw_samples'], RAW_COLUMNS),
+        'tiers': [{'seconds': seconds, 'ring': _create_ring(kept, TIER_COLUMNS), 'open': None} for seconds, kept in store['tiers']]
+    }
+
+def _roll_up(tier, ts, available, sale_price):
+    """
+    Add a sample to the tier's open bucket - the bucket is written to the ring once a sample lands past it
+    """
+    bucket_ts = ts - ts % tier['seconds']
+    bucket = tier['open']
+    
+    if bucket is not None and bucket[0] != bucket_ts:
+        _ring_append(tier['ring'], bucket)
+        bucket = None
+    
+    if bucket is None:
+        tier['open'] = [bucket_ts, 1, int(available), sale_price, sale_price, sale_price]
+        return
+    
+    bucket[1] += 1
+    bucket[2] += int(available)
+    if not math.isnan(sale_price):
+        bucket[3] = sale_price if math.isnan(bucket[3]) else min(bucket[3], sale_price)
+        bucket[4] = sale_price if math.isnan(bucket[4]) else max(bucket[4], sale_price)
+        bucket[5] = sale_price
+
+def product_state_key(tag, gid=None):
+    """
+    Key for one product SKU - shared by the series store and stock_checker's state table
+    """
+    return f'{tag}#{gid}' if gid else tag
+
+def record_sample(store, key, tag, ts, available, sale_price, market_price, goods_name=None):
+    """
+    Record one check of a product - raw ring and every downsampling tier
+    """
+    series = store['series'].get(key)
+    if series is None:
+        series = store['series'][key] = _create_series(store, key, tag)
+    if goods_name:
+        series['goods_name'] = goods_name
+    
+    sale_price = _price(sale_price)
+    _ring_append(series['raw'], (ts, int(available), sale_price, _price(market_price)))
+    for tier in series['tiers']:
+        _roll_up(tier, ts, available, sale_price)
+
+def record_round(store, results, ts=None):
+    """
+    Record every successful result of a check round
+    """
+    ts = time.time() if ts is None else ts
+    seen = set()
+    for result in results:
+        key = product_state_key(result['tag'], result['gid'])
+        if result['ok'] and key not in seen:
+            # Several URLs can point at the same SKU - one sample per round
+            seen.add(key)
+            record_sample(store, key, result['tag'], ts, result['available'], result['sale_price'], result['market_price'], result['goods_name'])
+
+def prune_series(store, live_keys):
+    """
+    Drop series of products that left the watchlist
+    """
+    for key in [key for key in store['series'] if key not in live_keys]:
+        del store['series'][key]
+
+def series_points(series, since=None):
+    """
+    Points oldest first at the finest resolution available for each period
+    Each point is (ts, samples, available samples, sale_min, sale_max, sale_last) - raw samples count as one
+    """
+    points = [(ts, 1, available, sale, sale, sale) for ts, available, sale, market in _ring_rows(series['raw'], since)]
+    
+    # Older periods come from the tiers, finest first - each tier only fills in before the finer data starts
+    covered_from = _ring_oldest(series['raw'])
+    for tier in series['tiers']:
+        rows = list(_ring_rows(tier['ring']))
+        if tier['open'] is not None:
+            rows.append(tuple(tier['open']))
+        
+        older = [row for row in rows
+                 if (covered_from is None or row[0] + tier['seconds'] <= covered_from) and (since is None or row[0] + tier['seconds'] > since)]
+        points[:0] = older
+        if older:
+            covered_from = older[0][0]
+        elif rows and covered_from is None:
+            covered_from = rows[0][0]
+    
+    return points
+
+def latest_sample(series):
+    """
+    Most recent raw sample as (ts, available, sale_price, market_price) - None when empty
+    """
+    raw = series['raw']
+    if not raw['size']:
+        return None
+    index = (raw['start'] + raw['size'] - 1) % raw['capacity']
+    return tuple(column[index] for column in raw['columns'].values())
+
+def _window_peak(series, since):
+    """
+    Highest sale price since a time and when it was seen - scans the price columns directly
+    Rings overlap in time, which does not matter for a maximum; a tier bucket counts when it overlaps the window
+    """
+    peak_price, peak_at = math.nan, None
+    
+    def consider(timestamps, prices, bucket_seconds=0):
+        nonlocal peak_price, peak_at
+        for ts, price in zip(timestamps, prices):
+            # NaN compares false - missing prices never win
+            if ts + bucket_seconds >= since and (peak_at is None or price > peak_price) and price == price:
+                peak_price, peak_at = price, ts
+    
+    raw = series['raw']['columns']
+    consider(raw['ts'], raw['sale_price'])
+    for tier in series['tiers']:
+        columns = tier['ring']['columns']
+        consider(columns['ts'], columns['sale_max'], tier['seconds'])
+        if tier['open'] is not None:
+            consider((tier['open'][0],), (tier['open'][4],), tier['seconds'])
+    
+    return peak_price, peak_at
+
+def price_drops(store, window=86400, min_drop_pct=5.0, now=None):
+    """
+    Products whose current sale price is at least min_drop_pct below their highest price in the window
+    Largest drops first
+    """
+    now = time.time() if now is None else now
+    drops = []
+    
+    for key, series in store['series'].items():
+        latest = latest_sample(series)
+        if latest is None or math.isnan(latest[2]):
+            continue
+        
+        peak_price, peak_at = _window_peak(series, now - window)
+        if peak_at is None or peak_price <= 0:
+            continue
+        drop_pct = (peak_price - latest[2]) / peak_price * 100
+        if drop_pct >= min_drop_pct:
+            drops.append({
+                'key': key,
+                'goods_name': series['goods_name'],
+                'peak_price': peak_price,
+                'peak_at': datetime.fromtimestamp(peak_at).strftime("%Y-%m-%d %H:%M:%S"),
+                'current_price': latest[2],
+                'drop_pct': round(drop_pct, 2)
+            })
+    
+    drops.sort(key=lambda drop: drop['drop_pct'], reverse=True)
+    return drops
+
+def restock_pattern(series, window=None, now=None):
+    """
+    When a product comes back in stock and how long it stays
+    A bucket with any in-stock sample counts as in stock
+    """
+    now = time.time() if now is None else now
+    points = series_points(series, now - window if window else None)
+    
+    restocks = []
+    in_stock_spans = []
+    in_stock_since = None
+    in_stock_samples = 0
+    total_samples = 0
+    previous_available = None
+    
+    for ts, samples, available, sale_min, sale_max, sale_last in points:
+        total_samples += samples
+        in_stock_samples += available
+        is_available = available > 0
+        
+        if is_available and previous_available is False:
+            restocks.append(ts)
+            in_stock_since = ts
+        elif not is_available and previous_available and in_stock_since is not None:
+            in_stock_spans.append(ts - in_stock_since)
+            in_stock_since = None
+        previous_available = is_available
+    
+    hours = [0] * 24
+    for ts in restocks:
+        hours[datetime.fromtimestamp(ts).hour] += 1
+    gaps = [later - earlier for earlier, later in zip(restocks, restocks[1:])]
+    
+    return {
+        'key': series['key'],
+        'restocks': len(restocks),
+        'last_restock': datetime.fromtimestamp(restocks[-1]).strftime("%Y-%m-%d %H:%M:%S") if restocks else None,
+        'mean_interval_s': sum(gaps) / len(gaps) if gaps else None,
+        'mean_in_stock_s': sum(in_stock_spans) / len(in_stock_spans) if in_stock_spans else None,
+        'availability_pct': in_stock_samples / total_samples * 100 if total_samples else 0.0,
+        'restocks_by_hour': hours
+    }
+
+def restock_patterns(store, window=None, now=None):
+    """
+    Restock pattern of every product that restocked at least once - most restocks first
+    """
+    patterns = [restock_pattern(series, window, now) for series in store['series'].values()]
+    patterns = [pattern for pattern in patterns if pattern['restocks']]
+    patterns.sort(key=lambda pattern: pattern['restocks'], reverse=True)
+    return patterns
+
+def series_memory(store):
+    """
+    Bytes held by the series arrays - bounded by capacity x products
+    """
+    total = 0
+    for series in store['series'].values():
+        for ring in [series['raw']] + [tier['ring'] for tier in series['tiers']]:
+            for column in ring['columns'].values():
+                total += column.buffer_info()[1] * column.itemsize
+    return total
@@ -0,0 +1,65 @@
+import time
+
+from history_store import open_history_store, append_record, flush_history, availability_history
+
+
+def write_records(directory, records):
+    store = open_history_store(str(directory))
+    now = time.time()
+    for offset, (kind, record) in enumerate(records):
+        append_record(store, kind, record, ts=now - 100 + offset)
+    flush_history(store)
+
+
+def test_events_report_their_recorded_availability(tmp_path):
+    write_records(tmp_path, [
+        ('stock_event', {'type': 'restock', 'tag': 'redmi-13x', 'gid': '1', 'available': True, 'sale_price': 100.0}),
+        ('stock_event', {'type': 'price_change', 'tag': 'redmi-13x', 'gid': '1', 'available': True, 'sale_price': 90.0}),
+        ('stock_event', {'type': 'sold_out', 'tag': 'redmi-13x', 'gid': '1', 'available': False, 'sale_price': 90.0}),
+        ('stock_event', {'type': 'price_change', 'tag': 'redmi-13x', 'gid': '1', 'available': False, 'sale_price': 80.0}),
+        ('stock_event', {'type': 'restock', 'tag': 'mi-band-8', 'gid': '2', 'available': True, 'sale_price': 50.0})
+    ])
+    
+    history = availability_history('redmi-13x', directory=str(tmp_path))
+    
+    assert [(record['event'], record['available'], record['sale_price']) for record in history] == [
+        ('restock', True, 100.0),
+        ('price_change', True, 90.0),
+        ('sold_out', False, 90.0),
+        ('price_change', False, 80.0)
+    ]
+
+
+def test_older_price_change_carries_the_last_known_availability(tmp_path):
+    write_records(tmp_path, [
+        ('stock_event', {'type': 'price_change', 'tag': 'redmi-13x', 'gid': '1', 'sale_price': 100.0}),
+        ('stock_event', {'type': 'restock', 'tag': 'redmi-13x', 'gid': '1', 'sale_price': 100.0}),
+        ('stock_event', {'type': 'price_change', 'tag': 'redmi-13x', 'gid': '1', 'sale_price': 90.0}),
+        ('stock_event', {'type': 'price_change', 'tag': 'redmi-13x', 'gid': '2', 'sale_price': 90.0}),
+        ('stock_event', {'type': 'sold_out', 'tag': 'redmi-13x', 'gid': '1', 'sale_price': 90.0}),
+        ('stock_event', {'type': 'price_change', 'tag': 'redmi-13x', 'gid': '1', 'sale_price': 80.0})
+    ])
+    
+    history = availability_history('redmi-13x', directory=str(tmp_path))
+    
+    assert [(record['gid'], record['available']) for record in history] == [
+        ('1', None),
+        ('1', True),
+        ('1', True),
+        ('2', None),
+        ('1', False),
+        ('1', False)
+    ]
+
+
+def test_stock_checks_and_window(tmp_path):
+    store = open_history_store(str(tmp_path))
+    now = time.time()
+    append_record(store, 'stock_check', {'tag': 'redmi-13x', 'gid': '1', 'available': True, 'sale_price': 100.0}, ts=now - 7200)
+    append_record(store, 'stock_check', {'tag': 'redmi-13x', 'gid': '1', 'available': False, 'sale_price': 100.0}, ts=now - 60)
+    append_record(store, 'checkout_waits', {'tag': 'redmi-13x'}, ts=now - 30)
+    flush_history(store)
+    
+    history = availability_history('redmi-13x', hours=1, directory=str(tmp_path))
+    
+    assert [(record['kind'], record['event'], record['available']) for record in history] == [('stock_check', None, False)]
@@ -0,0 +1,142 @@
+import stock_client
+import stock_series
+from stock_checker import update_stock_state, in_stock_products, build_watchlist, apply_watchlist_diff
+
+
+def make_result(available, sale_price=100.0, tag='redmi-13x', gid='4223706588', product_number=1, ok=True, **extra):
+    result = {
+        'ok': ok,
+        'tag': tag,
+        'gid': gid,
+        'url': f'https://www.mi.co.id/id/product/{tag}/?gid={gid}',
+        'product_number': product_number,
+        'available': available,
+        'goods_name': 'Redmi 13x',
+        'sale_price': sale_price,
+        'market_price': 120.0
+    }
+    result.update(extra)
+    return result
+
+
+def test_first_check_out_of_stock_is_silent():
+    state = {}
+    
+    assert update_stock_state(state, [make_result(False)], 1.0) == []
+    assert state['redmi-13x#4223706588']['available'] is False
+    assert state['redmi-13x#4223706588']['restocks'] == 0
+
+
+def test_first_check_in_stock_alerts_once():
+    state = {}
+    
+    events = update_stock_state(state, [make_result(True)], 1.0)
+    
+    assert [event['type'] for event in events] == ['restock']
+    assert events[0]['available'] is True
+    assert state['redmi-13x#4223706588']['restocks'] == 1
+    assert update_stock_state(state, [make_result(True)], 2.0) == []
+
+
+def test_restock_and_sold_out_transitions():
+    state = {}
+    update_stock_state(state, [make_result(False)], 1.0)
+    
+    restock = update_stock_state(state, [make_result(True)], 2.0)
+    sold_out = update_stock_state(state, [make_result(False)], 3.0)
+    
+    assert [(event['type'], event['available'], event['at']) for event in restock] == [('restock', True, 2.0)]
+    assert [(event['type'], event['available'], event['at']) for event in sold_out] == [('sold_out', False, 3.0)]
+    assert state['redmi-13x#4223706588']['since'] == 3.0
+    assert state['redmi-13x#4223706588']['restocks'] == 1
+
+
+def test_price_change_keeps_availability():
+    state = {}
+    update_stock_state(state, [make_result(False, sale_price=100.0)], 1.0)
+    
+    events = update_stock_state(state, [make_result(False, sale_price=90.0)], 2.0)
+    
+    assert [event['type'] for event in events] == ['price_change']
+    assert events[0]['available'] is False
+    assert events[0]['previous_sale_price'] == 100.0
+    assert state['redmi-13x#4223706588']['since'] == 1.0
+
+
+def test_failed_check_leaves_state_untouched():
+    state = {}
+    update_stock_state(state, [make_result(True)], 1.0)
+    
+    assert update_stock_state(state, [make_result(False, ok=False)], 2.0) == []
+    assert state['redmi-13x#4223706588']['available'] is True
+    assert state['redmi-13x#4223706588']['last_checked'] == 1.0
+
+
+def test_unchanged_response_only_touches_last_checked():
+    state = {}
+    update_stock_state(state, [make_result(False)], 1.0)
+    
+    assert update_stock_state(state, [make_result(True, unchanged=True)], 2.0) == []
+    assert state['redmi-13x#4223706588']['available'] is False
+    assert state['redmi-13x#4223706588']['last_checked'] == 2.0
+
+
+def test_urls_sharing_a_sku_give_one_event():
+    state = {}
+    update_stock_state(state, [make_result(False, product_number=1), make_result(False, product_number=2)], 1.0)
+    
+    events = update_stock_state(state, [make_result(True, product_number=1), make_result(True, product_number=2)], 2.0)
+    
+    assert len(events) == 1
+    assert events[0]['product_numbers'] == [1, 2]
+    assert in_stock_products(state) == ['redmi-13x#4223706588']
+
+
+def test_skus_of_one_tag_are_tracked_apart():
+    state = {}
+    update_stock_state(state, [make_result(False, gid='1'), make_result(False, gid='2')], 1.0)
+    
+    events = update_stock_state(state, [make_result(True, gid='1'), make_result(False, gid='2')], 2.0)
+    
+    assert [event['key'] for event in events] == ['redmi-13x#1']
+    assert in_stock_products(state) == ['redmi-13x#1']
+
+
+def test_watchlist_diff_adds_removes_and_keeps_tags():
+    urls = ['https://www.mi.co.id/id/product/redmi-13x/?gid=1', 'https://www.mi.co.id/id/product/mi-band-8/?gid=2']
+    watchlist = build_watchlist(urls)
+    schedule = stock_client.create_poll_schedule(watchlist['tags'], 1.0, 0.0)
+    state = {}
+    update_stock_state(state, [make_result(False, tag='redmi-13x', gid='1'), make_result(True, tag='mi-band-8', gid='2')], 1.0)
+    series = stock_series.create_series_store()
+    stock_series.record_round(series, [make_result(False, tag='redmi-13x', gid='1'), make_result(True, tag='mi-band-8', gid='2')], 1.0)
+    stock_client.record_poll_failure(schedule['redmi-13x'], 1.0)
+    backoff = dict(schedule['redmi-13x'])
+    
+    new_urls = [urls[0], 'https://www.mi.co.id/id/product/redmi-buds-5/']
+    diff = apply_watchlist_diff(watchlist, build_watchlist(new_urls), schedule, state, 5.0, 1.0,
+                                session=stock_client.create_stock_session(), series=series)
+    
+    assert diff == {'added': ['redmi-buds-5'], 'removed': ['mi-band-8'], 'changed': []}
+    assert watchlist['urls'] == new_urls
+    assert sorted(watchlist['tags']) == ['redmi-13x', 'redmi-buds-5']
+    assert schedule['redmi-13x'] == backoff
+    assert schedule['redmi-buds-5']['next_due'] == 5.0
+    assert 'mi-band-8' not in schedule
+    assert list(state) == ['redmi-13x#1']
+    assert list(series['series']) == ['redmi-13x#1']
+
+
+def test_watchlist_diff_drops_state_of_a_removed_sku():
+    urls = ['https://www.mi.co.id/id/product/redmi-13x/?gid=1', 'https://www.mi.co.id/id/product/redmi-13x/?gid=2']
+    watchlist = build_watchlist(urls)
+    schedule = stock_client.create_poll_schedule(watchlist['tags'], 1.0, 0.0)
+    state = {}
+    update_stock_state(state, [make_result(False, gid='1'), make_result(False, gid='2')], 1.0)
+    
+    diff = apply_watchlist_diff(watchlist, build_watchlist(urls[:1]), schedule, state, 5.0, 1.0,
+                                session=stock_client.create_stock_session())
+    
+    assert diff == {'added': [], 'removed': [], 'changed': ['redmi-13x']}
+    assert list(schedule) == ['redmi-13x']
+    assert list(state) == ['redmi-13x#1']
@@ -0,0 +1,48 @@
+from stock_client import (
+    BACKOFF_MAX_INTERVAL,
+    create_poll_schedule, record_poll_success, record_poll_failure, due_poll_tags
+)
+
+
+def test_failures_double_the_interval_up_to_the_cap():
+    entry = create_poll_schedule(['redmi-13x'], 1.0, 0.0)['redmi-13x']
+    
+    intervals = []
+    for _ in range(10):
+        record_poll_failure(entry, 0.0)
+        intervals.append(entry['interval'])
+    
+    assert intervals[:4] == [2.0, 4.0, 8.0, 16.0]
+    assert intervals[-1] == BACKOFF_MAX_INTERVAL
+
+
+def test_long_failure_streak_does_not_overflow():
+    entry = create_poll_schedule(['redmi-13x'], 5.0, 0.0)['redmi-13x']
+    entry['failures'] = 100000
+    
+    delay = record_poll_failure(entry, 1000.0)
+    
+    assert entry['interval'] == BACKOFF_MAX_INTERVAL
+    assert 5.0 <= delay <= BACKOFF_MAX_INTERVAL
+    assert entry['next_due'] == 1000.0 + delay
+
+
+def test_retry_after_sets_the_minimum_delay_within_the_cap():
+    entry = create_poll_schedule(['redmi-13x'], 1.0, 0.0)['redmi-13x']
+    
+    assert record_poll_failure(entry, 0.0, retry_after=30.0) >= 30.0
+    assert record_poll_failure(entry, 0.0, retry_after=3600.0) <= BACKOFF_MAX_INTERVAL
+
+
+def test_success_tightens_back_to_the_base_interval():
+    schedule = create_poll_schedule(['redmi-13x'], 1.0, 0.0)
+    entry = schedule['redmi-13x']
+    for _ in range(3):
+        record_poll_failure(entry, 0.0)
+    
+    for _ in range(4):
+        record_poll_success(entry, 10.0)
+    
+    assert entry['failures'] == 0
+    assert entry['interval'] == 1.0
+    assert due_poll_tags(schedule, 11.0) == ['redmi-13x']
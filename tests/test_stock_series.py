@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import pytest
+
+from stock_series import create_series_store, record_sample, restock_pattern, restock_patterns
+
+# Aligned to every tier bucket so samples fall into predictable buckets
+T0 = 1700006400
+
+
+def record_availability(store, availability, key='redmi-13x#1', step=60):
+    for i, available in enumerate(availability):
+        record_sample(store, key, 'redmi-13x', T0 + i * step, available, 100.0, 120.0)
+    return store['series'][key]
+
+
+def test_restocks_spans_and_availability_from_raw_samples():
+    series = record_availability(create_series_store(), [False, False, False, True, True, False, False, False, True, False])
+    
+    pattern = restock_pattern(series, now=T0 + 600)
+    
+    assert pattern['key'] == 'redmi-13x#1'
+    assert pattern['restocks'] == 2
+    assert pattern['mean_interval_s'] == 300
+    assert pattern['mean_in_stock_s'] == 90
+    assert pattern['availability_pct'] == pytest.approx(30.0)
+    assert pattern['last_restock'] == datetime.fromtimestamp(T0 + 480).strftime("%Y-%m-%d %H:%M:%S")
+    hours = [0] * 24
+    for ts in (T0 + 180, T0 + 480):
+        hours[datetime.fromtimestamp(ts).hour] += 1
+    assert pattern['restocks_by_hour'] == hours
+
+
+def test_window_only_counts_recent_restocks():
+    series = record_availability(create_series_store(), [False, False, False, True, True, False, False, False, True, False])
+    
+    pattern = restock_pattern(series, window=300, now=T0 + 570)
+    
+    assert pattern['restocks'] == 1
+    assert pattern['mean_interval_s'] is None
+    assert pattern['availability_pct'] == pytest.approx(20.0)
+
+
+def test_in_stock_from_the_start_is_not_a_restock():
+    series = record_availability(create_series_store(), [True, True, False])
+    
+    pattern = restock_pattern(series, now=T0 + 180)
+    
+    assert pattern['restocks'] == 0
+    assert pattern['last_restock'] is None
+
+
+def test_downsampled_buckets_count_as_in_stock_with_any_in_stock_sample():
+    availability = [10 <= i <= 14 or i == 20 for i in range(30)]
+    series = record_availability(create_series_store(raw_samples=4, tiers=((300, 100),)), availability)
+    
+    pattern = restock_pattern(series, now=T0 + 1800)
+    
+    assert pattern['restocks'] == 2
+    assert pattern['mean_interval_s'] == 600
+    assert pattern['mean_in_stock_s'] == 330
+    assert pattern['availability_pct'] == pytest.approx(6 / 29 * 100)
+
+
+def test_restock_patterns_skip_products_that_never_restocked():
+    store = create_series_store()
+    record_availability(store, [False, True, False, True], key='redmi-13x#1')
+    record_availability(store, [False, True], key='mi-band-8#2')
+    record_availability(store, [False, False], key='redmi-buds-5#3')
+    
+    patterns = restock_patterns(store, now=T0 + 300)
+    
+    assert [(pattern['key'], pattern['restocks']) for pattern in patterns] == [('redmi-13x#1', 2), ('mi-band-8#2', 1)]